@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+# Stand-ins for the models; the mock provider answers for any model name
+CLAUDE_MODEL = "claude-bench"
+GPT_MODEL = "gpt-bench"
+
+AUTHORIZED_SERVER_ID = 1000
+BOT_USER_ID = 1
+
+_PROMPT = """\
+chat_system: You are a benchmark assistant.
+fixpy_system: You fix Python code for a benchmark.
+talk_system: You are a benchmark assistant.
+"""
+
+
+def prepare_environment(workdir: Path, provider_url: str) -> None:
+    """Configure the bot to run offline against the mock provider.
+
+    Must be called before anything from `src.comet` is imported, since the
+    configuration is read from the environment at import time. Every
+    setting is overwritten so that a local `.env` can't leak into a run.
+
+    Parameters
+    ----------
+    workdir : Path
+        A scratch directory for the database and the prompt file.
+    provider_url : str
+        The base URL of the mock provider server.
+    """
+    prompt_file = workdir / "prompt.yml"
+    prompt_file.write_text(_PROMPT, encoding="utf-8")
+
+    os.environ.update(
+        {
+            "ANTHROPIC_API_KEY": "bench",
+            "ANTHROPIC_BASE_URL": provider_url,
+            "OPENAI_API_KEY": "bench",
+            "OPENAI_BASE_URL": f"{provider_url}/v1",
+            "BASE_TOP_P": "1.0",
+            "CLAUDE_DEFAULT_CONTEXT_WINDOW": "50",
+            "CLAUDE_DEFAULT_MAX_TOKENS": "1024",
+            "CLAUDE_DEFAULT_TEMPERATURE": "1.0",
+            "CLAUDE_DEFAULT_TOP_P": "1.0",
+            "GPT_DEFAULT_CONTEXT_WINDOW": "50",
+            "GPT_DEFAULT_MAX_TOKENS": "1024",
+            "GPT_DEFAULT_TEMPERATURE": "1.0",
+            "GPT_DEFAULT_TOP_P": "1.0",
+            "CHAT_MODEL": GPT_MODEL,
+            "FIXPY_MODEL": GPT_MODEL,
+            "FIXPY_TEMPERATURE": "0.2",
+            "FIXPY_TOP_P": "0.99",
+            "TALK_MAX_TOKENS": "1024",
+            "TALK_MODEL": f"Bench:{CLAUDE_MODEL}",
+            "TALK_TEMPERATURE": "0.6",
+            "TALK_TOP_P": "0.99",
+            "PROVIDER_KEEPALIVE_SECONDS": "0",
+            "GENERATION_WORKERS": "0",
+            "SQLITE_DB_NAME": str(workdir / "bench.db"),
+            "ADMIN_USER_IDS": "",
+            "AUTHORIZED_SERVER_IDS": str(AUTHORIZED_SERVER_ID),
+            "BOT_NAME": "comet",
+            "DISCORD_BOT_TOKEN": "bench",
+            "MAX_CHARS_PER_MESSAGE": "2000",
+            "TIMEZONE": "UTC",
+            "PROMPT_FILE": str(prompt_file),
+        },
+    )
+    # The mock provider must never be reached through a proxy
+    no_proxy = os.environ.get("NO_PROXY", "")
+    os.environ["NO_PROXY"] = os.environ["no_proxy"] = ",".join(
+        filter(None, [no_proxy, "127.0.0.1", "localhost"]),
+    )
@@ -0,0 +1,336 @@
+"""Micro-benchmarks of the DAO methods on the hot path of every interaction.
+
+Each DAO method is run against a scratch SQLite file filled with a given
+number of rows, at several concurrency levels, and its throughput and
+latency distribution are recorded. Given a baseline produced by an earlier
+run, the benchmark fails when a case regresses beyond the threshold.
+
+Examples
+--------
+    python -m benchmarks.dao --json baseline.json
+    python -m benchmarks.dao --baseline baseline.json --threshold 0.25
+    python -m benchmarks.dao --sizes 1000,1000000 --concurrency 1,32 --duration 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import importlib
+import json
+import logging
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from benchmarks._env import prepare_environment
+from benchmarks.metrics import percentile
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# Users with their daily usage recorded over about this many days
+_HISTORY_DAYS = 30
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line arguments of the DAO benchmarks."""
+
+    def int_list(value: str) -> list[int]:
+        return [int(item) for item in value.split(",") if item.strip()]
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int_list,
+        default=[1_000, 10_000, 100_000, 1_000_000],
+        help="comma-separated numbers of rows per table (default: 1000,10000,100000,1000000)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int_list,
+        default=[1, 8, 32],
+        help="comma-separated numbers of concurrent callers (default: 1,8,32)",
+    )
+    parser.add_argument("--duration", type=float, default=1.0, help="seconds per case")
+    parser.add_argument("--case", action="append", help="only run these cases, can be repeated")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="write the results to this file")
+    parser.add_argument("--baseline", type=Path, help="results of an earlier run to compare to")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="tolerated relative drop in ops/s or rise in p95 latency (default: 0.25)",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=0.5,
+        help="latency rises smaller than this are never regressions (default: 0.5)",
+    )
+    return parser.parse_args(argv)
+
+
+def populate(db_path: Path, rows: int, today: datetime.date) -> None:
+    """Fill the tables with `rows` rows each, shaped like a long-running bot's data.
+
+    Only the privileges still in effect, 2% of the history, are current.
+
+    Parameters
+    ----------
+    db_path : Path
+        The SQLite file, whose tables already exist.
+    rows : int
+        The number of rows inserted in each table.
+    today : datetime.date
+        The date of the most recent usage records.
+    """
+    users = max(rows // _HISTORY_DAYS, 1)
+    # Dates are stored in the ISO format, as sqlite3's deprecated default adapter does
+    date = today.isoformat()
+    conn = sqlite3.connect(db_path)
+    try:
+        # Most privileges were granted then revoked, 1% each are still active
+        conn.executemany(
+            "INSERT INTO access_privilege_current (user_id, privilege, enabled_at)"
+            " VALUES (?, ?, ?)",
+            (
+                (user_id, "blocked" if user_id % 100 == 1 else "advanced", date)
+                for user_id in range(rows)
+                if user_id % 100 in {0, 1}
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO access_privilege_history (user_id, privilege, action, changed_at)"
+            " VALUES (?, ?, ?, ?)",
+            (
+                (
+                    index // 2,
+                    "blocked" if index // 2 % 100 == 1 else "advanced",
+                    "enable" if index % 2 == 0 else "disable",
+                    date,
+                )
+                for index in range(rows)
+                if index % 2 == 0 or index // 2 % 100 not in {0, 1}
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO usage_limit (user_id, daily_limit, last_updated) VALUES (?, ?, ?)",
+            ((user_id, 10, date) for user_id in range(1, rows + 1)),
+        )
+        conn.executemany(
+            "INSERT INTO commands_usage (user_id, usage_date, usage_count) VALUES (?, ?, ?)",
+            (
+                (
+                    index % users,
+                    (today - datetime.timedelta(days=index // users)).isoformat(),
+                    1,
+                )
+                for index in range(rows)
+            ),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def build_cases(
+    rows: int,
+    rng: random.Random,
+) -> dict[str, Callable[[], Awaitable[Any]]]:
+    """Build the DAO calls to benchmark.
+
+    Parameters
+    ----------
+    rows : int
+        The number of rows per table, from which user IDs are drawn.
+    rng : random.Random
+        The source of the user IDs.
+
+    Returns
+    -------
+    dict[str, Callable[[], Awaitable[Any]]]
+        Case name -> a callable running the DAO method once.
+    """
+    access_dao = importlib.import_module("src.comet.db.dao.access_privilege_dao")
+    usage_dao = importlib.import_module("src.comet.db.dao.usage_limit_dao")
+    access = access_dao.AccessPrivilegeDAO()
+    usage = usage_dao.UsageLimitDAO()
+
+    def user_id() -> int:
+        return rng.randrange(rows)
+
+    return {
+        "access.fetch_advanced": lambda: access.fetch_user_ids_by_access_privilege("advanced"),
+        "access.fetch_blocked": lambda: access.fetch_user_ids_by_access_privilege("blocked"),
+        "access.enable": lambda: access.enable(user_id(), "advanced"),
+        "access.disable": lambda: access.disable(user_id(), "advanced"),
+        "access.has_blocked": lambda: access.has_access_privilege(user_id(), "blocked"),
+        "usage.get_default_daily_limit": usage.get_default_daily_limit,
+        # Half of the users have no limit of their own and fall back to the default
+        "usage.get_user_daily_limit": lambda: usage.get_user_daily_limit(user_id() * 2),
+        "usage.get_user_daily_usage": lambda: usage.get_user_daily_usage(user_id()),
+        "usage.get_user_daily_quota": lambda: usage.get_user_daily_quota(user_id() * 2),
+        "usage.increment_usage_count": lambda: usage.increment_usage_count(user_id()),
+    }
+
+
+async def measure(
+    call: Callable[[], Awaitable[Any]],
+    concurrency: int,
+    duration: float,
+) -> dict[str, float]:
+    """Call a DAO method from concurrent callers for a fixed duration.
+
+    Parameters
+    ----------
+    call : Callable[[], Awaitable[Any]]
+        Runs the DAO method once.
+    concurrency : int
+        The number of concurrent callers.
+    duration : float
+        The number of seconds to keep calling.
+
+    Returns
+    -------
+    dict[str, float]
+        The number of calls, ops/s and latency percentiles in milliseconds.
+    """
+    samples: list[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def caller() -> None:
+        # At least one call each, however slow the method is
+        while True:
+            started = time.perf_counter()
+            await call()
+            samples.append(time.perf_counter() - started)
+            if started > deadline:
+                return
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "ops": len(samples),
+        "ops_per_s": round(len(samples) / elapsed, 2),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+async def run(args: argparse.Namespace, workdir: Path) -> dict[str, Any]:
+    """Run every case at every table size and concurrency level."""
+    # No AI provider is reached by the DAOs
+    prepare_environment(workdir, "http://127.0.0.1:9")
+    base = importlib.import_module("src.comet.db._base")
+    migrations = importlib.import_module("src.comet.db.migrations")
+    timezone = importlib.import_module("src.comet.config.timezone")
+
+    results: dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "duration_s": args.duration,
+        },
+        "cases": {},
+    }
+    for rows in args.sizes:
+        db_path = workdir / f"dao-{rows}.db"
+        base.SQLiteDAOBase.DB_NAME = str(db_path)
+        await migrations.SchemaMigrator().migrate()
+        populate(db_path, rows, datetime.datetime.now(timezone.TIMEZONE).date())
+
+        rng = random.Random(args.seed)  # noqa: S311
+        for name, call in build_cases(rows, rng).items():
+            if args.case and name not in args.case:
+                continue
+            for concurrency in args.concurrency:
+                key = f"{name}|rows={rows}|concurrency={concurrency}"
+                stats = await measure(call, concurrency, args.duration)
+                results["cases"][key] = stats
+                print(  # noqa: T201
+                    f"{key:<60}{stats['ops_per_s']:>10.0f} ops/s"
+                    f"  p50 {stats['p50_ms']:>8.2f}  p95 {stats['p95_ms']:>8.2f}"
+                    f"  p99 {stats['p99_ms']:>8.2f} ms",
+                )
+        db_path.unlink()
+    return results
+
+
+def find_regressions(
+    results: dict[str, Any],
+    baseline: dict[str, Any],
+    threshold: float,
+    min_delta_ms: float,
+) -> list[str]:
+    """Compare the results to a baseline.
+
+    Parameters
+    ----------
+    results : dict[str, Any]
+        The results of this run.
+    baseline : dict[str, Any]
+        The results of an earlier run. Cases missing from either are skipped.
+    threshold : float
+        The tolerated relative drop in ops/s or rise in p95 latency.
+    min_delta_ms : float
+        Latency rises smaller than this are ignored as noise.
+
+    Returns
+    -------
+    list[str]
+        A description of each regression.
+    """
+    regressions = []
+    for key, stats in results["cases"].items():
+        before = baseline["cases"].get(key)
+        if before is None:
+            continue
+        if stats["ops_per_s"] < before["ops_per_s"] * (1 - threshold):
+            regressions.append(
+                f"{key}: {stats['ops_per_s']:.0f} ops/s, was {before['ops_per_s']:.0f}",
+            )
+        p95_delta = stats["p95_ms"] - before["p95_ms"]
+        if p95_delta > min_delta_ms and stats["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{key}: p95 {stats['p95_ms']:.2f} ms, was {before['p95_ms']:.2f} ms",
+            )
+    return regressions
+
+
+def main() -> None:
+    """Entry point of `python -m benchmarks.dao`."""
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="comet-dao-bench-") as workdir:
+        results = asyncio.run(run(args, Path(workdir)))
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if args.baseline is None:
+        return
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = find_regressions(results, baseline, args.threshold, args.min_delta_ms)
+    for regression in regressions:
+        logger.error("Regression: %s", regression)
+    if regressions:
+        sys.exit(1)
+    print(f"No regression beyond {args.threshold:.0%} against {args.baseline}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""In-memory stand-ins for the Discord objects used by the bot.
+
+Every method that would hit the Discord REST API is counted for the
+current turn and optionally delayed to simulate the API latency.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any
+
+from discord import MessageType, Thread
+
+from benchmarks.metrics import count
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+    from discord import Embed
+
+_ids = itertools.count(10**17)
+
+
+class FakeRest:
+    """Simulated Discord REST API.
+
+    Parameters
+    ----------
+    latency : float
+        The number of seconds each call takes.
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.routes: Counter[str] = Counter()
+
+    async def call(self, route: str) -> None:
+        """Count a REST call and wait for its simulated latency."""
+        self.routes[route] += 1
+        count("rest_calls")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+class FakeUser:
+    """A Discord user or member."""
+
+    def __init__(self, user_id: int, name: str, *, bot: bool = False) -> None:
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.bot = bot
+        self.mention = f"<@{user_id}>"
+
+    def __str__(self) -> str:
+        """Return the name, as discord.py does."""
+        return self.name
+
+
+class FakeGuild:
+    """A guild whose members are never cached."""
+
+    def __init__(self, guild_id: int, shard_id: int = 0) -> None:
+        self.id = guild_id
+        self.shard_id = shard_id
+
+    def get_member(self, _user_id: int) -> None:
+        """Return None, as with the lean memory profile."""
+
+
+class FakeMessage:
+    """A message sent in a guild channel or thread."""
+
+    def __init__(
+        self,
+        rest: FakeRest,
+        channel: Any,  # noqa: ANN401
+        author: FakeUser,
+        content: str | None,
+        *,
+        embed: Embed | None = None,
+    ) -> None:
+        self.rest = rest
+        self.id = next(_ids)
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.embeds = [embed] if embed is not None else []
+        self.attachments: list[Any] = []
+        self.edited_at = None
+        self.type = MessageType.default
+        self.reference = None
+        self.thread: FakeThread | None = None
+
+    async def create_thread(self, *, name: str, **_options: Any) -> FakeThread:  # noqa: ANN401
+        """Start a thread owned by the author of the message."""
+        await self.rest.call("POST /channels/{id}/messages/{id}/threads")
+        self.thread = FakeThread(self.rest, self.guild, name=name, owner=self.author)
+        return self.thread
+
+
+class FakeThread(Thread):
+    """A thread keeping its messages in memory.
+
+    It subclasses `discord.Thread` so that the `isinstance` checks of the
+    bot pass, but none of the state of the real class is used.
+    """
+
+    def __init__(self, rest: FakeRest, guild: FakeGuild, *, name: str, owner: FakeUser) -> None:
+        # discord.Thread expects a gateway payload, only the attributes read by the bot are set
+        self.rest = rest
+        self.id = next(_ids)
+        self.guild = guild  # type: ignore[assignment]
+        self.name = name
+        self.owner_id = owner.id
+        self.parent_id = 0
+        self.owner_user = owner
+        self.message_count = 0
+        self.archived = False
+        self.locked = False
+        self.messages: list[FakeMessage] = []
+
+    def add_message(
+        self,
+        author: FakeUser,
+        content: str | None,
+        embed: Embed | None = None,
+    ) -> FakeMessage:
+        """Append a message without going through the REST API, e.g. one sent by a user."""
+        message = FakeMessage(self.rest, self, author, content, embed=embed)
+        self.messages.append(message)
+        self.message_count += 1
+        return message
+
+    async def send(  # type: ignore[override]
+        self,
+        content: str | None = None,
+        *,
+        embed: Embed | None = None,
+        **_options: Any,  # noqa: ANN401
+    ) -> FakeMessage:
+        """Send a message as the owner of the thread, i.e. the bot."""
+        await self.rest.call("POST /channels/{id}/messages")
+        return self.add_message(self.owner_user, content, embed)
+
+    async def edit(self, **fields: Any) -> FakeThread:  # type: ignore[override]  # noqa: ANN401
+        """Update the archived and locked flags of the thread."""
+        await self.rest.call("PATCH /channels/{id}")
+        self.archived = fields.get("archived", self.archived)
+        self.locked = fields.get("locked", self.locked)
+        return self
+
+    @asynccontextmanager
+    async def typing(self) -> AsyncIterator[None]:  # type: ignore[override]
+        """Show the typing indicator, which costs one REST call."""
+        await self.rest.call("POST /channels/{id}/typing")
+        yield
+
+    async def history(  # type: ignore[override]
+        self,
+        *,
+        limit: int | None = 100,
+        **_options: Any,  # noqa: ANN401
+    ) -> AsyncIterator[FakeMessage]:
+        """Iterate over the messages from the newest, fetching them by pages of 100."""
+        newest_first = self.messages[::-1][:limit]
+        for index, message in enumerate(newest_first):
+            if index % 100 == 0:
+                await self.rest.call("GET /channels/{id}/messages")
+            yield message
+
+
+class FakeInteractionResponse:
+    """The initial response of an interaction."""
+
+    def __init__(self, rest: FakeRest) -> None:
+        self.rest = rest
+
+    async def defer(self, **_options: Any) -> None:  # noqa: ANN401
+        """Acknowledge the interaction."""
+        await self.rest.call("POST /interactions/{id}/{token}/callback")
+
+    async def send_message(self, _content: str | None = None, **_options: Any) -> None:  # noqa: ANN401
+        """Respond to the interaction with a message."""
+        await self.rest.call("POST /interactions/{id}/{token}/callback")
+
+
+class FakeFollowup:
+    """The webhook sending the follow-up messages of an interaction."""
+
+    def __init__(self, interaction: FakeInteraction) -> None:
+        self.interaction = interaction
+
+    async def send(
+        self,
+        content: str | None = None,
+        *,
+        embed: Embed | None = None,
+        **_options: Any,  # noqa: ANN401
+    ) -> FakeMessage:
+        """Send a follow-up message; the first one becomes the original response."""
+        interaction = self.interaction
+        await interaction.rest.call("POST /webhooks/{id}/{token}")
+        message = FakeMessage(
+            interaction.rest,
+            interaction.channel,
+            interaction.bot_user,
+            content,
+            embed=embed,
+        )
+        if interaction.original is None:
+            interaction.original = message
+        return message
+
+
+class FakeChannel:
+    """A guild text channel."""
+
+    def __init__(self, guild: FakeGuild) -> None:
+        self.id = next(_ids)
+        self.guild = guild
+
+
+class FakeInteraction:
+    """A slash command interaction."""
+
+    def __init__(
+        self,
+        rest: FakeRest,
+        guild: FakeGuild,
+        user: FakeUser,
+        bot_user: FakeUser,
+    ) -> None:
+        self.rest = rest
+        self.id = next(_ids)
+        self.guild = guild
+        self.guild_id = guild.id
+        self.channel = FakeChannel(guild)
+        self.user = user
+        self.bot_user = bot_user
+        self.response = FakeInteractionResponse(rest)
+        self.followup = FakeFollowup(self)
+        self.original: FakeMessage | None = None
+
+    async def original_response(self) -> FakeMessage:
+        """Fetch the message sent in response to the interaction."""
+        await self.rest.call("GET /webhooks/{id}/{token}/messages/@original")
+        if self.original is None:
+            msg = "The interaction has not been responded to."
+            raise RuntimeError(msg)
+        return self.original
@@ -0,0 +1,317 @@
+"""Drive the bot's handlers with many concurrent conversations, offline.
+
+The real `on_message` handler and `/talk` and `/chat` commands run against
+in-memory Discord objects, a scratch SQLite database and a mock provider
+server, and the latency of each stage is reported along with the database
+and Discord REST calls made per turn.
+
+Examples
+--------
+    python -m benchmarks.load --threads 100 --turns 3
+    python -m benchmarks.load --scenario thread --threads 1000 --latency-ms 800 --json out.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import importlib
+import json
+import logging
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from discord import app_commands
+from discord.utils import maybe_coroutine
+
+from benchmarks._env import (
+    AUTHORIZED_SERVER_ID,
+    BOT_USER_ID,
+    CLAUDE_MODEL,
+    prepare_environment,
+)
+from benchmarks.fakes import FakeGuild, FakeInteraction, FakeRest, FakeThread, FakeUser
+from benchmarks.metrics import (
+    Recorder,
+    TurnCounters,
+    current_turn,
+    format_summary,
+    instrument_database,
+)
+from benchmarks.mock_provider import MockProvider, MockProviderConfig
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+SCENARIOS = ("thread", "talk", "chat")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line arguments of the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=SCENARIOS,
+        help="scenario to run, can be repeated (default: all)",
+    )
+    parser.add_argument("--threads", type=int, default=100, help="concurrent conversations")
+    parser.add_argument("--turns", type=int, default=3, help="messages sent in each thread")
+    parser.add_argument("--history", type=int, default=10, help="messages already in each thread")
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="provider latency")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="provider latency jitter")
+    parser.add_argument("--output-tokens", type=int, default=200, help="words per response")
+    parser.add_argument(
+        "--chunk-ms",
+        type=float,
+        default=5.0,
+        help="delay between streamed chunks",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="provider error rate")
+    parser.add_argument("--rest-latency-ms", type=float, default=0.0, help="Discord REST latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="write the results to this file")
+    parser.add_argument("--log", default="WARNING", help="log level of the bot")
+    return parser.parse_args(argv)
+
+
+class LoadTest:
+    """Run the benchmark scenarios against the bot's handlers.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        The parsed command line arguments.
+    rest : FakeRest
+        The simulated Discord REST API.
+    """
+
+    def __init__(self, args: argparse.Namespace, rest: FakeRest) -> None:
+        self.args = args
+        self.rest = rest
+        self.recorder = Recorder()
+        self.guild = FakeGuild(AUTHORIZED_SERVER_ID)
+        self.bot_user = FakeUser(BOT_USER_ID, "comet", bot=True)
+
+    async def setup(self) -> None:
+        """Import the bot, instrument its stages and prepare the database."""
+        # The bot reads its configuration at import time, after prepare_environment()
+        self.event = importlib.import_module("src.comet.discord.event")
+        self.talk = importlib.import_module("src.comet.discord.commands.talk_command")
+        self.chat = importlib.import_module("src.comet.discord.commands.chat_command")
+        self.yml = importlib.import_module("src.comet.config.yml")
+        self.completion = importlib.import_module("src.comet.ai.services.completion")
+        storage = importlib.import_module("src.comet.ai.models.storage")
+        claude_model = importlib.import_module("src.comet.ai.models.claude_model")
+        migrations = importlib.import_module("src.comet.db.migrations")
+        usage_dao = importlib.import_module("src.comet.db.dao.usage_limit_dao")
+
+        self.model_params = storage.ModelParamsStore()
+        self.claude_params = claude_model.ClaudeModelParams(
+            model=CLAUDE_MODEL,
+            max_tokens=1024,
+            temperature=0.6,
+            top_p=0.99,
+        )
+
+        await migrations.SchemaMigrator().migrate()
+        # Every simulated user must be allowed to keep talking
+        await usage_dao.UsageLimitDAO().set_default_daily_limit(10**9)
+
+        # Like the bot at startup, so that the SDK imports aren't measured in the first turns
+        warmup = importlib.import_module("src.comet.ai.services.warmup")
+        await warmup.warm_up_providers()
+
+        # The bot only answers in threads it owns
+        self.event.client._connection.user = self.bot_user  # noqa: SLF001
+
+        instrument_database()
+        wrap = self.recorder.wrap
+        for module, name, stage in [
+            (self.event, "_is_valid_message", "validate"),
+            (self.event, "_check_user_daily_limit", "usage_check"),
+            (self.event, "_get_conversation_history", "history"),
+            (self.event, "send_response_result", "send"),
+            (self.talk, "send_response_result", "send"),
+        ]:
+            setattr(module, name, wrap(stage, getattr(module, name)))
+        for module, name in [
+            (self.event, "generate_anthropic_response"),
+            (self.talk, "generate_anthropic_response"),
+            (self.chat, "generate_openai_response"),
+        ]:
+            setattr(module, name, self._wrap_generation(getattr(module, name)))
+        usage_dao.UsageLimitDAO.increment_usage_count = wrap(
+            "usage_update",
+            usage_dao.UsageLimitDAO.increment_usage_count,
+        )
+
+    def _wrap_generation[**P](
+        self,
+        func: Callable[P, Awaitable[Any]],
+    ) -> Callable[P, Awaitable[Any]]:
+        """Time the generation stage and count the status of its results."""
+        timed = self.recorder.wrap("generation", func)
+
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> Any:  # noqa: ANN401
+            result = await timed(*args, **kwargs)
+            self.recorder.outcomes[result.status.name] += 1
+            return result
+
+        return wrapper
+
+    async def _measure_turn[**P](
+        self,
+        func: Callable[P, Awaitable[Any]],
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> None:
+        """Run one turn, recording its latency and side effects."""
+        counters = TurnCounters()
+        token = current_turn.set(counters)
+        try:
+            await self.recorder.wrap("turn", func)(*args, **kwargs)
+        finally:
+            current_turn.reset(token)
+            self.recorder.turns.append(counters)
+
+    def _user(self, index: int) -> FakeUser:
+        return FakeUser(10**6 + index, f"user{index}")
+
+    def _seed_thread(self, index: int) -> FakeThread:
+        """Create a thread as `/talk` leaves it, with some conversation history."""
+        thread = FakeThread(
+            self.rest,
+            self.guild,
+            name=f"{self.talk.TALK_THREAD_PREFIX} benchmark {index}",
+            owner=self.bot_user,
+        )
+        user = self._user(index)
+        for turn in range(self.args.history):
+            author = user if turn % 2 == 0 else self.bot_user
+            thread.add_message(author, f"Seeded message {turn} of thread {index}.")
+        self.talk.system_prompt_dict[thread.id] = self.yml.TALK_SYSTEM
+        self.model_params.set_model_params(thread.id, self.claude_params)
+        return thread
+
+    async def run_thread(self) -> None:
+        """Continue conversations in existing threads through `on_message`."""
+        threads = [self._seed_thread(index) for index in range(self.args.threads)]
+
+        async def converse(index: int, thread: FakeThread) -> None:
+            user = self._user(index)
+            for turn in range(self.args.turns):
+                message = thread.add_message(user, f"Question {turn} from user {index}.")
+                await self._measure_turn(self.event.on_message, message)
+
+        await asyncio.gather(*(converse(index, thread) for index, thread in enumerate(threads)))
+
+    async def _invoke(
+        self,
+        command: app_commands.Command,
+        interaction: FakeInteraction,
+        **options: Any,  # noqa: ANN401
+    ) -> None:
+        """Run the checks and the callback of a command like the command tree does."""
+        checks = self.recorder.wrap("checks", self._run_checks)
+        if await checks(command, interaction):
+            # mypy(call-arg): the options are passed by keyword
+            await command.callback(interaction, **options)  # type: ignore
+
+    async def _run_checks(
+        self,
+        command: app_commands.Command,
+        interaction: FakeInteraction,
+    ) -> bool:
+        for check in command.checks:
+            # mypy(arg-type): the fake stands in for an Interaction
+            if not await maybe_coroutine(check, interaction):  # type: ignore
+                return False
+        return True
+
+    async def run_talk(self) -> None:
+        """Start new conversations with `/talk`."""
+        model = app_commands.Choice(name="Bench", value=CLAUDE_MODEL)
+        await asyncio.gather(
+            *(
+                self._measure_turn(
+                    self._invoke,
+                    self.talk.talk_command,
+                    FakeInteraction(self.rest, self.guild, self._user(index), self.bot_user),
+                    prompt=f"Hello from user {index}, let's talk.",
+                    model=model,
+                )
+                for index in range(self.args.threads)
+            ),
+        )
+
+    async def run_chat(self) -> None:
+        """Ask single-turn questions with `/chat`."""
+        await asyncio.gather(
+            *(
+                self._measure_turn(
+                    self._invoke,
+                    self.chat.chat_command,
+                    FakeInteraction(self.rest, self.guild, self._user(index), self.bot_user),
+                    prompt=f"A question from user {index}.",
+                )
+                for index in range(self.args.threads)
+            ),
+        )
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Run the selected scenarios and return their results."""
+    provider = MockProvider(
+        MockProviderConfig(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            output_tokens=args.output_tokens,
+            chunk_ms=args.chunk_ms,
+            error_rate=args.error_rate,
+        ),
+        seed=args.seed,
+    )
+    provider_url = await provider.start()
+    rest = FakeRest(args.rest_latency_ms / 1000)
+    results: dict[str, Any] = {"config": {k: str(v) for k, v in vars(args).items()}}
+
+    with tempfile.TemporaryDirectory(prefix="comet-bench-") as workdir:
+        prepare_environment(Path(workdir), provider_url)
+        load_test = LoadTest(args, rest)
+        await load_test.setup()
+        try:
+            for scenario in args.scenario or SCENARIOS:
+                load_test.recorder.reset()
+                rest.routes.clear()
+                provider.requests.clear()
+
+                await getattr(load_test, f"run_{scenario}")()
+
+                summary = load_test.recorder.summary()
+                summary["rest_routes"] = dict(rest.routes)
+                summary["provider_requests"] = dict(provider.requests)
+                results[scenario] = summary
+                print(format_summary(scenario, summary))  # noqa: T201
+                print(f"REST routes: {summary['rest_routes']}\n")  # noqa: T201
+        finally:
+            await load_test.completion.close_clients()
+            await provider.stop()
+
+    return results
+
+
+def main() -> None:
+    """Entry point of `python -m benchmarks.load`."""
+    args = parse_args()
+    logging.basicConfig(level=args.log.upper())
+    results = asyncio.run(run(args))
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
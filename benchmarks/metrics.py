@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import functools
+import math
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
+
+import aiosqlite
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Sequence
+
+
+class TurnCounters:
+    """Side effects of a single simulated turn.
+
+    Attributes
+    ----------
+    db_connections : int
+        The number of SQLite connections opened.
+    db_queries : int
+        The number of SQL statements executed.
+    rest_calls : int
+        The number of Discord REST calls made.
+    """
+
+    def __init__(self) -> None:
+        self.db_connections = 0
+        self.db_queries = 0
+        self.rest_calls = 0
+
+
+# The counters of the turn running in the current task, if any
+current_turn: ContextVar[TurnCounters | None] = ContextVar("current_turn", default=None)
+
+
+def count(field: str) -> None:
+    """Increment a counter of the current turn, if one is being recorded."""
+    counters = current_turn.get()
+    if counters is not None:
+        setattr(counters, field, getattr(counters, field) + 1)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Return the q-th percentile of the values using the nearest-rank method."""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class Recorder:
+    """Collect the stage latencies and turn counters of a benchmark run."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything recorded so far."""
+        self.stages: defaultdict[str, list[float]] = defaultdict(list)
+        self.turns: list[TurnCounters] = []
+        self.outcomes: Counter[str] = Counter()
+        self.started_at = time.perf_counter()
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Record the duration of one pass through a stage."""
+        self.stages[stage].append(seconds)
+
+    def wrap[**P, R](
+        self,
+        stage: str,
+        func: Callable[P, Awaitable[R]],
+    ) -> Callable[P, Awaitable[R]]:
+        """Wrap a coroutine function so that each call is timed as a stage."""
+
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+
+        return wrapper
+
+    def summary(self) -> dict[str, Any]:
+        """Summarize the run.
+
+        Returns
+        -------
+        dict[str, Any]
+            Throughput, per-stage latency percentiles in milliseconds,
+            per-turn side effects and generation outcomes.
+        """
+        elapsed = time.perf_counter() - self.started_at
+        turns = len(self.turns)
+        return {
+            "turns": turns,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(turns / elapsed, 2) if elapsed else 0.0,
+            "stages_ms": {
+                stage: {
+                    "count": len(samples),
+                    "mean": round(sum(samples) / len(samples) * 1000, 2),
+                    "p50": round(percentile(samples, 50) * 1000, 2),
+                    "p95": round(percentile(samples, 95) * 1000, 2),
+                    "p99": round(percentile(samples, 99) * 1000, 2),
+                    "max": round(max(samples) * 1000, 2),
+                }
+                for stage, samples in self.stages.items()
+            },
+            "per_turn": {
+                field: {
+                    "mean": round(sum(values) / turns, 2) if turns else 0.0,
+                    "max": max(values, default=0),
+                }
+                for field in ("db_connections", "db_queries", "rest_calls")
+                for values in [[getattr(turn, field) for turn in self.turns]]
+            },
+            "outcomes": dict(self.outcomes),
+        }
+
+
+def format_summary(name: str, summary: dict[str, Any]) -> str:
+    """Render a summary as a plain text report."""
+    lines = [
+        (
+            f"== {name}: {summary['turns']} turns in {summary['elapsed_s']:.2f} s "
+            f"({summary['throughput_per_s']:.1f} turns/s)"
+        ),
+        f"{'stage':<14}{'count':>7}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}",
+    ]
+    lines += [
+        f"{stage:<14}{stats['count']:>7}{stats['mean']:>10.1f}{stats['p50']:>10.1f}"
+        f"{stats['p95']:>10.1f}{stats['p99']:>10.1f}{stats['max']:>10.1f}"
+        for stage, stats in summary["stages_ms"].items()
+    ]
+    lines += [
+        f"per turn: {field} mean {stats['mean']:.1f} / max {stats['max']}"
+        for field, stats in summary["per_turn"].items()
+    ]
+    lines.append(f"outcomes: {summary['outcomes'] or '-'}")
+    return "\n".join(lines)
+
+
+@functools.cache
+def instrument_database() -> None:
+    """Count the SQLite connections and statements of each turn.
+
+    aiosqlite runs the statements in its own thread, where the context of
+    the calling task isn't available, so the calls are counted as they are
+    issued instead of through SQLite's trace callback.
+    """
+    connect = aiosqlite.connect
+
+    @functools.wraps(connect)
+    def counting_connect(*args: Any, **kwargs: Any) -> aiosqlite.Connection:  # noqa: ANN401
+        count("db_connections")
+        return connect(*args, **kwargs)
+
+    aiosqlite.connect = counting_connect
+
+    for name in ("execute", "executemany", "executescript"):
+        method = getattr(aiosqlite.Connection, name)
+
+        # The methods return an object that is both awaitable and an async
+        # context manager, so it's passed through untouched
+        def counting_method(
+            self: aiosqlite.Connection,
+            *args: Any,  # noqa: ANN401
+            _method: Callable[..., Any] = method,
+            **kwargs: Any,  # noqa: ANN401
+        ) -> Any:  # noqa: ANN401
+            count("db_queries")
+            return _method(self, *args, **kwargs)
+
+        setattr(aiosqlite.Connection, name, counting_method)
@@ -0,0 +1,266 @@
+"""A local server imitating the Anthropic and OpenAI APIs.
+
+The official SDKs are pointed at it through `ANTHROPIC_BASE_URL` and
+`OPENAI_BASE_URL`, so generation goes through the real clients, HTTP
+connection pools and error handling without leaving the machine.
+Responses can also be scripted one by one, e.g. replaying a recording,
+see `ScriptedResponse`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict, deque
+from typing import NamedTuple
+
+from aiohttp import web
+
+
+class MockProviderConfig(NamedTuple):
+    """Behaviour of the mock provider.
+
+    Attributes
+    ----------
+    latency_ms : float
+        The time before the first byte of a response.
+    jitter_ms : float
+        The maximum random deviation added to the latency.
+    output_tokens : int
+        The number of words in each generated response.
+    chunk_ms : float
+        The delay between two chunks of a streamed response.
+    error_rate : float
+        The fraction of requests answered with an overloaded error.
+    """
+
+    latency_ms: float = 500.0
+    jitter_ms: float = 100.0
+    output_tokens: int = 200
+    chunk_ms: float = 5.0
+    error_rate: float = 0.0
+
+
+class ScriptedResponse(NamedTuple):
+    """A response served in place of the configured behaviour, e.g. a recorded one.
+
+    Attributes
+    ----------
+    latency_ms : float
+        The time before the first byte of the response.
+    output_chars : int
+        The length of the generated text.
+    error : bool
+        Whether to answer with an error, which the SDKs don't retry.
+    """
+
+    latency_ms: float
+    output_chars: int
+    error: bool = False
+
+
+class _Plan(NamedTuple):
+    latency_ms: float
+    words: list[str]
+    error: web.Response | None
+
+
+class MockProvider:
+    """Serve canned completions with a configurable latency.
+
+    Parameters
+    ----------
+    config : MockProviderConfig
+        The behaviour of the server.
+    seed : int
+        The seed of the latency jitter and the errors.
+    """
+
+    def __init__(self, config: MockProviderConfig, seed: int = 0) -> None:
+        self.config = config
+        self.requests: Counter[str] = Counter()
+        # Per provider, the responses to serve before falling back to the config
+        self.script: defaultdict[str, deque[ScriptedResponse]] = defaultdict(deque)
+        self._random = random.Random(seed)  # noqa: S311
+        self._runner: web.AppRunner | None = None
+
+        self.app = web.Application()
+        self.app.router.add_post("/v1/messages", self._anthropic_messages)
+        self.app.router.add_post("/v1/chat/completions", self._openai_chat_completions)
+        self.app.router.add_get("/v1/models", self._models)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start listening and return the base URL of the server."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        # mypy(union-attr): the server is started just above
+        sockname = site._server.sockets[0].getsockname()  # type: ignore  # noqa: SLF001
+        return f"http://{host}:{sockname[1]}"
+
+    async def stop(self) -> None:
+        """Stop the server."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def _plan(self, provider: str) -> _Plan:
+        """Decide how to answer the next request of a provider."""
+        script = self.script.get(provider)
+        if script:
+            scripted = script.popleft()
+            if scripted.error:
+                error = {"type": "invalid_request_error", "message": "Scripted error (mock)"}
+                response = web.json_response({"type": "error", "error": error}, status=400)
+                return _Plan(scripted.latency_ms, [], response)
+            # Words of 5 characters, the last one shortened to the exact length
+            words = ["word "] * (scripted.output_chars // 5)
+            if scripted.output_chars % 5:
+                words.append("w" * (scripted.output_chars % 5))
+            return _Plan(scripted.latency_ms, words, None)
+
+        jitter = self._random.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+        latency_ms = max(self.config.latency_ms + jitter, 0)
+        if self._random.random() < self.config.error_rate:
+            error = {"type": "overloaded_error", "message": "Overloaded (mock)"}
+            response = web.json_response({"type": "error", "error": error}, status=529)
+            return _Plan(latency_ms, [], response)
+        return _Plan(
+            latency_ms,
+            [f"word{index} " for index in range(self.config.output_tokens)],
+            None,
+        )
+
+    async def _wait(self, plan: _Plan) -> web.Response | None:
+        """Sleep for the planned latency, and return the planned error if any."""
+        await asyncio.sleep(plan.latency_ms / 1000)
+        if plan.error is not None:
+            self.requests["error"] += 1
+        return plan.error
+
+    async def _stream(self, request: web.Request, events: list[str]) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for event in events:
+            await response.write(event.encode())
+            await asyncio.sleep(self.config.chunk_ms / 1000)
+        await response.write_eof()
+        return response
+
+    async def _anthropic_messages(self, request: web.Request) -> web.StreamResponse:
+        self.requests["anthropic"] += 1
+        body = await request.json()
+        plan = self._plan("anthropic")
+        if (error := await self._wait(plan)) is not None:
+            return error
+
+        words = plan.words
+        message = {
+            "id": f"msg_mock_{self.requests['anthropic']}",
+            "type": "message",
+            "role": "assistant",
+            "model": body["model"],
+            "content": [{"type": "text", "text": "".join(words)}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": len(json.dumps(body["messages"])) // 4,
+                "output_tokens": len(words),
+            },
+        }
+        if not body.get("stream"):
+            return web.json_response(message)
+
+        def sse(event: str, data: dict) -> str:
+            return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+        start = {**message, "content": [], "stop_reason": None}
+        events = [
+            sse("message_start", {"type": "message_start", "message": start}),
+            sse(
+                "content_block_start",
+                {
+                    "type": "content_block_start",
+                    "index": 0,
+                    "content_block": {"type": "text", "text": ""},
+                },
+            ),
+            *(
+                sse(
+                    "content_block_delta",
+                    {
+                        "type": "content_block_delta",
+                        "index": 0,
+                        "delta": {"type": "text_delta", "text": word},
+                    },
+                )
+                for word in words
+            ),
+            sse("content_block_stop", {"type": "content_block_stop", "index": 0}),
+            sse(
+                "message_delta",
+                {
+                    "type": "message_delta",
+                    "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                    "usage": {"output_tokens": len(words)},
+                },
+            ),
+            sse("message_stop", {"type": "message_stop"}),
+        ]
+        return await self._stream(request, events)
+
+    async def _openai_chat_completions(self, request: web.Request) -> web.StreamResponse:
+        self.requests["openai"] += 1
+        body = await request.json()
+        plan = self._plan("openai")
+        if (error := await self._wait(plan)) is not None:
+            return error
+
+        words = plan.words
+        completion_id = f"chatcmpl-mock-{self.requests['openai']}"
+        created = int(time.time())
+        if not body.get("stream"):
+            return web.json_response(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": body["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "".join(words)},
+                            "finish_reason": "stop",
+                        },
+                    ],
+                    "usage": {
+                        "prompt_tokens": len(json.dumps(body["messages"])) // 4,
+                        "completion_tokens": len(words),
+                        "total_tokens": len(json.dumps(body["messages"])) // 4 + len(words),
+                    },
+                },
+            )
+
+        def chunk(delta: dict, finish_reason: str | None = None) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body["model"],
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        events = [
+            chunk({"role": "assistant", "content": ""}),
+            *(chunk({"content": word}) for word in words),
+            chunk({}, "stop"),
+            "data: [DONE]\n\n",
+        ]
+        return await self._stream(request, events)
+
+    async def _models(self, _request: web.Request) -> web.Response:
+        self.requests["models"] += 1
+        return web.json_response({"object": "list", "data": [], "has_more": False})
@@ -0,0 +1,298 @@
+"""Replay a recording of the bot's traffic against the mock Discord and provider layers.
+
+Recordings are made by running the bot with `EVENT_RECORD_FILE` set. The
+recorded messages and `/talk` and `/chat` interactions are fed to the real
+handlers at their original pace, or faster with `--speed`, and the provider
+calls are answered in their recorded order with the recorded latency,
+response length and status. Contents aren't recorded, so placeholder text
+of the recorded length stands in for them.
+
+Threads are created the first time one of their messages is replayed, with
+as many placeholder messages as they held at that point. The bot's own
+messages are not replayed since the replayed bot sends its own. Other
+commands are counted but skipped.
+
+Examples
+--------
+    python -m benchmarks.replay events.jsonl.gz
+    python -m benchmarks.replay events.jsonl.gz --speed 10 --json replay.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from discord import app_commands
+
+from benchmarks._env import CLAUDE_MODEL, prepare_environment
+from benchmarks.fakes import (
+    FakeChannel,
+    FakeInteraction,
+    FakeMessage,
+    FakeRest,
+    FakeThread,
+    FakeUser,
+)
+from benchmarks.load import LoadTest
+from benchmarks.metrics import format_summary
+from benchmarks.mock_provider import MockProvider, MockProviderConfig, ScriptedResponse
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine
+
+logger = logging.getLogger(__name__)
+
+# The version of `EventRecorder`'s format that can be replayed
+_RECORDING_VERSION = 1
+# The length of the placeholder messages of a conversation that predates the recording
+_SEEDED_MESSAGE_CHARS = 200
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line arguments of the replay."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", type=Path, help="file written by the event recorder")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="time acceleration, 0 replays without waiting but in order (default: 1)",
+    )
+    parser.add_argument("--rest-latency-ms", type=float, default=0.0, help="Discord REST latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="write the results to this file")
+    parser.add_argument("--log", default="WARNING", help="log level of the bot")
+    return parser.parse_args(argv)
+
+
+def load_recording(path: Path) -> list[dict[str, Any]]:
+    """Read the records of a recording, oldest first.
+
+    A recorder appends to an existing file, so only the first recording
+    session of a file is read.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a recording in a supported format.
+    """
+    opener = gzip.open if path.suffix == ".gz" else open
+    records = []
+    with opener(path, "rt", encoding="utf-8") as file:
+        header = json.loads(file.readline() or "{}")
+        if header.get("kind") != "header" or header.get("version") != _RECORDING_VERSION:
+            msg = f"{path} is not a recording of version {_RECORDING_VERSION}."
+            raise ValueError(msg)
+        for line in file:
+            record = json.loads(line)
+            if record["kind"] == "header":
+                logger.warning("Only the first of the recordings in %s is replayed", path)
+                break
+            records.append(record)
+    return records
+
+
+class ReplayTest(LoadTest):
+    """Feed the recorded events to the bot's handlers on the recorded schedule.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        The parsed command line arguments.
+    rest : FakeRest
+        The simulated Discord REST API.
+    """
+
+    def __init__(self, args: argparse.Namespace, rest: FakeRest) -> None:
+        super().__init__(args, rest)
+        self.threads: dict[int, FakeThread] = {}
+        self.channels: dict[int, FakeChannel] = {}
+        self.skipped: Counter[str] = Counter()
+        self.handlers: dict[str, Callable[[dict[str, Any]], Coroutine[Any, Any, None]]] = {
+            "message": self.replay_message,
+            "interaction": self.replay_interaction,
+            "thread_update": self.replay_thread_update,
+            "thread_delete": self.replay_thread_delete,
+        }
+
+    def _recorded_user(self, pseudonym: int) -> FakeUser:
+        return FakeUser(pseudonym, f"user{pseudonym}")
+
+    def _thread(self, channel: int, author: FakeUser, state: dict[str, Any]) -> FakeThread:
+        """Return the thread of a recorded channel, creating it on first sight."""
+        thread = self.threads.get(channel)
+        if thread is not None:
+            return thread
+
+        talk = state["talk"]
+        thread = FakeThread(
+            self.rest,
+            self.guild,
+            name=f"{self.talk.TALK_THREAD_PREFIX} replay" if talk else "replay",
+            owner=self.bot_user if state["owned"] else author,
+        )
+        # The message being replayed is already counted
+        for turn in range(state["message_count"] - 1):
+            sender = author if turn % 2 == 0 else self.bot_user
+            thread.add_message(sender, "x" * _SEEDED_MESSAGE_CHARS)
+        if talk and state["owned"]:
+            self.talk.system_prompt_dict[thread.id] = self.yml.TALK_SYSTEM
+            self.model_params.set_model_params(thread.id, self.claude_params)
+        self.threads[channel] = thread
+        return thread
+
+    async def replay_message(self, event: dict[str, Any]) -> None:
+        """Send a recorded message to `on_message`."""
+        if event["own"]:
+            self.skipped["own message"] += 1
+            return
+
+        author = self._recorded_user(event["author"])
+        content = "x" * event["content_len"]
+        state = event.get("thread")
+        if state is None:
+            channel = self.channels.setdefault(event["channel"], FakeChannel(self.guild))
+            message = FakeMessage(self.rest, channel, author, content)
+        else:
+            thread = self._thread(event["channel"], author, state)
+            thread.archived = state["archived"]
+            thread.locked = state["locked"]
+            message = thread.add_message(author, content)
+        await self._measure_turn(self.event.on_message, message)
+
+    async def replay_interaction(self, event: dict[str, Any]) -> None:
+        """Invoke the command of a recorded interaction."""
+        command = event["command"]
+        interaction = FakeInteraction(
+            self.rest,
+            self.guild,
+            self._recorded_user(event["user"]),
+            self.bot_user,
+        )
+        prompt = "x" * event["options"].get("prompt", 0)
+        if command == "talk":
+            await self._measure_turn(
+                self._invoke,
+                self.talk.talk_command,
+                interaction,
+                prompt=prompt,
+                model=app_commands.Choice(name="Bench", value=CLAUDE_MODEL),
+            )
+        elif command == "chat":
+            await self._measure_turn(
+                self._invoke,
+                self.chat.chat_command,
+                interaction,
+                prompt=prompt,
+            )
+        else:
+            self.skipped[f"/{command}"] += 1
+
+    async def replay_thread_update(self, event: dict[str, Any]) -> None:
+        """Archive or lock a thread like the recorded update did."""
+        thread = self.threads.get(event["channel"])
+        if thread is not None:
+            thread.archived = event["thread"]["archived"]
+            thread.locked = event["thread"]["locked"]
+
+    async def replay_thread_delete(self, event: dict[str, Any]) -> None:
+        """Forget a deleted thread."""
+        self.threads.pop(event["channel"], None)
+
+    async def replay(self, events: list[dict[str, Any]]) -> None:
+        """Dispatch the events on the recorded schedule and wait for them to be handled.
+
+        Each event is handled in its own task, so that the handlers overlap
+        like they did when they were recorded.
+        """
+        events = [event for event in events if event["kind"] in self.handlers]
+        if not events:
+            return
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first = events[0]["t"]
+        tasks = []
+        for event in events:
+            delay = (
+                (event["t"] - first) / self.args.speed - (loop.time() - started)
+                if self.args.speed > 0
+                else 0
+            )
+            # Also lets the previous event's task start, so that the order is kept
+            await asyncio.sleep(max(delay, 0))
+            tasks.append(asyncio.create_task(self.handlers[event["kind"]](event)))
+        await asyncio.gather(*tasks)
+
+
+def script_provider(provider: MockProvider, events: list[dict[str, Any]], speed: float) -> None:
+    """Queue the recorded provider responses, with their latency scaled by the speed."""
+    scale = 1 / speed if speed > 0 else 0.0
+    for event in events:
+        if event["kind"] == "provider":
+            provider.script[event["provider"]].append(
+                ScriptedResponse(
+                    latency_ms=event["duration_ms"] * scale,
+                    output_chars=event["response_chars"],
+                    error=event["status"] != "SUCCESS",
+                ),
+            )
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Replay the recording and return the results."""
+    events = load_recording(args.recording)
+    # Unscripted requests, e.g. beyond the end of the recording, are answered at once
+    provider = MockProvider(
+        MockProviderConfig(latency_ms=0, jitter_ms=0, output_tokens=50, chunk_ms=0),
+        seed=args.seed,
+    )
+    script_provider(provider, events, args.speed)
+    provider_url = await provider.start()
+    rest = FakeRest(args.rest_latency_ms / 1000)
+
+    with tempfile.TemporaryDirectory(prefix="comet-replay-") as workdir:
+        prepare_environment(Path(workdir), provider_url)
+        replay = ReplayTest(args, rest)
+        await replay.setup()
+        try:
+            replay.recorder.reset()
+            await replay.replay(events)
+        finally:
+            await replay.completion.close_clients()
+            await provider.stop()
+
+    summary = replay.recorder.summary()
+    summary["recorded"] = dict(Counter(event["kind"] for event in events))
+    summary["skipped"] = dict(replay.skipped)
+    summary["rest_routes"] = dict(rest.routes)
+    summary["provider_requests"] = dict(provider.requests)
+    summary["unused_provider_responses"] = {
+        name: len(script) for name, script in provider.script.items() if script
+    }
+    return summary
+
+
+def main() -> None:
+    """Entry point of `python -m benchmarks.replay`."""
+    args = parse_args()
+    logging.basicConfig(level=args.log.upper())
+    summary = asyncio.run(run(args))
+    print(format_summary(args.recording.name, summary))  # noqa: T201
+    print(f"recorded: {summary['recorded']}, skipped: {summary['skipped'] or '-'}")  # noqa: T201
+    if summary["unused_provider_responses"]:
+        print(f"unused provider responses: {summary['unused_provider_responses']}")  # noqa: T201
+    if args.json is not None:
+        args.json.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
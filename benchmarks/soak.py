@@ -0,0 +1,331 @@
+"""Simulate weeks of uptime at accelerated speed and look for memory growth.
+
+Each simulated day starts new conversations with `/talk`, continues the
+active ones through `on_message`, and retires the threads that reached
+the end of their lifetime, like Discord archiving idle threads. After
+each day, the RSS, the caches registered with `RuntimeStats` and a
+`tracemalloc` snapshot grouped by module are sampled.
+
+A series is flagged as unbounded when it is still growing in the second
+half of the run at least half as fast as in the first half; structures
+that level off are not flagged. A cache with a maximum size, like the
+TTL caches, is only flagged once it holds more entries than that.
+
+The fake Discord objects bypass discord.py's gateway state, so its
+message and member caches are not exercised here; their size is set by
+`MEMORY_PROFILE` rather than by uptime.
+
+Examples
+--------
+    python -m benchmarks.soak --days 30 --threads-per-day 50 --turns-per-day 300
+    python -m benchmarks.soak --days 60 --fail-on-growth --json soak.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import random
+import sys
+import sysconfig
+import tempfile
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from discord import app_commands
+
+from benchmarks._env import CLAUDE_MODEL, prepare_environment
+from benchmarks.fakes import FakeInteraction, FakeRest
+from benchmarks.load import LoadTest
+from benchmarks.mock_provider import MockProvider, MockProviderConfig
+
+if TYPE_CHECKING:
+    from benchmarks.fakes import FakeThread, FakeUser
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+_STDLIB = Path(sysconfig.get_paths()["stdlib"])
+# Allocations made by the harness itself, e.g. the fake threads, are not the bot's
+_EXCLUDED = [
+    tracemalloc.Filter(inclusive=False, filename_pattern=str(_REPO_ROOT / "benchmarks" / "*")),
+    tracemalloc.Filter(inclusive=False, filename_pattern=tracemalloc.__file__),
+]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line arguments of the soak benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=30, help="simulated days")
+    parser.add_argument("--threads-per-day", type=int, default=20, help="/talk calls per day")
+    parser.add_argument("--turns-per-day", type=int, default=100, help="messages per day")
+    parser.add_argument(
+        "--thread-lifetime",
+        type=int,
+        default=2,
+        help="days a thread stays active (default: 2)",
+    )
+    parser.add_argument("--concurrency", type=int, default=20, help="turns run concurrently")
+    parser.add_argument("--warmup-days", type=int, default=2, help="days ignored by the analysis")
+    parser.add_argument(
+        "--min-growth-kib",
+        type=float,
+        default=256.0,
+        help="smallest module growth that can be flagged (default: 256)",
+    )
+    parser.add_argument(
+        "--min-growth-entries",
+        type=int,
+        default=10,
+        help="smallest cache growth that can be flagged (default: 10)",
+    )
+    parser.add_argument("--top", type=int, default=10, help="modules shown in the report")
+    parser.add_argument("--fail-on-growth", action="store_true", help="exit 1 if flagged")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="write the results to this file")
+    parser.add_argument("--log", default="CRITICAL", help="log level of the bot")
+    return parser.parse_args(argv)
+
+
+def module_of(filename: str) -> str:
+    """Name the module or package that an allocation's file belongs to."""
+    path = Path(filename)
+    if "site-packages" in path.parts:
+        return path.parts[path.parts.index("site-packages") + 1].removesuffix(".py")
+    if path.is_relative_to(_REPO_ROOT):
+        return ".".join(path.relative_to(_REPO_ROOT).with_suffix("").parts)
+    if path.is_relative_to(_STDLIB):
+        return f"stdlib.{path.relative_to(_STDLIB).parts[0].removesuffix('.py')}"
+    return filename
+
+
+def is_unbounded(values: list[float], min_growth: float) -> bool:
+    """Tell whether a series keeps growing instead of leveling off.
+
+    Parameters
+    ----------
+    values : list[float]
+        The samples, oldest first.
+    min_growth : float
+        The smallest total growth worth flagging.
+
+    Returns
+    -------
+    bool
+        True if the series grew by at least `min_growth` and grew in its
+        second half at least half as much as in its first half.
+    """
+    if len(values) < 4:  # noqa: PLR2004
+        return False
+    middle = len(values) // 2
+    first_half = values[middle] - values[0]
+    second_half = values[-1] - values[middle]
+    return (
+        values[-1] - values[0] >= min_growth and second_half > 0 and second_half >= first_half / 2
+    )
+
+
+class SoakTest(LoadTest):
+    """Run the simulated days and sample the memory after each of them.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        The parsed command line arguments.
+    rest : FakeRest
+        The simulated Discord REST API.
+    """
+
+    def __init__(self, args: argparse.Namespace, rest: FakeRest) -> None:
+        super().__init__(args, rest)
+        self.rng = random.Random(args.seed)  # noqa: S311
+        # (day the thread was created, thread, user talking in it)
+        self.active: list[tuple[int, FakeThread, FakeUser]] = []
+        self.users = 0
+        self.samples: list[dict[str, Any]] = []
+        self.modules: defaultdict[str, list[float]] = defaultdict(list)
+
+    async def _bounded(self, coros: list[Any], limit: int) -> None:
+        semaphore = asyncio.Semaphore(limit)
+
+        async def run(coro: Any) -> None:  # noqa: ANN401
+            async with semaphore:
+                await coro
+
+        await asyncio.gather(*(run(coro) for coro in coros))
+
+    async def _talk(self, day: int) -> None:
+        """Start a conversation with `/talk` and keep its thread active."""
+        user = self._user(self.users)
+        self.users += 1
+        interaction = FakeInteraction(self.rest, self.guild, user, self.bot_user)
+        await self._measure_turn(
+            self._invoke,
+            self.talk.talk_command,
+            interaction,
+            prompt=f"Hello from {user.name} on day {day}.",
+            model=app_commands.Choice(name="Bench", value=CLAUDE_MODEL),
+        )
+        if interaction.original is not None and interaction.original.thread is not None:
+            self.active.append((day, interaction.original.thread, user))
+
+    async def _reply(self, thread: FakeThread, user: FakeUser) -> None:
+        message = thread.add_message(user, f"Another message from {user.name}.")
+        await self._measure_turn(self.event.on_message, message)
+
+    async def simulate_day(self, day: int) -> None:
+        """Run one day of traffic, then retire the threads that expired."""
+        # The per-turn records of the harness would otherwise grow with the run
+        self.recorder.reset()
+        await self._bounded(
+            [self._talk(day) for _ in range(self.args.threads_per_day)],
+            self.args.concurrency,
+        )
+        if self.active:
+            picks = [self.rng.choice(self.active) for _ in range(self.args.turns_per_day)]
+            await self._bounded(
+                [self._reply(thread, user) for _, thread, user in picks],
+                self.args.concurrency,
+            )
+
+        for created, thread, _ in self.active:
+            if day - created + 1 >= self.args.thread_lifetime:
+                thread.archived = True
+        # Only the bot's own references to retired threads remain
+        self.active = [entry for entry in self.active if not entry[1].archived]
+
+    def sample(self, day: int) -> None:
+        """Record the RSS, cache sizes and traced memory per module."""
+        stats_module = sys.modules["src.comet.utils.stats"]
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_EXCLUDED)
+        per_module: defaultdict[str, float] = defaultdict(float)
+        for stat in snapshot.statistics("filename"):
+            per_module[module_of(stat.traceback[0].filename)] += stat.size
+        for module, size in per_module.items():
+            # Modules that appear later count as having been empty until then
+            series = self.modules[module]
+            series.extend([0.0] * (len(self.samples) - len(series)))
+            series.append(size)
+        for series in self.modules.values():
+            series.extend([0.0] * (len(self.samples) + 1 - len(series)))
+
+        caches = stats_module.RuntimeStats().cache_infos()
+        self.samples.append(
+            {
+                "day": day,
+                "rss_mib": round(stats_module.rss_mib(), 2),
+                "traced_mib": round(sum(per_module.values()) / 2**20, 2),
+                "active_threads": len(self.active),
+                "caches": {name: info.size for name, info in caches.items()},
+                "cache_maxsizes": {name: info.maxsize for name, info in caches.items()},
+            },
+        )
+
+    def analyze(self) -> dict[str, Any]:
+        """Compare the samples after the warm-up and flag unbounded growth."""
+        start = min(self.args.warmup_days, max(len(self.samples) - 4, 0))
+        samples = self.samples[start:]
+        first, last = samples[0], samples[-1]
+        days = max(last["day"] - first["day"], 1)
+
+        flagged = []
+        for name in last["caches"]:
+            series = [float(sample["caches"].get(name, 0)) for sample in samples]
+            # A bounded cache filling up to its maximum size isn't a leak
+            maxsize = last["cache_maxsizes"].get(name)
+            if maxsize is not None and series[-1] <= maxsize:
+                continue
+            if is_unbounded(series, self.args.min_growth_entries):
+                growth = (series[-1] - series[0]) / days
+                flagged.append(f"cache {name}: +{growth:.1f} entries/day")
+
+        growth_by_module = {}
+        for module, series in self.modules.items():
+            window = series[start:]
+            growth_by_module[module] = window[-1] - window[0]
+            if is_unbounded(window, self.args.min_growth_kib * 2**10):
+                flagged.append(
+                    f"module {module}: +{(window[-1] - window[0]) / days / 2**10:.1f} KiB/day",
+                )
+
+        top = sorted(growth_by_module.items(), key=lambda item: item[1], reverse=True)
+        return {
+            "samples": self.samples,
+            "rss_growth_mib_per_day": round((last["rss_mib"] - first["rss_mib"]) / days, 3),
+            "top_module_growth_kib": {
+                module: round(growth / 2**10, 1) for module, growth in top[: self.args.top]
+            },
+            "flagged": flagged,
+        }
+
+
+def format_report(report: dict[str, Any]) -> str:
+    """Render the soak results as a plain text report."""
+    cache_names = sorted(report["samples"][-1]["caches"])
+    lines = [
+        f"{'day':>4}{'rss MiB':>10}{'traced MiB':>12}{'threads':>9}"
+        + "".join(f"{name:>16}" for name in cache_names),
+    ]
+    lines += [
+        f"{sample['day']:>4}{sample['rss_mib']:>10.1f}{sample['traced_mib']:>12.2f}"
+        f"{sample['active_threads']:>9}"
+        + "".join(f"{sample['caches'].get(name, 0):>16}" for name in cache_names)
+        for sample in report["samples"]
+    ]
+    lines.append(f"\nRSS growth: {report['rss_growth_mib_per_day']:+.3f} MiB/day")
+    lines.append("Top module growth after warm-up:")
+    lines += [
+        f"  {growth:>10.1f} KiB  {module}"
+        for module, growth in report["top_module_growth_kib"].items()
+    ]
+    lines.append("Unbounded growth:" if report["flagged"] else "No unbounded growth found")
+    lines += [f"  {flag}" for flag in report["flagged"]]
+    return "\n".join(lines)
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Run the soak test and return its report."""
+    # Conversations happen back to back, only the amount of traffic matters
+    provider = MockProvider(
+        MockProviderConfig(latency_ms=0, jitter_ms=0, output_tokens=50, chunk_ms=0),
+        seed=args.seed,
+    )
+    provider_url = await provider.start()
+    rest = FakeRest()
+
+    with tempfile.TemporaryDirectory(prefix="comet-soak-") as workdir:
+        prepare_environment(Path(workdir), provider_url)
+        soak = SoakTest(args, rest)
+        await soak.setup()
+        try:
+            tracemalloc.start()
+            for day in range(args.days):
+                await soak.simulate_day(day)
+                soak.sample(day)
+                logging.getLogger(__name__).debug("Simulated day %d", day)
+        finally:
+            tracemalloc.stop()
+            await soak.completion.close_clients()
+            await provider.stop()
+
+    return soak.analyze()
+
+
+def main() -> None:
+    """Entry point of `python -m benchmarks.soak`."""
+    args = parse_args()
+    logging.basicConfig(level=args.log.upper())
+    report = asyncio.run(run(args))
+    print(format_report(report))  # noqa: T201
+    if args.json is not None:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.fail_on_growth and report["flagged"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
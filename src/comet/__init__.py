@@ -0,0 +1,4 @@
+import time
+
+# Reference point for measuring how long the application takes to import
+IMPORT_STARTED_AT: float = time.perf_counter()
@@ -1,18 +1,42 @@
 import asyncio
 import os
 import signal
+import time
 from collections.abc import Generator
 from contextlib import contextmanager
 
-from dotenv import load_dotenv
-
-from src.comet._cli import parse_args_and_setup_logging
-from src.comet.db.dao.access_privilege_dao import AccessPrivilegeDAO
-from src.comet.db.dao.usage_limit_dao import UsageLimitDAO
+from src.comet import IMPORT_STARTED_AT
+from src.comet._cli import parse_args, parse_args_and_setup_logging
+from src.comet.ai.services.completion import close_clients
+from src.comet.ai.services.warmup import keep_providers_warm, warm_up_providers
+from src.comet.analytics.tokens import token_accounting
+from src.comet.analytics.usage import usage_analytics
+from src.comet.config.env import (
+    GENERATION_WORKERS,
+    IMPORT_TIME_BUDGET_MS,
+    USAGE_FLUSH_INTERVAL_SECONDS,
+    WORKER_CONCURRENCY,
+    WORKER_HEALTH_INTERVAL_SECONDS,
+    WORKER_JOB_TIMEOUT_SECONDS,
+    WORKER_QUEUE_SIZE,
+)
+from src.comet.db.maintenance import (
+    RETENTION_INTERVAL_SECONDS,
+    purge_expired_token_usage,
+    purge_expired_usage_counts,
+)
+from src.comet.db.migrations import SchemaMigrator
 from src.comet.discord.client import BotClient
 from src.comet.discord.commands import *
 from src.comet.discord.event import *
-from src.comet.utils.scheduler import TaskScheduler
+from src.comet.fixpy.precheck import precheck_worker
+from src.comet.scheduler.jobs import CatchUp, job_scheduler
+from src.comet.scheduler.triggers import IntervalTrigger
+from src.comet.utils.logger import stop_logger
+from src.comet.utils.recorder import event_recorder
+from src.comet.workers.pool import WorkerPool
+
+IMPORT_TIME_MS: float = (time.perf_counter() - IMPORT_STARTED_AT) * 1000
 
 
 @contextmanager
@@ -44,32 +68,95 @@ async def main() -> None:
     """Entry point for the 'comet'."""
     logger = parse_args_and_setup_logging()
 
-    # Initialize database tables
-    await AccessPrivilegeDAO().create_table()
-    await UsageLimitDAO().create_table()
-    await UsageLimitDAO().create_commands_usage_table()
+    if IMPORT_TIME_MS > IMPORT_TIME_BUDGET_MS:
+        logger.warning(
+            "Importing the application took %.0f ms, over the budget of %d ms",
+            IMPORT_TIME_MS,
+            IMPORT_TIME_BUDGET_MS,
+        )
+    else:
+        logger.info("Imported the application in %.0f ms", IMPORT_TIME_MS)
 
-    # Start the usage reset scheduler and store the task reference
-    reset_scheduler_task = asyncio.create_task(TaskScheduler.start_reset_usage_scheduler())
-    logger.info("Started usage reset scheduler")
+    # Create or update the database tables
+    await SchemaMigrator().migrate()
+
+    # Maintenance jobs
+    job_scheduler.add_job(
+        "usage-retention",
+        purge_expired_usage_counts,
+        IntervalTrigger(RETENTION_INTERVAL_SECONDS),
+        jitter=60,
+    )
+    job_scheduler.add_job(
+        "token-usage-retention",
+        purge_expired_token_usage,
+        IntervalTrigger(RETENTION_INTERVAL_SECONDS),
+        jitter=60,
+    )
+    # The counts in memory are lost with the process, there's nothing to catch up on
+    job_scheduler.add_job(
+        "usage-analytics-flush",
+        usage_analytics.flush,
+        IntervalTrigger(USAGE_FLUSH_INTERVAL_SECONDS),
+        catch_up=CatchUp.SKIP,
+        persist=False,
+    )
+    job_scheduler.add_job(
+        "token-accounting-flush",
+        token_accounting.flush,
+        IntervalTrigger(USAGE_FLUSH_INTERVAL_SECONDS),
+        catch_up=CatchUp.SKIP,
+        persist=False,
+    )
+    await job_scheduler.start()
 
-    load_dotenv()
     # This environment variable is specific to this function
+    # (.env has already been loaded by the src.comet.config package)
     DISCORD_BOT_TOKEN: str = os.environ["DISCORD_BOT_TOKEN"]  # noqa: N806
 
     client = BotClient.get_instance()
 
+    background_tasks: list[asyncio.Task[None]] = []
+    worker_pool: WorkerPool | None = None
+    if GENERATION_WORKERS > 0:
+        # Generation runs in worker processes, which warm up their own provider connections
+        worker_pool = WorkerPool(
+            size=GENERATION_WORKERS,
+            concurrency=WORKER_CONCURRENCY,
+            queue_size=WORKER_QUEUE_SIZE,
+            job_timeout=WORKER_JOB_TIMEOUT_SECONDS,
+            health_interval=WORKER_HEALTH_INTERVAL_SECONDS,
+            log_level=parse_args().log,
+        )
+        await worker_pool.start()
+    else:
+        # Open the provider connections while the client logs in and connects to the gateway
+        background_tasks += [
+            asyncio.create_task(warm_up_providers(), name="provider-warm-up"),
+            asyncio.create_task(keep_providers_warm(), name="provider-keep-alive"),
+        ]
+
     try:
         await client.start(DISCORD_BOT_TOKEN)
     except Exception:
         logger.exception("An unexpected error occurred")
     finally:
         with ignore_signals([signal.SIGTERM, signal.SIGINT]):
-            # Cancel the scheduler task before cleanup
-            if not reset_scheduler_task.done():
-                reset_scheduler_task.cancel()
+            # Cancel the background tasks before cleanup
+            for task in background_tasks:
+                if not task.done():
+                    task.cancel()
+            await job_scheduler.stop()
             await client.cleanup_hook()
+            if worker_pool is not None:
+                await worker_pool.stop()
+            await close_clients()
+            precheck_worker.close()
+            await usage_analytics.flush()
+            await token_accounting.flush()
+            event_recorder.close()
             logger.info("Cleanup process finished")
+            stop_logger()
 
 
 if __name__ == "__main__":
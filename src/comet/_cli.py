@@ -1,15 +1,49 @@
 import argparse
+import functools
 from logging import Logger
 from typing import cast
 
 from src.comet.utils.logger import setup_logger
 
 
+@functools.cache
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments.
+
+    The arguments are parsed only once, later calls return the same
+    namespace.
+
+    Returns
+    -------
+    argparse.Namespace
+        The parsed command line arguments.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--log",
+        default="INFO",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=["text", "json"],
+        default="text",
+    )
+    parser.add_argument(
+        "--force-sync",
+        action="store_true",
+        help="sync the application commands even if they are unchanged",
+    )
+
+    return parser.parse_args()
+
+
 def parse_args_and_setup_logging() -> Logger:
     """Parse command line arguments and set up logging configuration.
 
     This function initializes argument parsing for command line options
-    and sets up the logging configuration for the application.
+    and sets up the logging configuration for the application. It is
+    meant to be called once by the entry point, modules obtain their
+    logger with `logging.getLogger(__name__)`.
 
     Returns
     -------
@@ -18,12 +52,6 @@ def parse_args_and_setup_logging() -> Logger:
         by the --log command line argument.
 
     """
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "--log",
-        default="INFO",
-    )
-
-    args = parser.parse_args()
+    args = parse_args()
     # Due to mypy not correctly recognizing the type, an explicit cast is required
-    return cast("Logger", setup_logger(args.log))
+    return cast("Logger", setup_logger(args.log, log_format=args.log_format))
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import aiohttp
+
+if TYPE_CHECKING:
+    from discord import Attachment
+
+_CHUNK_BYTES = 64 * 1024
+_TIMEOUT = aiohttp.ClientTimeout(total=30)
+
+
+async def read_text_attachment(attachment: Attachment, max_bytes: int) -> str:
+    """Download a text attachment, up to `max_bytes`.
+
+    The attachment is streamed, so that a file larger than announced is
+    rejected without being held in memory.
+
+    Parameters
+    ----------
+    attachment : Attachment
+        The attachment.
+    max_bytes : int
+        The maximum size of the attachment.
+
+    Returns
+    -------
+    str
+        The text of the attachment, decoded as UTF-8.
+
+    Raises
+    ------
+    ValueError
+        If the attachment is larger than `max_bytes`, or isn't UTF-8 text.
+    aiohttp.ClientError
+        If the attachment can't be downloaded.
+    """
+    if attachment.size > max_bytes:
+        msg = f"The file is larger than {max_bytes:,} bytes."
+        raise ValueError(msg)
+
+    data = bytearray()
+    async with (
+        aiohttp.ClientSession(timeout=_TIMEOUT) as session,
+        session.get(attachment.url, raise_for_status=True) as response,
+    ):
+        async for chunk in response.content.iter_chunked(_CHUNK_BYTES):
+            data += chunk
+            if len(data) > max_bytes:
+                msg = f"The file is larger than {max_bytes:,} bytes."
+                raise ValueError(msg)
+
+    try:
+        # utf-8-sig drops the byte order mark of files saved by some editors
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError as err:
+        msg = "The file isn't UTF-8 text."
+        raise ValueError(msg) from err
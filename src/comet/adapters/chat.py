@@ -1,15 +1,33 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 from discord import Message as DiscordMessage
 from discord import MessageType
-from pydantic import BaseModel
 
 from src.comet.config.env import BOT_NAME
+from src.comet.utils.cache import TTLCache
+from src.comet.utils.stats import RuntimeStats
+
+if TYPE_CHECKING:
+    from datetime import datetime
+
+# (message id, edited_at) -> converted message, so that each turn only converts the new messages.
+# A thread's history is refetched on every turn, well within the lifetime of an entry.
+_converted_messages: TTLCache[tuple[int, datetime | None], ChatMessage] = TTLCache(
+    maxsize=4096,
+    ttl=3600,
+)
+RuntimeStats().register_cache("chat_messages", _converted_messages.cache_info)
 
 
-class ChatMessage(BaseModel):
+class ChatMessage:
     """Represents a single chat message with a role and content.
 
+    Chat messages are built for every message of a conversation on every
+    turn, so this is a plain slotted class rather than a pydantic model,
+    and it is treated as immutable so that its rendered form can be cached.
+
     Attributes
     ----------
     role : str
@@ -18,31 +36,47 @@ class ChatMessage(BaseModel):
         The content of the message. Defaults to None.
     """
 
-    role: str
-    content: str | None = None
+    __slots__ = ("_formatted", "content", "role")
+
+    def __init__(self, role: str, content: str | None = None) -> None:
+        self.role = role
+        self.content = content
+        self._formatted: dict[str, str] | None = None
+
+    def __repr__(self) -> str:
+        """Return a representation of the message for debugging."""
+        return f"ChatMessage(role={self.role!r}, content={self.content!r})"
 
     def format_message(self) -> dict[str, str]:
         """Represent a single chat message with a role and content.
 
+        The dictionary is built on the first call and shared by the later
+        ones, so it must not be modified.
+
         Returns
         -------
         dict
             A dictionary with 'role' and 'content' keys.
         """
-        return {
-            # If self.role matches BOT_NAME, return "assistant",
-            # otherwise if self.role is "developer" or "assistant", use that value,
-            # otherwise treat it as "user"
-            "role": "assistant"
-            if self.role == BOT_NAME
-            else (self.role if self.role in ("developer", "assistant") else "user"),
-            "content": self.content or "",
-        }
+        if self._formatted is None:
+            self._formatted = {
+                # If self.role matches BOT_NAME, return "assistant",
+                # otherwise if self.role is "developer" or "assistant", use that value,
+                # otherwise treat it as "user"
+                "role": "assistant"
+                if self.role == BOT_NAME
+                else (self.role if self.role in ("developer", "assistant") else "user"),
+                "content": self.content or "",
+            }
+        return self._formatted
 
     @classmethod
-    async def from_discord_message(cls, message: DiscordMessage) -> ChatMessage | None:
+    def from_discord_message(cls, message: DiscordMessage) -> ChatMessage | None:
         """Convert a DiscordMessage instance to a ChatMessage instance.
 
+        Messages converted earlier are returned from a cache until they are
+        edited.
+
         Parameters
         ----------
         message : DiscordMessage
@@ -58,27 +92,34 @@ class ChatMessage(BaseModel):
         Examples
         --------
         >>> discord_msg = ...  # Discord message object
-        >>> chat_msg = await ChatMessage.from_discord_message(discord_msg)
+        >>> chat_msg = ChatMessage.from_discord_message(discord_msg)
         >>> if chat_msg:
         ...     print(chat_msg.format_message())
         """
+        key = (message.id, message.edited_at)
+        chat_message = _converted_messages.get(key)
+        if chat_message is None:
+            chat_message = cls._convert(message)
+            if chat_message is not None:
+                _converted_messages.set(key, chat_message)
+        return chat_message
+
+    @classmethod
+    def _convert(cls, message: DiscordMessage) -> ChatMessage | None:
         # Process thread starter message
-        if (
-            message.type == MessageType.thread_starter_message
-            and message.reference is not None
-            and message.reference.cached_message
-            and message.reference.cached_message.embeds
-            and message.reference.cached_message.embeds[0].fields
-        ):
-            field = message.reference.cached_message.embeds[0].fields[0]
-            return cls(role=message.author.name, content=field.value)
+        if message.type == MessageType.thread_starter_message and message.reference is not None:
+            # The starter may have left the message cache, but Discord sends it along
+            starter = message.reference.cached_message or message.reference.resolved
+            if isinstance(starter, DiscordMessage) and starter.embeds and starter.embeds[0].fields:
+                field = starter.embeds[0].fields[0]
+                return cls(role=message.author.name, content=field.value)
         # Process regular message
         if message.content is not None:
             return cls(role=message.author.name, content=message.content)
         return None
 
 
-class ChatHistory(BaseModel):
+class ChatHistory:
     """Manage a collection of chat messages.
 
     Attributes
@@ -87,11 +128,16 @@ class ChatHistory(BaseModel):
         A list of ChatMessage objects representing the chat history.
     """
 
-    messages: list[ChatMessage]
+    __slots__ = ("messages",)
+
+    def __init__(self, messages: list[ChatMessage]) -> None:
+        self.messages = messages
 
     def render_message(self) -> list[dict[str, str]]:
         """Render the chat messages into a list of dictionaries.
 
+        The dictionaries are cached by the messages and must not be modified.
+
         Returns
         -------
         list[dict[str, str]]
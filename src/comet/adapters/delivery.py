@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import io
+import re
+from typing import TYPE_CHECKING, NamedTuple
+
+from discord import File
+
+from src.comet.config.env import ATTACHMENT_THRESHOLD_CHARS, MAX_CHARS_PER_MESSAGE
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine
+    from typing import Any
+
+# The opening or closing line of a fenced code block, up to 3 spaces indented
+_FENCE = re.compile(r" {0,3}(`{3,}|~{3,})")
+# The length of the beginning of a response sent with the response attached
+_PREVIEW_CHARS = 600
+# The language of a code block reopened in the next message is cut to this length
+_MAX_LANGUAGE_CHARS = 20
+_ATTACHMENT_FILENAME = "response.md"
+
+
+class Delivery(NamedTuple):
+    """How a response is sent to Discord.
+
+    Attributes
+    ----------
+    messages : list[str]
+        The messages to send, in order.
+    attachment : str | None
+        The full response, attached to the last message as a file, or None.
+    """
+
+    messages: list[str]
+    attachment: str | None = None
+
+
+def _cut_line(line: str, width: int) -> tuple[str, str | None]:
+    """Cut a line longer than `width` at its last space, or anywhere if it has none.
+
+    Returns the first piece, and the rest of the line or None if it fits.
+    """
+    if len(line) <= width:
+        return line, None
+    cut = line.rfind(" ", 0, width + 1)
+    if cut <= 0:
+        return line[:width], line[width:]
+    return line[:cut], line[cut + 1 :]
+
+
+def _reopening(line: str) -> str:
+    """Return the line reopening a code block: its fence and language, without other info."""
+    match = _FENCE.match(line)
+    if match is None:
+        return line
+    info = line[match.end() :].split(maxsplit=1)
+    language = info[0][:_MAX_LANGUAGE_CHARS] if info else ""
+    return f"{match.group(1)}{language}"
+
+
+class _MarkdownSplitter:
+    """Pack the lines of a Markdown text into chunks of a maximum length.
+
+    A chunk ends at the last paragraph break that keeps it at least half
+    full, or else at a line break. A code block split across chunks is
+    closed at the end of one and reopened, with its fence and language, at
+    the start of the next, so that each chunk renders on its own, unless
+    the fences would take more than half of a chunk.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.chunks: list[str] = []
+        self.lines: list[str] = []
+        # The length of the lines joined by newlines
+        self.size = 0
+        # The line reopening the code block the lines end in, and its fence
+        self.opening: str | None = None
+        self.fence = ""
+        # The number of lines up to the last paragraph break outside of a code block
+        self.paragraph_end = 0
+        # Whether the lines are only the reopening of the code block of the previous chunk
+        self.reopened = False
+
+    def _carried(self, opening: str | None, fence: str) -> bool:
+        # Whether a code block split across chunks is closed and reopened
+        return opening is not None and len(opening) + len(fence) + 2 <= self.limit // 2
+
+    def _reserve(self, opening: str | None, fence: str) -> int:
+        # A chunk ending in a code block is closed by its fence on a line of its own
+        return len(fence) + 1 if self._carried(opening, fence) else 0
+
+    def _width(self, line: str) -> int:
+        """Return the room for a line in a chunk holding only what it must start with."""
+        width = self.limit - self._reserve(self.opening, self.fence)
+        if self._carried(self.opening, self.fence) and self.opening is not None:
+            width -= len(self.opening) + 1
+        # An opening fence line is closed if the chunk ends after it
+        match = _FENCE.match(line) if self.opening is None else None
+        if match is not None and self._carried(_reopening(line), match.group(1)):
+            width -= len(match.group(1)) + 1
+        return max(width, 1)
+
+    def _next_state(self, line: str) -> tuple[str | None, str]:
+        match = _FENCE.match(line)
+        if self.opening is None:
+            return (_reopening(line), match.group(1)) if match else (None, "")
+        closing = match is not None and (
+            match.group(1)[0] == self.fence[0]
+            and len(match.group(1)) >= len(self.fence)
+            and not line[match.end() :].strip()
+        )
+        return (None, "") if closing else (self.opening, self.fence)
+
+    def _emit(self, lines: list[str], closing: str | None) -> None:
+        chunk = "\n".join(lines if closing is None else [*lines, closing]).strip("\n")
+        if chunk.strip():
+            self.chunks.append(chunk)
+
+    def _break(self) -> None:
+        if self.paragraph_end and self.paragraph_end >= len(self.lines) // 2:
+            # Paragraph breaks are outside of code blocks, nothing to close
+            self._emit(self.lines[: self.paragraph_end], None)
+            self.lines = self.lines[self.paragraph_end :]
+        elif self._carried(self.opening, self.fence) and self.opening is not None:
+            self._emit(self.lines, self.fence)
+            self.lines = [self.opening]
+            self.reopened = True
+        else:
+            self._emit(self.lines, None)
+            self.lines = []
+        self.size = len("\n".join(self.lines))
+        self.paragraph_end = 0
+
+    def _add_piece(self, piece: str) -> None:
+        opening, fence = self._next_state(piece)
+        # A chunk reduced to a reopened code block has room for a piece
+        while (
+            self.lines
+            and not self.reopened
+            and self.size + 1 + len(piece) + self._reserve(opening, fence) > self.limit
+        ):
+            self._break()
+        self.size += len(piece) + (1 if self.lines else 0)
+        self.lines.append(piece)
+        self.reopened = False
+        self.opening, self.fence = opening, fence
+        if self.opening is None and not piece.strip():
+            self.paragraph_end = len(self.lines)
+
+    def add(self, line: str) -> None:
+        """Add a line, ending the current chunk first if the line doesn't fit."""
+        rest: str | None = line
+        while rest is not None:
+            piece, rest = _cut_line(rest, self._width(rest))
+            self._add_piece(piece)
+
+    def finish(self) -> list[str]:
+        """Return the chunks, including the current one."""
+        self._emit(self.lines, None)
+        return self.chunks
+
+
+def split_markdown(text: str, limit: int) -> list[str]:
+    """Split a Markdown text into messages of at most `limit` characters.
+
+    Messages end at paragraph breaks where possible, and at line breaks
+    otherwise. Only lines longer than a message are cut, at their spaces.
+    A code block split across messages is closed and reopened.
+
+    Parameters
+    ----------
+    text : str
+        The text to split.
+    limit : int
+        The maximum length of a message.
+
+    Returns
+    -------
+    list[str]
+        The messages, none of them empty.
+    """
+    splitter = _MarkdownSplitter(limit)
+    for line in text.split("\n"):
+        splitter.add(line)
+    return splitter.finish()
+
+
+def plan_delivery(text: str) -> Delivery:
+    """Decide how to send a response.
+
+    A response longer than `ATTACHMENT_THRESHOLD_CHARS` is sent as a
+    single message with its beginning, and the full response attached as
+    a Markdown file. Shorter responses are split into messages of
+    `MAX_CHARS_PER_MESSAGE` characters at most.
+
+    Parameters
+    ----------
+    text : str
+        The response.
+
+    Returns
+    -------
+    Delivery
+        The messages to send, and the attachment if any.
+    """
+    if 0 < ATTACHMENT_THRESHOLD_CHARS < len(text):
+        preview = split_markdown(text, _PREVIEW_CHARS)[0]
+        note = f"*The full response ({len(text):,} characters) is attached.*"
+        return Delivery(messages=[f"{preview}\n\n{note}"], attachment=text)
+    return Delivery(messages=split_markdown(text, MAX_CHARS_PER_MESSAGE))
+
+
+async def deliver_text(
+    send: Callable[..., Coroutine[Any, Any, object]],
+    text: str,
+    **options: Any,  # noqa: ANN401
+) -> None:
+    """Send a response as planned by `plan_delivery()`.
+
+    Parameters
+    ----------
+    send : Callable[..., Coroutine[Any, Any, object]]
+        The method sending a message, e.g. `Thread.send` or `Webhook.send`.
+    text : str
+        The response.
+    **options : Any
+        The options passed to each call of `send`, e.g. `ephemeral`.
+    """
+    delivery = plan_delivery(text)
+    if not delivery.messages:
+        return
+    *leading, last = delivery.messages
+    for message in leading:
+        await send(message, **options)
+    if delivery.attachment is None:
+        await send(last, **options)
+    else:
+        file = File(io.BytesIO(delivery.attachment.encode()), filename=_ATTACHMENT_FILENAME)
+        await send(last, file=file, **options)
@@ -1,9 +1,9 @@
 from enum import Enum
+from typing import NamedTuple
 
 from discord import Colour, Embed, Thread
-from pydantic import BaseModel
 
-from src.comet.config.env import MAX_CHARS_PER_MESSAGE
+from src.comet.adapters.delivery import deliver_text
 
 
 class ResponseStatus(Enum):
@@ -24,38 +24,56 @@ class ResponseStatus(Enum):
     MODERATION_FLAGGED = 2
 
 
-class ResponseResult(BaseModel):
+class TokenUsage(NamedTuple):
+    """The tokens billed by the provider for a generation.
+
+    Attributes
+    ----------
+    input_tokens : int
+        The prompt tokens that were neither read from nor written to the cache.
+    output_tokens : int
+        The generated tokens.
+    cache_read_tokens : int
+        The prompt tokens read from the provider's prompt cache.
+    cache_write_tokens : int
+        The prompt tokens written to the provider's prompt cache.
+    """
+
+    input_tokens: int
+    output_tokens: int
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+
+    @property
+    def total(self) -> int:
+        """The number of tokens of the prompt and the response, cached or not."""
+        return sum(self)
+
+
+class ResponseResult(NamedTuple):
     """Container for AI response results.
 
-    Parameters
+    Attributes
     ----------
     status : ResponseStatus
         The status of the response generation process.
     result : str | None
         The generated text response, or None if generation failed.
+    usage : TokenUsage | None
+        The tokens billed for the generation, None if the provider didn't report them.
     """
 
     status: ResponseStatus
     result: str | None
+    usage: TokenUsage | None = None
 
 
-def _split_into_shorter_messages(message: str) -> list[str]:
-    """Split a long message into multiple shorter messages.
-
-    Parameters
-    ----------
-    message : str
-        The long message string that needs to be split.
-
-    Returns
-    -------
-    list[str]
-        A list of message segments, each within the character limit.
-    """
-    return [
-        message[i : i + MAX_CHARS_PER_MESSAGE]
-        for i in range(0, len(message), MAX_CHARS_PER_MESSAGE)
-    ]
+def moderation_flagged_embed() -> Embed:
+    """Return the embed sent in place of a response withheld by moderation."""
+    return Embed(
+        description="**WARNING** - The message was flagged by moderation and was not answered.",
+        color=Colour.orange(),
+    )
 
 
 async def send_response_result(thread: Thread, result: ResponseResult) -> None:
@@ -79,9 +97,7 @@ async def send_response_result(thread: Thread, result: ResponseResult) -> None:
                 ),
             )
         else:
-            shorter_response = _split_into_shorter_messages(result.result)
-            for res in shorter_response:
-                await thread.send(res)
+            await deliver_text(thread.send, result.result)
     elif status == ResponseStatus.ERROR:
         await thread.send(
             embed=Embed(
@@ -89,3 +105,5 @@ async def send_response_result(thread: Thread, result: ResponseResult) -> None:
                 color=Colour.red(),
             ),
         )
+    elif status == ResponseStatus.MODERATION_FLAGGED:
+        await thread.send(embed=moderation_flagged_embed())
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, Any, Self
 
+from src.comet.utils.stats import CacheInfo, RuntimeStats
+
 if TYPE_CHECKING:
     from src.comet.ai.models._types import ModelParamsType
 
@@ -16,6 +18,8 @@ class ModelParamsStore:
 
     _instance = None
     params: dict
+    hits: int
+    misses: int
 
     def __new__(cls) -> Self:
         """Create a new instance of ModelParamsStore or return the existing one.
@@ -30,6 +34,9 @@ class ModelParamsStore:
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance.params = {}
+            cls._instance.hits = 0
+            cls._instance.misses = 0
+            RuntimeStats().register_cache("model_params", cls._instance.cache_info)
         return cls._instance
 
     def set_model_params(self, key: int, config: ModelParamsType) -> None:
@@ -58,4 +65,19 @@ class ModelParamsStore:
         Any or None
             The model parameters if found, None otherwise.
         """
-        return self.params.get(key)
+        params = self.params.get(key)
+        if params is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return params
+
+    def cache_info(self) -> CacheInfo:
+        """Return the number of stored parameters and the lookup counters.
+
+        Returns
+        -------
+        CacheInfo
+            The size and hit counters of the store.
+        """
+        return CacheInfo(size=len(self.params), hits=self.hits, misses=self.misses)
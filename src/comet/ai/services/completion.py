@@ -1,18 +1,81 @@
-import anthropic
-from openai import OpenAI
+from __future__ import annotations
+
+import functools
+import logging
+from typing import TYPE_CHECKING
 
-from src.comet._cli import parse_args_and_setup_logging
 from src.comet.adapters.chat import ChatHistory, ChatMessage
-from src.comet.adapters.response import ResponseResult, ResponseStatus
-from src.comet.ai.models.claude_model import ClaudeModelParams
-from src.comet.ai.models.gpt_model import GPTModelParams
+from src.comet.adapters.response import ResponseResult, ResponseStatus, TokenUsage
+from src.comet.utils.decorators.accounting import account_generation
 from src.comet.utils.decorators.error import handle_ai_service_errors
+from src.comet.utils.decorators.recording import record_generation
+from src.comet.utils.stats import RuntimeStats
+from src.comet.workers.pool import WorkerPool
+from src.comet.workers.protocol import GenerationJob
+
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
+    from openai import AsyncOpenAI
+
+    from src.comet.ai.models._types import ModelParamsType
+    from src.comet.ai.models.claude_model import ClaudeModelParams
+    from src.comet.ai.models.gpt_model import GPTModelParams
+
+logger = logging.getLogger(__name__)
+runtime_stats = RuntimeStats()
+
+# Closes every conversation sent to the providers
+_ASSISTANT_TURN = ChatMessage(role="assistant")
+
+
+# The SDKs take most of the application's import time, so they are imported on first use.
+# The clients are shared so that every request reuses their pooled connections.
+@functools.cache
+def get_anthropic_client() -> AsyncAnthropic:
+    """Return the shared Anthropic client, creating it on first use."""
+    import anthropic  # noqa: PLC0415
+
+    return anthropic.AsyncAnthropic()
 
-anthropic_client = anthropic.Anthropic()
-openai_client = OpenAI()
-logger = parse_args_and_setup_logging()
 
+@functools.cache
+def get_openai_client() -> AsyncOpenAI:
+    """Return the shared OpenAI client, creating it on first use."""
+    import openai  # noqa: PLC0415
 
+    return openai.AsyncOpenAI()
+
+
+async def close_clients() -> None:
+    """Close the connection pools of the clients that have been created."""
+    if get_anthropic_client.cache_info().currsize:
+        await get_anthropic_client().close()
+    if get_openai_client.cache_info().currsize:
+        await get_openai_client().close()
+
+
+def _to_job(
+    provider: str,
+    system_prompt: str,
+    prompt: list[ChatMessage],
+    model_params: ModelParamsType,
+) -> GenerationJob:
+    """Describe a generation as a job for the worker processes."""
+    model = model_params.model
+    return GenerationJob(
+        # mypy(arg-type): expected Literal["anthropic", "openai"]
+        provider=provider,  # type: ignore
+        system_prompt=system_prompt,
+        messages=[(message.role, message.content) for message in prompt],
+        model=model if isinstance(model, str) else str(model.value),
+        max_tokens=model_params.max_tokens,
+        temperature=model_params.temperature,
+        top_p=model_params.top_p,
+    )
+
+
+@record_generation("anthropic")
+@account_generation
 @handle_ai_service_errors
 async def generate_anthropic_response(
     system_prompt: str,
@@ -32,23 +95,38 @@ async def generate_anthropic_response(
     model_params : ClaudeModelParams
         The model parameters.
     """
-    convo = ChatHistory(messages=[*prompt, ChatMessage(role="assistant")]).render_message()
-    result = anthropic_client.messages.create(
-        # mypy(arg-type): expected "Iterable[MessageParam]"
-        messages=convo,  # type: ignore
-        # mypy(arg-type): expected ModelParam
-        # but I specified it as app_commands.Choice[int] | str
-        model=model_params.model,  # type: ignore
-        max_tokens=model_params.max_tokens,
-        system=system_prompt,
-        temperature=model_params.temperature,
-        top_p=model_params.top_p,
-    )
+    pool = WorkerPool.get_running()
+    if pool is not None:
+        with runtime_stats.track_generation("anthropic"):
+            return await pool.generate(_to_job("anthropic", system_prompt, prompt, model_params))
+
+    convo = ChatHistory(messages=prompt).render_message()
+    convo.append(_ASSISTANT_TURN.format_message())
+    with runtime_stats.track_generation("anthropic"):
+        result = await get_anthropic_client().messages.create(
+            # mypy(arg-type): expected "Iterable[MessageParam]"
+            messages=convo,  # type: ignore
+            # mypy(arg-type): expected ModelParam
+            # but I specified it as app_commands.Choice[int] | str
+            model=model_params.model,  # type: ignore
+            max_tokens=model_params.max_tokens,
+            system=system_prompt,
+            temperature=model_params.temperature,
+            top_p=model_params.top_p,
+        )
     # mypy(union-attr): has no attribute "text"
     claude_result = result.content[0].text  # type: ignore
-    return ResponseResult(status=ResponseStatus.SUCCESS, result=claude_result)
+    usage = TokenUsage(
+        input_tokens=result.usage.input_tokens,
+        output_tokens=result.usage.output_tokens,
+        cache_read_tokens=result.usage.cache_read_input_tokens or 0,
+        cache_write_tokens=result.usage.cache_creation_input_tokens or 0,
+    )
+    return ResponseResult(status=ResponseStatus.SUCCESS, result=claude_result, usage=usage)
 
 
+@record_generation("openai")
+@account_generation
 @handle_ai_service_errors
 async def generate_openai_response(
     system_prompt: str,
@@ -69,17 +147,36 @@ async def generate_openai_response(
         Configuration settings for the model, including parameters like
         max_tokens, temperature and top-p sampling.
     """
-    convo = ChatHistory(messages=[*prompt, ChatMessage(role="assistant")]).render_message()
-    full_prompt = [{"role": "developer", "content": system_prompt}, *convo]
-    completion = openai_client.chat.completions.create(
-        # mypy(arg-type): expected loooooooooooooooooong union type
-        messages=full_prompt,  # type: ignore
-        # mypy(arg-type): expected ChatModel | str
-        # but I specified it as app_commands.Choice[int] | str
-        model=model_params.model,  # type: ignore
-        max_tokens=model_params.max_tokens,
-        temperature=model_params.temperature,
-        top_p=model_params.top_p,
-    )
+    pool = WorkerPool.get_running()
+    if pool is not None:
+        with runtime_stats.track_generation("openai"):
+            return await pool.generate(_to_job("openai", system_prompt, prompt, model_params))
+
+    full_prompt = [
+        {"role": "developer", "content": system_prompt},
+        *ChatHistory(messages=prompt).render_message(),
+        _ASSISTANT_TURN.format_message(),
+    ]
+    with runtime_stats.track_generation("openai"):
+        completion = await get_openai_client().chat.completions.create(
+            # mypy(arg-type): expected loooooooooooooooooong union type
+            messages=full_prompt,  # type: ignore
+            # mypy(arg-type): expected ChatModel | str
+            # but I specified it as app_commands.Choice[int] | str
+            model=model_params.model,  # type: ignore
+            max_tokens=model_params.max_tokens,
+            temperature=model_params.temperature,
+            top_p=model_params.top_p,
+        )
     completion_result = completion.choices[0].message.content
-    return ResponseResult(status=ResponseStatus.SUCCESS, result=completion_result)
+    usage = None
+    if completion.usage is not None:
+        # The cached tokens are part of the prompt tokens, and aren't billed for writing
+        details = completion.usage.prompt_tokens_details
+        cached = (details.cached_tokens or 0) if details else 0
+        usage = TokenUsage(
+            input_tokens=completion.usage.prompt_tokens - cached,
+            output_tokens=completion.usage.completion_tokens,
+            cache_read_tokens=cached,
+        )
+    return ResponseResult(status=ResponseStatus.SUCCESS, result=completion_result, usage=usage)
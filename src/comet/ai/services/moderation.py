@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple, Protocol
+
+from src.comet.adapters.response import ResponseResult, ResponseStatus
+from src.comet.ai.services.completion import get_openai_client
+from src.comet.config.env import (
+    MODERATION_BASE_URL,
+    MODERATION_ENGINE,
+    MODERATION_MODEL,
+    MODERATION_PATTERNS_FILE,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Coroutine, Iterable
+    from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class ModerationVerdict(NamedTuple):
+    """The verdict of a classifier on a text.
+
+    Attributes
+    ----------
+    flagged : bool
+        Whether the text must not be answered or sent.
+    categories : tuple[str, ...]
+        What the text was flagged for, for the logs.
+    """
+
+    flagged: bool
+    categories: tuple[str, ...] = ()
+
+
+class Classifier(Protocol):
+    """Classify texts for moderation."""
+
+    async def classify(self, text: str) -> ModerationVerdict:
+        """Classify a text.
+
+        Parameters
+        ----------
+        text : str
+            The text to classify.
+
+        Returns
+        -------
+        ModerationVerdict
+            Whether the text is flagged, and what for.
+        """
+        ...
+
+
+class KeywordClassifier:
+    """Flag the texts matching any of a list of regular expressions, ignoring case.
+
+    Parameters
+    ----------
+    patterns : Iterable[str]
+        The regular expressions.
+
+    Raises
+    ------
+    re.error
+        If a pattern isn't a valid regular expression.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+
+    @classmethod
+    def from_file(cls, path: Path) -> KeywordClassifier:
+        """Read the patterns from a file, one per line.
+
+        Blank lines and lines starting with `#` are ignored.
+
+        Parameters
+        ----------
+        path : Path
+            The path of the file.
+
+        Returns
+        -------
+        KeywordClassifier
+            The classifier of the patterns.
+        """
+        with path.open(encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+        return cls(line for line in lines if line and not line.startswith("#"))
+
+    async def classify(self, text: str) -> ModerationVerdict:
+        """Flag the text if it matches any pattern, see `Classifier.classify()`."""
+        for pattern in self.patterns:
+            if pattern.search(text):
+                return ModerationVerdict(flagged=True, categories=(pattern.pattern,))
+        return ModerationVerdict(flagged=False)
+
+
+class OpenAIModerationClassifier:
+    """Classify texts with an OpenAI-compatible moderation endpoint.
+
+    The endpoint is called with the shared OpenAI client, and so its
+    pooled connections.
+
+    Parameters
+    ----------
+    model : str
+        The moderation model.
+    base_url : str
+        The base URL of the API, empty for the OpenAI client's.
+    """
+
+    def __init__(self, model: str, base_url: str = "") -> None:
+        self.model = model
+        self.base_url = base_url
+
+    async def classify(self, text: str) -> ModerationVerdict:
+        """Classify the text with the endpoint, see `Classifier.classify()`."""
+        client = get_openai_client()
+        if self.base_url:
+            client = client.with_options(base_url=self.base_url)
+        response = await client.moderations.create(model=self.model, input=text)
+        result = response.results[0]
+        categories = result.categories.model_dump(by_alias=True)
+        return ModerationVerdict(
+            flagged=result.flagged,
+            categories=tuple(name for name, flagged in categories.items() if flagged),
+        )
+
+
+@functools.cache
+def get_classifier() -> Classifier | None:
+    """Return the classifier set by `MODERATION_ENGINE`, creating it on first use.
+
+    Returns
+    -------
+    Classifier | None
+        The classifier, None if moderation is disabled.
+
+    Raises
+    ------
+    ValueError
+        If `MODERATION_ENGINE` is unknown.
+    """
+    if MODERATION_ENGINE == "none":
+        return None
+    if MODERATION_ENGINE == "openai":
+        return OpenAIModerationClassifier(MODERATION_MODEL, MODERATION_BASE_URL)
+    if MODERATION_ENGINE == "keyword":
+        # Without patterns, nothing would ever be flagged
+        if not MODERATION_PATTERNS_FILE:
+            return None
+        return KeywordClassifier.from_file(Path(MODERATION_PATTERNS_FILE))
+    msg = f"Unknown moderation engine {MODERATION_ENGINE!r}."
+    raise ValueError(msg)
+
+
+async def _is_flagged(classifier: Classifier, text: str, what: str) -> bool:
+    # Moderation failing open keeps the bot answering while the endpoint is down
+    try:
+        verdict = await classifier.classify(text)
+    except Exception:
+        logger.exception("Failed to moderate the %s, letting it through", what)
+        return False
+    if verdict.flagged:
+        logger.info("The %s was flagged by moderation: %s", what, ", ".join(verdict.categories))
+    return verdict.flagged
+
+
+async def moderate_generation(
+    generation: Coroutine[Any, Any, ResponseResult],
+    text: str,
+) -> ResponseResult:
+    """Run a generation while its input is moderated, and moderate its output.
+
+    The input is classified concurrently with the generation, so that
+    moderation only adds the time to classify the output. A flagged input
+    cancels the generation, or withholds its output if it has finished,
+    and a flagged output is withheld. The tokens of withheld outputs are
+    accounted for the user like any others. A generation cancelled on a
+    worker process completes there and its tokens are accounted by the
+    pool, see `WorkerPool.generate()`. One cancelled in this process stops
+    its request, and its tokens, which the provider doesn't report, aren't
+    accounted.
+
+    Parameters
+    ----------
+    generation : Coroutine[Any, Any, ResponseResult]
+        The call of a generation function, e.g. `generate_anthropic_response()`.
+    text : str
+        The input to moderate, the user's message.
+
+    Returns
+    -------
+    ResponseResult
+        The result of the generation, or a result with the
+        MODERATION_FLAGGED status and no text if the input or the output
+        was flagged.
+    """
+    classifier = get_classifier()
+    if classifier is None:
+        return await generation
+
+    generating = asyncio.create_task(generation)
+    try:
+        if await _is_flagged(classifier, text, "input"):
+            return ResponseResult(status=ResponseStatus.MODERATION_FLAGGED, result=None)
+        result = await generating
+    finally:
+        # When the input is flagged, or the caller is cancelled
+        generating.cancel()
+
+    if (
+        result.status == ResponseStatus.SUCCESS
+        and result.result
+        and await _is_flagged(classifier, result.result, "output")
+    ):
+        return ResponseResult(
+            status=ResponseStatus.MODERATION_FLAGGED,
+            result=None,
+            usage=result.usage,
+        )
+    return result
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from src.comet.ai.services.completion import get_anthropic_client, get_openai_client
+from src.comet.config.env import PROVIDER_KEEPALIVE_SECONDS
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+async def _ping_anthropic() -> None:
+    # Creating the client imports the SDK, which would block the event loop for a while
+    client = await asyncio.to_thread(get_anthropic_client)
+    await client.models.list(limit=1)
+
+
+async def _ping_openai() -> None:
+    client = await asyncio.to_thread(get_openai_client)
+    await client.models.list()
+
+
+# Provider name -> coroutine function that sends a cheap request through the shared client
+_PROVIDER_PINGS: dict[str, Callable[[], Awaitable[None]]] = {
+    "anthropic": _ping_anthropic,
+    "openai": _ping_openai,
+}
+
+
+async def _ping(provider: str, *, verbose: bool) -> bool:
+    """Send a cheap request to a provider to open or reuse a pooled connection.
+
+    Parameters
+    ----------
+    provider : str
+        The name of the provider.
+    verbose : bool
+        Log the result at INFO level instead of DEBUG.
+
+    Returns
+    -------
+    bool
+        True if the request succeeded.
+    """
+    started = time.perf_counter()
+    try:
+        await _PROVIDER_PINGS[provider]()
+    except Exception as err:  # noqa: BLE001
+        logger.warning("Failed to warm up the %s connection: %s", provider, err)
+        return False
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    level = logging.INFO if verbose else logging.DEBUG
+    logger.log(level, "Warmed up the %s connection in %.0f ms", provider, elapsed_ms)
+    return True
+
+
+async def warm_up_providers() -> None:
+    """Open pooled connections to every AI provider concurrently.
+
+    This is meant to run alongside the gateway connection at startup, so
+    that the first generation doesn't pay for DNS, TCP and TLS handshakes.
+    """
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(_ping(provider, verbose=True) for provider in _PROVIDER_PINGS),
+    )
+    logger.info(
+        "Provider warm-up finished in %.0f ms (%d/%d succeeded)",
+        (time.perf_counter() - started) * 1000,
+        sum(results),
+        len(results),
+    )
+
+
+async def keep_providers_warm() -> None:
+    """Periodically reuse the pooled connections so that they aren't closed while idle.
+
+    Does nothing if `PROVIDER_KEEPALIVE_SECONDS` is 0.
+    """
+    if PROVIDER_KEEPALIVE_SECONDS <= 0:
+        return
+    while True:
+        await asyncio.sleep(PROVIDER_KEEPALIVE_SECONDS)
+        await asyncio.gather(*(_ping(provider, verbose=False) for provider in _PROVIDER_PINGS))
@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import datetime
+import sys
+from contextlib import nullcontext
+from pathlib import Path
+from typing import TextIO
+
+from src.comet.analytics.export import export_usage
+from src.comet.config.timezone import TIMEZONE
+
+
+def main() -> None:
+    """Entry point for exporting the usage rollups.
+
+    The counts of the last flush interval are only in the memory of the
+    running bot, see `USAGE_FLUSH_INTERVAL_SECONDS`.
+
+    Examples
+    --------
+        python -m src.comet.analytics --granularity hourly --since 2025-01-01 -o usage.csv
+        python -m src.comet.analytics --format jsonl > usage.jsonl
+    """
+    today = datetime.datetime.now(TIMEZONE).date()
+    parser = argparse.ArgumentParser(description="Export the usage rollups.")
+    parser.add_argument("--granularity", choices=["hourly", "daily"], default="daily")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument(
+        "--since",
+        type=datetime.date.fromisoformat,
+        default=today - datetime.timedelta(days=29),
+        help="first date to export, YYYY-MM-DD (default: 29 days ago)",
+    )
+    parser.add_argument(
+        "--until",
+        type=datetime.date.fromisoformat,
+        default=today,
+        help="last date to export, included, YYYY-MM-DD (default: today)",
+    )
+    parser.add_argument("-o", "--output", type=Path, help="file to write (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    output: TextIO
+    with (
+        args.output.open("w", encoding="utf-8", newline="")
+        if args.output is not None
+        else nullcontext(sys.stdout)
+    ) as output:
+        written = asyncio.run(
+            export_usage(
+                output,
+                args.granularity,
+                args.since,
+                args.until,
+                export_format=args.format,
+                chunk_size=args.chunk_size,
+            ),
+        )
+    print(f"Exported {written} rollups", file=sys.stderr)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
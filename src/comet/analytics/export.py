@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import csv
+import json
+from contextlib import aclosing
+from typing import TYPE_CHECKING, Literal, TextIO
+
+from src.comet.db.dao.usage_analytics_dao import Granularity, UsageAnalyticsDAO, UsageRollup
+
+if TYPE_CHECKING:
+    import datetime
+
+type ExportFormat = Literal["csv", "jsonl"]
+
+
+async def export_usage(  # noqa: PLR0913
+    file: TextIO,
+    granularity: Granularity,
+    since: datetime.date,
+    until: datetime.date,
+    *,
+    export_format: ExportFormat = "csv",
+    chunk_size: int = 1000,
+) -> int:
+    """Write the usage rollups of a period to a file.
+
+    The rollups are read and written a chunk at a time, so the size of the
+    export doesn't matter.
+
+    Parameters
+    ----------
+    file : TextIO
+        The file to write to, opened with `newline=""` for CSV.
+    granularity : Granularity
+        Whether to export the hourly or the daily rollups.
+    since : datetime.date
+        The first date of the period.
+    until : datetime.date
+        The last date of the period, included.
+    export_format : ExportFormat
+        "csv" writes a header row followed by a row per rollup, "jsonl" a
+        JSON object per rollup and line. Defaults to "csv".
+    chunk_size : int
+        The number of rollups read at a time. Defaults to 1000.
+
+    Returns
+    -------
+    int
+        The number of rollups written.
+    """
+    writer = csv.writer(file)
+    if export_format == "csv":
+        writer.writerow(UsageRollup._fields)
+
+    written = 0
+    # mypy(type-var): Async generators have aclose(), typeshed only knows of AsyncGenerator
+    chunks = UsageAnalyticsDAO().iter_rollups(granularity, since, until, chunk_size)
+    async with aclosing(chunks):  # type: ignore
+        async for chunk in chunks:
+            if export_format == "csv":
+                writer.writerows(chunk)
+            else:
+                file.writelines(json.dumps(rollup._asdict()) + "\n" for rollup in chunk)
+            written += len(chunk)
+    return written
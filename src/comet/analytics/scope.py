@@ -0,0 +1,51 @@
+from contextvars import ContextVar
+from typing import NamedTuple
+
+
+class Scope(NamedTuple):
+    """What the generations of a task are made for.
+
+    Attributes
+    ----------
+    command : str
+        The name of the command, or of the conversation, being handled.
+    guild_id : int
+        The ID of the guild, 0 for direct messages.
+    user_id : int
+        The ID of the user who called the command.
+    """
+
+    command: str
+    guild_id: int
+    user_id: int
+
+
+# Each gateway event and interaction is handled in its own task, and so its own context
+_scope: ContextVar[Scope | None] = ContextVar("generation_scope", default=None)
+
+
+def attribute(command: str, guild_id: int | None, user_id: int) -> None:
+    """Attribute the generations of the current task to a command, a guild and a user.
+
+    Parameters
+    ----------
+    command : str
+        The name of the command, or of the conversation, being handled.
+    guild_id : int | None
+        The ID of the guild, None for direct messages.
+    user_id : int
+        The ID of the user who called the command.
+    """
+    _scope.set(Scope(command, guild_id or 0, user_id))
+
+
+def current_scope() -> Scope | None:
+    """Return what the generations of the current task are made for.
+
+    Returns
+    -------
+    Scope | None
+        The scope set by `attribute()`, None outside of an attributed task,
+        e.g. in the worker processes.
+    """
+    return _scope.get()
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import datetime
+import logging
+from typing import TYPE_CHECKING
+
+from src.comet.analytics.scope import current_scope
+from src.comet.config.timezone import TIMEZONE
+from src.comet.db.dao.token_usage_dao import TokenUsageDAO, UserTokenUsage
+from src.comet.db.dao.usage_limit_dao import UsageLimitDAO
+
+if TYPE_CHECKING:
+    from src.comet.adapters.response import TokenUsage
+    from src.comet.db.dao.usage_limit_dao import DailyQuota
+
+logger = logging.getLogger(__name__)
+
+# (local date, user ID, guild ID, command, model)
+type _Key = tuple[str, int, int, str, str]
+
+
+class TokenAccounting:
+    """Account for the tokens billed for each generation, by user, guild, command and model.
+
+    The tokens are added up in memory, which costs a dict lookup per
+    generation, and written to the `token_usage` table by `flush()`, which
+    is scheduled every `USAGE_FLUSH_INTERVAL_SECONDS`. The daily quotas
+    include the tokens not written yet, see `get_user_daily_quota()`.
+    Usage that can't be written is kept for the next flush.
+
+    Only the generations of an attributed task are accounted for, so the
+    worker processes, whose generations are accounted for by the gateway
+    process with the usage they reply with, account for nothing.
+    """
+
+    def __init__(self) -> None:
+        # calls, input, output, cache read and cache write tokens of each key
+        self._pending: dict[_Key, list[int]] = {}
+
+    def record(self, model: str, usage: TokenUsage) -> None:
+        """Account for the tokens of a generation of the current task.
+
+        Parameters
+        ----------
+        model : str
+            The model that was called.
+        usage : TokenUsage
+            The tokens billed for the generation.
+        """
+        scope = current_scope()
+        if scope is None:
+            return
+        today = datetime.datetime.now(TIMEZONE).date().isoformat()
+        key = (today, scope.user_id, scope.guild_id, scope.command, model)
+        counts = self._pending.get(key)
+        if counts is None:
+            counts = self._pending[key] = [0, 0, 0, 0, 0]
+        counts[0] += 1
+        counts[1] += usage.input_tokens
+        counts[2] += usage.output_tokens
+        counts[3] += usage.cache_read_tokens
+        counts[4] += usage.cache_write_tokens
+
+    def pending_tokens(self, user_id: int) -> int:
+        """Return the tokens a user has used today that aren't written yet.
+
+        Parameters
+        ----------
+        user_id : int
+            ID of the user.
+
+        Returns
+        -------
+        int
+            The total number of tokens, see `TokenUsage.total`.
+        """
+        today = datetime.datetime.now(TIMEZONE).date().isoformat()
+        return sum(
+            sum(counts[1:])
+            for (usage_date, key_user_id, *_), counts in self._pending.items()
+            if key_user_id == user_id and usage_date == today
+        )
+
+    async def get_user_daily_quota(self, user_id: int) -> DailyQuota:
+        """Get the current day's usage and the daily limits of a user.
+
+        Parameters
+        ----------
+        user_id : int
+            ID of the user to get the quota for.
+
+        Returns
+        -------
+        DailyQuota
+            The quota read by `UsageLimitDAO.get_user_daily_quota()`, with
+            the tokens not written yet.
+        """
+        quota = await UsageLimitDAO().get_user_daily_quota(user_id)
+        return quota._replace(tokens=quota.tokens + self.pending_tokens(user_id))
+
+    async def flush(self) -> None:
+        """Write the accounted tokens to the database, in a single transaction."""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            await TokenUsageDAO().add_token_usage(
+                UserTokenUsage(*key, *counts) for key, counts in pending.items()
+            )
+        except Exception:
+            logger.exception(
+                "Failed to write the token usage of %d keys, retrying later",
+                len(pending),
+            )
+            # Generations may have been accounted for during the write
+            for key, counts in pending.items():
+                merged = self._pending.setdefault(key, [0, 0, 0, 0, 0])
+                for index, count in enumerate(counts):
+                    merged[index] += count
+
+
+token_accounting = TokenAccounting()
@@ -0,0 +1,90 @@
+import datetime
+import logging
+
+from src.comet.analytics.scope import current_scope
+from src.comet.config.timezone import TIMEZONE
+from src.comet.db.dao.usage_analytics_dao import UsageAnalyticsDAO, UsageRollup
+
+logger = logging.getLogger(__name__)
+
+# (hour bucket, command, model, guild ID)
+type _Key = tuple[str, str, str, int]
+
+
+class UsageAnalytics:
+    """Count the generations by hour, command, model and guild.
+
+    The counts are kept in memory, which costs a dict lookup per
+    generation, and added to the hourly and daily rollups of the database
+    by `flush()`, which is scheduled every `USAGE_FLUSH_INTERVAL_SECONDS`.
+    Counts that can't be written are kept for the next flush.
+    """
+
+    def __init__(self) -> None:
+        # requests, errors, prompt_chars, response_chars, duration_ms of each key
+        self._pending: dict[_Key, list[int]] = {}
+
+    def record(
+        self,
+        model: str,
+        *,
+        succeeded: bool,
+        prompt_chars: int,
+        response_chars: int,
+        duration_ms: float,
+    ) -> None:
+        """Count a generation.
+
+        Generations made outside of an attributed task, see `attribute()`,
+        aren't counted. Those of the generation workers are counted by the
+        gateway process, which attributes them.
+
+        Parameters
+        ----------
+        model : str
+            The model that was called.
+        succeeded : bool
+            Whether a response was generated.
+        prompt_chars : int
+            The length of the prompt, including the system prompt.
+        response_chars : int
+            The length of the response.
+        duration_ms : float
+            The duration of the generation in milliseconds.
+        """
+        scope = current_scope()
+        if scope is None:
+            return
+        command, guild_id = scope.command, scope.guild_id
+        bucket = datetime.datetime.now(TIMEZONE).strftime("%Y-%m-%d %H:00")
+        counts = self._pending.get((bucket, command, model, guild_id))
+        if counts is None:
+            counts = self._pending[bucket, command, model, guild_id] = [0, 0, 0, 0, 0]
+        counts[0] += 1
+        counts[1] += not succeeded
+        counts[2] += prompt_chars
+        counts[3] += response_chars
+        counts[4] += round(duration_ms)
+
+    async def flush(self) -> None:
+        """Add the counted generations to the rollups, in a single transaction."""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            await UsageAnalyticsDAO().add_usage(
+                UsageRollup(*key, *counts) for key, counts in pending.items()
+            )
+        except Exception:
+            logger.exception(
+                "Failed to write the usage of %d rollups, retrying later",
+                len(pending),
+            )
+            # Generations may have been counted during the write
+            for key, counts in pending.items():
+                merged = self._pending.setdefault(key, [0, 0, 0, 0, 0])
+                for index, count in enumerate(counts):
+                    merged[index] += count
+
+
+usage_analytics = UsageAnalytics()
@@ -0,0 +1,4 @@
+from dotenv import load_dotenv
+
+# The .env file is read once, before any configuration module reads the environment
+load_dotenv()
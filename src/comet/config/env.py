@@ -3,9 +3,6 @@ from __future__ import annotations
 import os
 
 from discord import app_commands
-from dotenv import load_dotenv
-
-load_dotenv()
 
 # Base
 BASE_TOP_P: float = float(os.environ["BASE_TOP_P"])
@@ -27,7 +24,18 @@ AUTHORIZED_SERVER_IDS: list[int] = [
     int(id_str) for id_str in os.environ["AUTHORIZED_SERVER_IDS"].split(",") if id_str.strip()
 ]
 BOT_NAME: str = os.environ["BOT_NAME"]
+COMMAND_SYNC_MODE: str = os.environ.get("COMMAND_SYNC_MODE", "global")
 MAX_CHARS_PER_MESSAGE: int = int(os.environ["MAX_CHARS_PER_MESSAGE"])
+# Longer responses are sent as a file (0 never sends them as a file)
+ATTACHMENT_THRESHOLD_CHARS: int = int(os.environ.get("ATTACHMENT_THRESHOLD_CHARS", "4000"))
+# "default" caches every member and 1000 messages, "lean" only 100 messages
+MEMORY_PROFILE: str = os.environ.get("MEMORY_PROFILE", "default")
+# "auto" lets Discord recommend the number of shards
+_shard_count: str = os.environ.get("SHARD_COUNT", "1")
+SHARD_COUNT: int | None = None if _shard_count == "auto" else int(_shard_count)
+SHARD_IDS: list[int] | None = [
+    int(id_str) for id_str in os.environ.get("SHARD_IDS", "").split(",") if id_str.strip()
+] or None
 
 # GPT
 GPT_DEFAULT_CONTEXT_WINDOW: int = int(os.environ["GPT_DEFAULT_CONTEXT_WINDOW"])
@@ -42,12 +50,52 @@ CHAT_MODEL: str = os.environ["CHAT_MODEL"]
 FIXPY_MODEL: str = os.environ["FIXPY_MODEL"]
 FIXPY_TEMPERATURE: float = float(os.environ["FIXPY_TEMPERATURE"])
 FIXPY_TOP_P: float = float(os.environ["FIXPY_TOP_P"])
+# Attached modules are split into parts of about FIXPY_CHUNK_CHARS, fixed concurrently
+FIXPY_MAX_FILE_BYTES: int = int(os.environ.get("FIXPY_MAX_FILE_BYTES", "262144"))
+FIXPY_CHUNK_CHARS: int = int(os.environ.get("FIXPY_CHUNK_CHARS", "8000"))
+FIXPY_MAX_PARALLEL_CHUNKS: int = int(os.environ.get("FIXPY_MAX_PARALLEL_CHUNKS", "4"))
+# "diff" asks for a unified diff of the fix, "full" for the complete fixed code
+FIXPY_OUTPUT_MODE: str = os.environ.get("FIXPY_OUTPUT_MODE", "full")
+# Fixes are compiled in the precheck worker if "compile", or returned as they are if "off"
+FIXPY_VALIDATION: str = os.environ.get("FIXPY_VALIDATION", "off")
 
 # '/talk' command
 TALK_MAX_TOKENS: int = int(os.environ["TALK_MAX_TOKENS"])
 TALK_TEMPERATURE: float = float(os.environ["TALK_TEMPERATURE"])
 TALK_TOP_P: float = float(os.environ["TALK_TOP_P"])
 
+# Providers
+PROVIDER_KEEPALIVE_SECONDS: int = int(os.environ.get("PROVIDER_KEEPALIVE_SECONDS", "240"))
+
+# Moderation, with the keyword engine, the openai engine or none
+MODERATION_ENGINE: str = os.environ.get("MODERATION_ENGINE", "keyword")
+MODERATION_PATTERNS_FILE: str = os.environ.get("MODERATION_PATTERNS_FILE", "")
+MODERATION_MODEL: str = os.environ.get("MODERATION_MODEL", "omni-moderation-latest")
+MODERATION_BASE_URL: str = os.environ.get("MODERATION_BASE_URL", "")
+
+# Generation workers (0 runs generation in the gateway process)
+GENERATION_WORKERS: int = int(os.environ.get("GENERATION_WORKERS", "0"))
+WORKER_CONCURRENCY: int = int(os.environ.get("WORKER_CONCURRENCY", "8"))
+WORKER_QUEUE_SIZE: int = int(os.environ.get("WORKER_QUEUE_SIZE", "64"))
+WORKER_JOB_TIMEOUT_SECONDS: float = float(os.environ.get("WORKER_JOB_TIMEOUT_SECONDS", "300"))
+WORKER_HEALTH_INTERVAL_SECONDS: float = float(
+    os.environ.get("WORKER_HEALTH_INTERVAL_SECONDS", "10"),
+)
+
+# Usage counts of the days before the last USAGE_RETENTION_DAYS days are deleted
+USAGE_RETENTION_DAYS: int = int(os.environ.get("USAGE_RETENTION_DAYS", "1"))
+# Token usage of the days before the last TOKEN_USAGE_RETENTION_DAYS days is deleted
+TOKEN_USAGE_RETENTION_DAYS: int = int(os.environ.get("TOKEN_USAGE_RETENTION_DAYS", "90"))
+
+# Usage analytics
+USAGE_FLUSH_INTERVAL_SECONDS: float = float(os.environ.get("USAGE_FLUSH_INTERVAL_SECONDS", "60"))
+
+# Event recording (empty disables it)
+EVENT_RECORD_FILE: str = os.environ.get("EVENT_RECORD_FILE", "")
+
+# Startup
+IMPORT_TIME_BUDGET_MS: int = int(os.environ.get("IMPORT_TIME_BUDGET_MS", "1500"))
+
 
 def _get_model_choices(env_var: str) -> list[app_commands.Choice[str]]:
     models_str = os.environ[env_var]
@@ -4,7 +4,6 @@ import os
 from typing import TYPE_CHECKING
 
 import pytz
-from dotenv import load_dotenv
 
 if TYPE_CHECKING:
     from pytz import _UTCclass
@@ -18,6 +17,5 @@ if TYPE_CHECKING:
 # 3. This centralizes all timezone-specific logic in one place
 # 4. The returned object is a complex timezone object, not a simple value
 
-load_dotenv()
 _tz: str = os.environ["TIMEZONE"]
 TIMEZONE: _UTCclass | DstTzInfo | StaticTzInfo = pytz.timezone(_tz)
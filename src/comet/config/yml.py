@@ -1,10 +1,56 @@
+from __future__ import annotations
+
+import functools
+import os
 from pathlib import Path
 
-import yaml
+# Defaults to .prompt.yml at the root of the repository
+PROMPT_FILE: Path = Path(
+    os.environ.get("PROMPT_FILE") or Path(__file__).parents[3].joinpath(".prompt.yml"),
+)
+
+# Module attribute name -> key in the prompt file
+_PROMPT_KEYS: dict[str, str] = {
+    "CHAT_SYSTEM": "chat_system",
+    "FIXPY_SYSTEM": "fixpy_system",
+    "TALK_SYSTEM": "talk_system",
+}
+
+CHAT_SYSTEM: str
+FIXPY_SYSTEM: str
+TALK_SYSTEM: str
+
+
+@functools.cache
+def _load_prompt() -> dict[str, str]:
+    # PyYAML is only needed the first time a prompt is used
+    import yaml  # noqa: PLC0415
+
+    with PROMPT_FILE.open(encoding="utf-8") as f:
+        prompt: dict[str, str] = yaml.safe_load(f)
+    return prompt
+
+
+def __getattr__(name: str) -> str | None:
+    """Read the system prompts from the prompt file on first access.
+
+    Parameters
+    ----------
+    name : str
+        The name of the module attribute, e.g. `CHAT_SYSTEM`.
 
-with Path(__file__).parents[3].joinpath(".prompt.yml").open(encoding="utf-8") as f:
-    prompt = yaml.safe_load(f)
+    Returns
+    -------
+    str | None
+        The system prompt, or None if it isn't defined in the prompt file.
 
-CHAT_SYSTEM: str = prompt.get("chat_system")
-FIXPY_SYSTEM: str = prompt.get("fixpy_system")
-TALK_SYSTEM: str = prompt.get("talk_system")
+    Raises
+    ------
+    AttributeError
+        If the name isn't a known system prompt.
+    """
+    key = _PROMPT_KEYS.get(name)
+    if key is None:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    return _load_prompt().get(key)
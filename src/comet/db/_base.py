@@ -1,4 +1,7 @@
 import re
+import time
+
+import aiosqlite
 
 from src.comet.config.env import SQLITE_DB_NAME
 
@@ -11,3 +14,19 @@ class SQLiteDAOBase:
         """Only letters, numbers, and underscores are allowed."""
         pattern = r"^[A-Za-z0-9_]+$"
         return bool(re.match(pattern, table_name))
+
+    async def ping(self) -> float:
+        """Run a trivial query against the database.
+
+        Returns
+        -------
+        float
+            The round-trip time of the connection and query in milliseconds.
+        """
+        started = time.perf_counter()
+        conn = await aiosqlite.connect(self.DB_NAME)
+        try:
+            await conn.execute("SELECT 1")
+        finally:
+            await conn.close()
+        return (time.perf_counter() - started) * 1000
@@ -9,45 +9,26 @@ from src.comet.db._base import SQLiteDAOBase
 class AccessPrivilegeDAO(SQLiteDAOBase):
     """Data Access Object for managing user access privileges.
 
+    The privileges in effect are kept in a table keyed by user and
+    privilege, which every lookup reads, while each grant and revocation
+    is appended to a history table in the same transaction.
+
     Attributes
     ----------
     _table_name : str
-        Name of the database table for access privileges.
+        Name of the database table for the current access privileges.
+    _history_table_name : str
+        Name of the database table for the history of access privileges.
     """
 
-    _table_name: str = "access_privilege"
-
-    async def create_table(self) -> None:
-        """Create table if it doesn't exist.
-
-        Raises
-        ------
-        ValueError
-            If the table name contains invalid characters.
-        """
-        if not self.validate_table_name(self._table_name):
-            msg = "Invalid tablename: Only alphanumeric characters and underscores are allowed."
-            raise ValueError(msg)
-
-        conn = await aiosqlite.connect(super().DB_NAME)
-        try:
-            query = f"""
-            CREATE TABLE IF NOT EXISTS {self._table_name} (
-                id               INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id          INTEGER NOT NULL,
-                access_privilege TEXT_NOT_NULL,
-                enabled_at       DATE NOT NULL,
-                disabled_at      DATE DEFAULT NULL
-            );
-            """
-            await conn.execute(query)
-            await conn.commit()
-        finally:
-            await conn.close()
+    _table_name: str = "access_privilege_current"
+    _history_table_name: str = "access_privilege_history"
 
     async def enable(self, user_id: int, access_privilege: str) -> None:
         """Enable a new access privilege for a user.
 
+        Enabling a privilege the user already has changes nothing.
+
         Parameters
         ----------
         user_id : int
@@ -56,13 +37,16 @@ class AccessPrivilegeDAO(SQLiteDAOBase):
             The access privilege to enable.
         """
         conn = await aiosqlite.connect(super().DB_NAME)
-        date = datetime.datetime.now(TIMEZONE).date()
+        now = datetime.datetime.now(TIMEZONE)
         try:
             query = """
-            INSERT INTO access_privilege (user_id, access_privilege, enabled_at)
-            VALUES (?, ?, ?);
+            INSERT INTO access_privilege_current (user_id, privilege, enabled_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(user_id, privilege) DO NOTHING;
             """
-            await conn.execute(query, (user_id, access_privilege, date))
+            cursor = await conn.execute(query, (user_id, access_privilege, now.date()))
+            if cursor.rowcount:
+                await self._append_history(conn, user_id, access_privilege, "enable", now)
             await conn.commit()
         finally:
             await conn.close()
@@ -83,8 +67,7 @@ class AccessPrivilegeDAO(SQLiteDAOBase):
         conn = await aiosqlite.connect(super().DB_NAME)
         try:
             query = """
-            SELECT user_id FROM access_privilege WHERE access_privilege = ?
-            AND disabled_at IS NULL;
+            SELECT user_id FROM access_privilege_current WHERE privilege = ?;
             """
             cursor = await conn.execute(query, (access_privilege,))
             result = await cursor.fetchall()
@@ -92,9 +75,60 @@ class AccessPrivilegeDAO(SQLiteDAOBase):
         finally:
             await conn.close()
 
+    async def has_access_privilege(self, user_id: int, access_privilege: str) -> bool:
+        """Check whether a user has a specific access privilege.
+
+        Parameters
+        ----------
+        user_id : int
+            The ID of the user to check.
+        access_privilege : str
+            The access privilege to look for.
+
+        Returns
+        -------
+        bool
+            True if the user has the access privilege.
+        """
+        conn = await aiosqlite.connect(super().DB_NAME)
+        try:
+            query = """
+            SELECT 1 FROM access_privilege_current WHERE user_id = ? AND privilege = ?;
+            """
+            cursor = await conn.execute(query, (user_id, access_privilege))
+            return await cursor.fetchone() is not None
+        finally:
+            await conn.close()
+
+    async def fetch_access_privileges(self, user_id: int) -> set[str]:
+        """Fetch the access privileges of a user.
+
+        Parameters
+        ----------
+        user_id : int
+            The ID of the user.
+
+        Returns
+        -------
+        set[str]
+            The access privileges the user has.
+        """
+        conn = await aiosqlite.connect(super().DB_NAME)
+        try:
+            query = """
+            SELECT privilege FROM access_privilege_current WHERE user_id = ?;
+            """
+            cursor = await conn.execute(query, (user_id,))
+            result = await cursor.fetchall()
+            return {row[0] for row in result}
+        finally:
+            await conn.close()
+
     async def disable(self, user_id: int, access_privilege: str) -> None:
         """Disable an existing access privilege for a user.
 
+        Disabling a privilege the user doesn't have changes nothing.
+
         Parameters
         ----------
         user_id : int
@@ -103,13 +137,29 @@ class AccessPrivilegeDAO(SQLiteDAOBase):
             The access privilege to disable.
         """
         conn = await aiosqlite.connect(super().DB_NAME)
-        date = datetime.datetime.now(TIMEZONE).date()
+        now = datetime.datetime.now(TIMEZONE)
         try:
             query = """
-            UPDATE access_privilege SET disabled_at = ? WHERE user_id = ?
-            AND access_privilege = ?;
+            DELETE FROM access_privilege_current WHERE user_id = ? AND privilege = ?;
             """
-            await conn.execute(query, (date, user_id, access_privilege))
+            cursor = await conn.execute(query, (user_id, access_privilege))
+            if cursor.rowcount:
+                await self._append_history(conn, user_id, access_privilege, "disable", now)
             await conn.commit()
         finally:
             await conn.close()
+
+    async def _append_history(
+        self,
+        conn: aiosqlite.Connection,
+        user_id: int,
+        access_privilege: str,
+        action: str,
+        changed_at: datetime.datetime,
+    ) -> None:
+        # Runs in the transaction of the change it records
+        query = """
+        INSERT INTO access_privilege_history (user_id, privilege, action, changed_at)
+        VALUES (?, ?, ?, ?);
+        """
+        await conn.execute(query, (user_id, access_privilege, action, changed_at))
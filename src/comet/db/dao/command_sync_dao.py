@@ -0,0 +1,68 @@
+import datetime
+
+import aiosqlite
+
+from src.comet.config.timezone import TIMEZONE
+from src.comet.db._base import SQLiteDAOBase
+
+
+class CommandSyncDAO(SQLiteDAOBase):
+    """Data Access Object for the hashes of the last synced command trees.
+
+    Attributes
+    ----------
+    _table_name : str
+        Name of the database table for command sync states.
+    """
+
+    _table_name: str = "command_sync"
+
+    async def get_schema_hash(self, scope: str) -> str | None:
+        """Get the hash of the command tree last synced to a scope.
+
+        Parameters
+        ----------
+        scope : str
+            "global" or "guild:<guild_id>".
+
+        Returns
+        -------
+        str | None
+            The hash of the last synced command tree, or None if the scope
+            has never been synced.
+        """
+        conn = await aiosqlite.connect(super().DB_NAME)
+        try:
+            query = """
+            SELECT schema_hash FROM command_sync WHERE scope = ?
+            """
+            cursor = await conn.execute(query, (scope,))
+            row = await cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            await conn.close()
+
+    async def set_schema_hash(self, scope: str, schema_hash: str) -> None:
+        """Record the hash of the command tree synced to a scope.
+
+        Parameters
+        ----------
+        scope : str
+            "global" or "guild:<guild_id>".
+        schema_hash : str
+            The hash of the synced command tree.
+        """
+        conn = await aiosqlite.connect(super().DB_NAME)
+        now = datetime.datetime.now(TIMEZONE)
+        try:
+            query = """
+            INSERT INTO command_sync (scope, schema_hash, synced_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(scope) DO UPDATE SET
+                schema_hash = excluded.schema_hash,
+                synced_at = excluded.synced_at
+            """
+            await conn.execute(query, (scope, schema_hash, now))
+            await conn.commit()
+        finally:
+            await conn.close()
@@ -0,0 +1,87 @@
+import datetime
+
+import aiosqlite
+
+from src.comet.db._base import SQLiteDAOBase
+
+
+class ScheduledJobDAO(SQLiteDAOBase):
+    """Data Access Object for the last runs of the scheduled jobs.
+
+    Times are stored as ISO 8601 strings with their UTC offset.
+
+    Attributes
+    ----------
+    _table_name : str
+        Name of the database table for the last runs.
+    """
+
+    _table_name: str = "scheduled_job"
+
+    async def get_last_scheduled_at(self, name: str) -> datetime.datetime | None:
+        """Get the time the last run of a job was scheduled for.
+
+        Parameters
+        ----------
+        name : str
+            The name of the job.
+
+        Returns
+        -------
+        datetime.datetime | None
+            The scheduled time of the last run, or None if the job has
+            never run.
+        """
+        conn = await aiosqlite.connect(super().DB_NAME)
+        try:
+            query = """
+            SELECT last_scheduled_at FROM scheduled_job WHERE name = ?
+            """
+            cursor = await conn.execute(query, (name,))
+            row = await cursor.fetchone()
+            return datetime.datetime.fromisoformat(row[0]) if row else None
+        finally:
+            await conn.close()
+
+    async def record_run(
+        self,
+        name: str,
+        scheduled_at: datetime.datetime,
+        started_at: datetime.datetime,
+        status: str,
+        duration_ms: float,
+    ) -> None:
+        """Record the last run of a job.
+
+        Parameters
+        ----------
+        name : str
+            The name of the job.
+        scheduled_at : datetime.datetime
+            The time the run was scheduled for.
+        started_at : datetime.datetime
+            The time the run started, after its jitter.
+        status : str
+            "success" or "failure".
+        duration_ms : float
+            The duration of the run in milliseconds.
+        """
+        conn = await aiosqlite.connect(super().DB_NAME)
+        try:
+            query = """
+            INSERT INTO scheduled_job
+                (name, last_scheduled_at, last_started_at, last_status, last_duration_ms)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                last_scheduled_at = excluded.last_scheduled_at,
+                last_started_at = excluded.last_started_at,
+                last_status = excluded.last_status,
+                last_duration_ms = excluded.last_duration_ms
+            """
+            await conn.execute(
+                query,
+                (name, scheduled_at.isoformat(), started_at.isoformat(), status, duration_ms),
+            )
+            await conn.commit()
+        finally:
+            await conn.close()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import aiosqlite
+
+from src.comet.db._base import SQLiteDAOBase
+
+if TYPE_CHECKING:
+    import datetime
+    from collections.abc import Iterable
+
+
+class UserTokenUsage(NamedTuple):
+    """The tokens billed for the generations of a user with a model, over a day.
+
+    Attributes
+    ----------
+    usage_date : str
+        The local date, as 'YYYY-MM-DD'.
+    user_id : int
+        The user who called the command.
+    guild_id : int
+        The guild the command was used in, 0 for direct messages.
+    command : str
+        The command that called the model.
+    model : str
+        The model that was called.
+    calls : int
+        The number of generations.
+    input_tokens : int
+        The prompt tokens that were neither read from nor written to the cache.
+    output_tokens : int
+        The generated tokens.
+    cache_read_tokens : int
+        The prompt tokens read from the provider's prompt cache.
+    cache_write_tokens : int
+        The prompt tokens written to the provider's prompt cache.
+    """
+
+    usage_date: str
+    user_id: int
+    guild_id: int
+    command: str
+    model: str
+    calls: int
+    input_tokens: int
+    output_tokens: int
+    cache_read_tokens: int
+    cache_write_tokens: int
+
+
+class TokenUsageDAO(SQLiteDAOBase):
+    """Data Access Object for the daily token usage of the users.
+
+    The usage is only ever incremented, by `add_token_usage()`, so that
+    it can be maintained without reading it. The daily quotas read it
+    through `UsageLimitDAO.get_user_daily_quota()`.
+
+    Attributes
+    ----------
+    _table_name : str
+        Name of the database table for the token usage.
+    """
+
+    _table_name: str = "token_usage"
+
+    async def add_token_usage(self, usages: Iterable[UserTokenUsage]) -> None:
+        """Add token usage to the daily usage of the users, in a single transaction.
+
+        Parameters
+        ----------
+        usages : Iterable[UserTokenUsage]
+            The usage to add.
+        """
+        rows = list(usages)
+        if not rows:
+            return
+
+        conn = await aiosqlite.connect(super().DB_NAME)
+        try:
+            query = """
+            INSERT INTO token_usage (
+                usage_date, user_id, guild_id, command, model, calls,
+                input_tokens, output_tokens, cache_read_tokens, cache_write_tokens
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(usage_date, user_id, guild_id, command, model) DO UPDATE SET
+                calls = calls + excluded.calls,
+                input_tokens = input_tokens + excluded.input_tokens,
+                output_tokens = output_tokens + excluded.output_tokens,
+                cache_read_tokens = cache_read_tokens + excluded.cache_read_tokens,
+                cache_write_tokens = cache_write_tokens + excluded.cache_write_tokens
+            """
+            await conn.executemany(query, rows)
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    async def delete_token_usage_before(self, date: datetime.date, batch_size: int) -> int:
+        """Delete a batch of the token usage of the days before a date.
+
+        Parameters
+        ----------
+        date : datetime.date
+            The first day whose token usage is kept.
+        batch_size : int
+            The maximum number of rows to delete.
+
+        Returns
+        -------
+        int
+            The number of rows deleted, less than `batch_size` once none are left.
+        """
+        conn = await aiosqlite.connect(super().DB_NAME)
+        try:
+            # The table has no rowid, the rows are selected by their primary key
+            query = """
+            DELETE FROM token_usage
+            WHERE (usage_date, user_id, guild_id, command, model) IN (
+                SELECT usage_date, user_id, guild_id, command, model
+                FROM token_usage WHERE usage_date < ? LIMIT ?
+            )
+            """
+            cursor = await conn.execute(query, (date.isoformat(), batch_size))
+            await conn.commit()
+            return cursor.rowcount
+        finally:
+            await conn.close()
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import datetime
+from typing import TYPE_CHECKING, Literal, NamedTuple
+
+import aiosqlite
+
+from src.comet.db._base import SQLiteDAOBase
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterable
+
+type Granularity = Literal["hourly", "daily"]
+
+
+class UsageRollup(NamedTuple):
+    """The usage of a model by a command in a guild over an hour or a day.
+
+    Attributes
+    ----------
+    bucket : str
+        The local hour, as 'YYYY-MM-DD HH:00', or the local date, as 'YYYY-MM-DD'.
+    command : str
+        The command that called the model.
+    model : str
+        The model that was called.
+    guild_id : int
+        The guild the command was used in, 0 for direct messages.
+    requests : int
+        The number of generations.
+    errors : int
+        The number of generations that didn't succeed.
+    prompt_chars : int
+        The total length of the prompts, including the system prompts.
+    response_chars : int
+        The total length of the responses.
+    duration_ms : int
+        The total duration of the generations in milliseconds.
+    """
+
+    bucket: str
+    command: str
+    model: str
+    guild_id: int
+    requests: int
+    errors: int
+    prompt_chars: int
+    response_chars: int
+    duration_ms: int
+
+
+# The query of each granularity, the table names can't be parameters
+_SELECT_ROLLUPS: dict[Granularity, str] = {
+    "hourly": """
+    SELECT bucket, command, model, guild_id,
+        requests, errors, prompt_chars, response_chars, duration_ms
+    FROM usage_rollup_hourly
+    WHERE bucket >= ? AND bucket < ?
+    ORDER BY bucket, command, model, guild_id
+    """,
+    "daily": """
+    SELECT bucket, command, model, guild_id,
+        requests, errors, prompt_chars, response_chars, duration_ms
+    FROM usage_rollup_daily
+    WHERE bucket >= ? AND bucket < ?
+    ORDER BY bucket, command, model, guild_id
+    """,
+}
+
+
+class UsageAnalyticsDAO(SQLiteDAOBase):
+    """Data Access Object for the hourly and daily usage rollups.
+
+    The rollups are only ever incremented, by `add_usage()`, so that
+    they can be maintained without reading them.
+    """
+
+    async def add_usage(self, rollups: Iterable[UsageRollup]) -> None:
+        """Add hourly usage to the hourly rollups and to the daily rollups of their date.
+
+        Parameters
+        ----------
+        rollups : Iterable[UsageRollup]
+            The usage to add, bucketed by hour.
+        """
+        rows = [
+            (
+                rollup.bucket,
+                rollup.command,
+                rollup.model,
+                rollup.guild_id,
+                rollup.requests,
+                rollup.errors,
+                rollup.prompt_chars,
+                rollup.response_chars,
+                rollup.duration_ms,
+            )
+            for rollup in rollups
+        ]
+        if not rows:
+            return
+
+        conn = await aiosqlite.connect(super().DB_NAME)
+        try:
+            query = """
+            INSERT INTO usage_rollup_hourly (
+                bucket, command, model, guild_id,
+                requests, errors, prompt_chars, response_chars, duration_ms
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(bucket, command, model, guild_id) DO UPDATE SET
+                requests = requests + excluded.requests,
+                errors = errors + excluded.errors,
+                prompt_chars = prompt_chars + excluded.prompt_chars,
+                response_chars = response_chars + excluded.response_chars,
+                duration_ms = duration_ms + excluded.duration_ms
+            """
+            await conn.executemany(query, rows)
+            # The date is the start of the hour bucket
+            query = """
+            INSERT INTO usage_rollup_daily (
+                bucket, command, model, guild_id,
+                requests, errors, prompt_chars, response_chars, duration_ms
+            )
+            VALUES (substr(?, 1, 10), ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(bucket, command, model, guild_id) DO UPDATE SET
+                requests = requests + excluded.requests,
+                errors = errors + excluded.errors,
+                prompt_chars = prompt_chars + excluded.prompt_chars,
+                response_chars = response_chars + excluded.response_chars,
+                duration_ms = duration_ms + excluded.duration_ms
+            """
+            await conn.executemany(query, rows)
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    async def iter_rollups(
+        self,
+        granularity: Granularity,
+        since: datetime.date,
+        until: datetime.date,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[list[UsageRollup]]:
+        """Read the rollups of a period in chunks, ordered by bucket.
+
+        Only one chunk is held in memory at a time, and the connection is
+        closed once the iteration ends or the iterator is closed.
+
+        Parameters
+        ----------
+        granularity : Granularity
+            Whether to read the hourly or the daily rollups.
+        since : datetime.date
+            The first date of the period.
+        until : datetime.date
+            The last date of the period, included.
+        chunk_size : int
+            The number of rollups in each chunk. Defaults to 1000.
+
+        Yields
+        ------
+        list[UsageRollup]
+            The next rollups of the period.
+        """
+        # 'YYYY-MM-DD HH:00' sorts after 'YYYY-MM-DD', and before the next day
+        end = until + datetime.timedelta(days=1)
+        conn = await aiosqlite.connect(super().DB_NAME)
+        try:
+            cursor = await conn.execute(
+                _SELECT_ROLLUPS[granularity],
+                (since.isoformat(), end.isoformat()),
+            )
+            while rows := await cursor.fetchmany(chunk_size):
+                yield [UsageRollup(*row) for row in rows]
+        finally:
+            await conn.close()
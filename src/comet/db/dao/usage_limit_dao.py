@@ -1,5 +1,5 @@
 import datetime
-from typing import cast
+from typing import NamedTuple, cast
 
 import aiosqlite
 
@@ -7,6 +7,34 @@ from src.comet.config.timezone import TIMEZONE
 from src.comet.db._base import SQLiteDAOBase
 
 
+class DailyQuota(NamedTuple):
+    """A user's usage of the current day and their daily limits.
+
+    Attributes
+    ----------
+    usage : int
+        The number of commands calls used today.
+    limit : int
+        The maximum number of commands calls allowed per day.
+    tokens : int
+        The number of tokens used today, see `TokenUsage.total`.
+    token_limit : int | None
+        The maximum number of tokens allowed per day, None if there is no token limit.
+    """
+
+    usage: int
+    limit: int
+    tokens: int = 0
+    token_limit: int | None = None
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether the user has reached either of their daily limits."""
+        return self.usage >= self.limit or (
+            self.token_limit is not None and self.tokens >= self.token_limit
+        )
+
+
 class UsageLimitDAO(SQLiteDAOBase):
     """Data Access Object for managing command usage limits.
 
@@ -18,82 +46,50 @@ class UsageLimitDAO(SQLiteDAOBase):
 
     _table_name: str = "usage_limit"
 
-    async def create_table(self) -> None:
-        """Create table if it doesn't exist.
-
-        Raises
-        ------
-        ValueError
-            If the table name contains invalid characters.
-        """
-        if not self.validate_table_name(self._table_name):
-            msg = "Invalid tablename: Only alphanumeric characters and underscores are allowed."
-            raise ValueError(msg)
-
-        conn = await aiosqlite.connect(super().DB_NAME)
-        try:
-            query = f"""
-            CREATE TABLE IF NOT EXISTS {self._table_name} (
-                id           INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id      INTEGER NOT NULL UNIQUE,
-                daily_limit  INTEGER NOT NULL DEFAULT 10,
-                last_updated TIMESTAMP NOT NULL
-            );
-            """
-            await conn.execute(query)
-            await conn.commit()
-        finally:
-            await conn.close()
-
-    async def create_commands_usage_table(self) -> None:
-        """Create table for tracking commands usage if it doesn't exist.
+    async def set_default_daily_limit(self, daily_limit: int) -> None:
+        """Set or update the default daily usage limit for all users.
 
-        Raises
-        ------
-        ValueError
-            If the table name contains invalid characters.
+        Parameters
+        ----------
+        daily_limit : int
+            The maximum number of commands calls allowed per day.
         """
-        _table_name = "commands_usage"
-        if not self.validate_table_name(self._table_name):
-            msg = "Invalid tablename: Only alphanumeric characters and underscores are allowed."
-            raise ValueError(msg)
-
         conn = await aiosqlite.connect(super().DB_NAME)
+        now = datetime.datetime.now(TIMEZONE)
         try:
-            query = f"""
-            CREATE TABLE IF NOT EXISTS {_table_name} (
-                id          INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id     INTEGER NOT NULL,
-                usage_date  DATE NOT NULL,
-                usage_count INTEGER NOT NULL DEFAULT 0,
-                UNIQUE(user_id, usage_date)
-            );
+            # Use a special user_id (0) to represent the default limit
+            query = """
+            INSERT INTO usage_limit (user_id, daily_limit, last_updated)
+            VALUES (0, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                daily_limit = ?,
+                last_updated = ?
             """
-            await conn.execute(query)
+            await conn.execute(query, (daily_limit, now, daily_limit, now))
             await conn.commit()
         finally:
             await conn.close()
 
-    async def set_default_daily_limit(self, daily_limit: int) -> None:
-        """Set or update the default daily usage limit for all users.
+    async def set_default_daily_token_limit(self, daily_token_limit: int | None) -> None:
+        """Set, update or remove the default daily token limit for all users.
 
         Parameters
         ----------
-        daily_limit : int
-            The maximum number of commands calls allowed per day.
+        daily_token_limit : int | None
+            The maximum number of tokens allowed per day, None to remove the limit.
         """
         conn = await aiosqlite.connect(super().DB_NAME)
         now = datetime.datetime.now(TIMEZONE)
         try:
-            # Use a special user_id (0) to represent the default limit
+            # The default row keeps its call limit, or gets the default one
             query = """
-            INSERT INTO usage_limit (user_id, daily_limit, last_updated)
+            INSERT INTO usage_limit (user_id, daily_token_limit, last_updated)
             VALUES (0, ?, ?)
             ON CONFLICT(user_id) DO UPDATE SET
-                daily_limit = ?,
+                daily_token_limit = ?,
                 last_updated = ?
             """
-            await conn.execute(query, (daily_limit, now, daily_limit, now))
+            await conn.execute(query, (daily_token_limit, now, daily_token_limit, now))
             await conn.commit()
         finally:
             await conn.close()
@@ -196,18 +192,91 @@ class UsageLimitDAO(SQLiteDAOBase):
         finally:
             await conn.close()
 
-    # This function is dangerous (deleting data)
-    async def DELETE_ALL_USAGE_COUNTS(self) -> None:  # noqa: N802
-        """Reset all usage counts by removing records from current day."""
+    async def get_user_daily_quota(self, user_id: int) -> DailyQuota:
+        """Get the current day's usage and the daily limits of a user, in one query.
+
+        Usage counts and token usage are keyed by date, so the quota of a
+        new day starts at 0 without anything being reset. The tokens not
+        written yet aren't included, see `TokenAccounting.get_user_daily_quota()`.
+
+        Parameters
+        ----------
+        user_id : int
+            ID of the user to get the quota for.
+
+        Returns
+        -------
+        DailyQuota
+            The usage and tokens, 0 if no record found, and the limits, the
+            default limits if no limit is set for the user.
+        """
+        conn = await aiosqlite.connect(super().DB_NAME)
+        today = datetime.datetime.now(TIMEZONE).date()
+        try:
+            query = """
+            SELECT
+                COALESCE(
+                    (SELECT usage_count FROM commands_usage WHERE user_id = ? AND usage_date = ?),
+                    0
+                ),
+                COALESCE(
+                    (SELECT daily_limit FROM usage_limit WHERE user_id = ?),
+                    (SELECT daily_limit FROM usage_limit WHERE user_id = 0),
+                    10
+                ),
+                COALESCE(
+                    (
+                        SELECT SUM(
+                            input_tokens + output_tokens + cache_read_tokens + cache_write_tokens
+                        )
+                        FROM token_usage WHERE usage_date = ? AND user_id = ?
+                    ),
+                    0
+                ),
+                COALESCE(
+                    (SELECT daily_token_limit FROM usage_limit WHERE user_id = ?),
+                    (SELECT daily_token_limit FROM usage_limit WHERE user_id = 0)
+                )
+            """
+            cursor = await conn.execute(
+                query,
+                (user_id, today, user_id, today.isoformat(), user_id, user_id),
+            )
+            # A query without FROM always returns a row. The default limit is 10.
+            usage, limit, tokens, token_limit = await cursor.fetchone() or (0, 10, 0, None)
+            return DailyQuota(usage=usage, limit=limit, tokens=tokens, token_limit=token_limit)
+        finally:
+            await conn.close()
+
+    async def delete_usage_counts_before(self, date: datetime.date, batch_size: int) -> int:
+        """Delete a batch of the usage counts of the days before a date.
+
+        Each batch is deleted in its own short transaction, see
+        `purge_expired_usage_counts()`.
+
+        Parameters
+        ----------
+        date : datetime.date
+            The first day whose usage counts are kept.
+        batch_size : int
+            The maximum number of usage counts to delete.
+
+        Returns
+        -------
+        int
+            The number of usage counts deleted, less than `batch_size`
+            once none are left.
+        """
         conn = await aiosqlite.connect(super().DB_NAME)
-        yesterday = (datetime.datetime.now(TIMEZONE) - datetime.timedelta(days=1)).date()
         try:
-            # Delete data older than yesterday
             query = """
             DELETE FROM commands_usage
-            WHERE usage_date < ?
+            WHERE id IN (
+                SELECT id FROM commands_usage WHERE usage_date < ? LIMIT ?
+            )
             """
-            await conn.execute(query, (yesterday,))
+            cursor = await conn.execute(query, (date, batch_size))
             await conn.commit()
+            return cursor.rowcount
         finally:
             await conn.close()
@@ -0,0 +1,101 @@
+import asyncio
+import datetime
+import logging
+from collections.abc import Awaitable, Callable
+
+from src.comet.config.env import TOKEN_USAGE_RETENTION_DAYS, USAGE_RETENTION_DAYS
+from src.comet.config.timezone import TIMEZONE
+from src.comet.db.dao.token_usage_dao import TokenUsageDAO
+from src.comet.db.dao.usage_limit_dao import UsageLimitDAO
+
+logger = logging.getLogger(__name__)
+
+# Expired usage counts are deleted in small transactions, with a pause between them
+# that lets the commands write their usage counts
+RETENTION_BATCH_SIZE = 500
+RETENTION_BATCH_PAUSE_SECONDS = 0.1
+# Quotas don't depend on the retention, which only has to keep the table small
+RETENTION_INTERVAL_SECONDS = 3600
+
+
+async def _delete_in_batches(
+    delete_batch: Callable[[datetime.date, int], Awaitable[int]],
+    retention_days: int,
+    batch_size: int,
+    pause: float,
+) -> tuple[int, datetime.date]:
+    """Delete the rows of the days before the last `retention_days` days, a batch at a time.
+
+    Returns
+    -------
+    tuple[int, datetime.date]
+        The number of rows deleted, and the first day whose rows are kept.
+    """
+    today = datetime.datetime.now(TIMEZONE).date()
+    keep_since = today - datetime.timedelta(days=retention_days)
+    deleted = 0
+    while True:
+        batch = await delete_batch(keep_since, batch_size)
+        deleted += batch
+        if batch < batch_size:
+            break
+        await asyncio.sleep(pause)
+    return deleted, keep_since
+
+
+async def purge_expired_usage_counts(
+    batch_size: int = RETENTION_BATCH_SIZE,
+    pause: float = RETENTION_BATCH_PAUSE_SECONDS,
+) -> int:
+    """Delete the usage counts older than `USAGE_RETENTION_DAYS`, a batch at a time.
+
+    Parameters
+    ----------
+    batch_size : int
+        The number of usage counts deleted per transaction.
+    pause : float
+        The number of seconds to wait between batches.
+
+    Returns
+    -------
+    int
+        The number of usage counts deleted.
+    """
+    deleted, keep_since = await _delete_in_batches(
+        UsageLimitDAO().delete_usage_counts_before,
+        USAGE_RETENTION_DAYS,
+        batch_size,
+        pause,
+    )
+    if deleted:
+        logger.info("Deleted %d usage counts from before %s", deleted, keep_since)
+    return deleted
+
+
+async def purge_expired_token_usage(
+    batch_size: int = RETENTION_BATCH_SIZE,
+    pause: float = RETENTION_BATCH_PAUSE_SECONDS,
+) -> int:
+    """Delete the token usage older than `TOKEN_USAGE_RETENTION_DAYS`, a batch at a time.
+
+    Parameters
+    ----------
+    batch_size : int
+        The number of rows deleted per transaction.
+    pause : float
+        The number of seconds to wait between batches.
+
+    Returns
+    -------
+    int
+        The number of rows deleted.
+    """
+    deleted, keep_since = await _delete_in_batches(
+        TokenUsageDAO().delete_token_usage_before,
+        TOKEN_USAGE_RETENTION_DAYS,
+        batch_size,
+        pause,
+    )
+    if deleted:
+        logger.info("Deleted %d rows of token usage from before %s", deleted, keep_since)
+    return deleted
@@ -0,0 +1,341 @@
+import logging
+from typing import NamedTuple
+
+import aiosqlite
+
+from src.comet.db._base import SQLiteDAOBase
+
+logger = logging.getLogger(__name__)
+
+
+class Migration(NamedTuple):
+    """A step of the database schema's history.
+
+    Attributes
+    ----------
+    version : int
+        The schema version reached once the migration is applied.
+    description : str
+        What the migration changes, for the logs.
+    statements : tuple[str, ...]
+        The SQL statements of the migration, run in a single transaction.
+    """
+
+    version: int
+    description: str
+    statements: tuple[str, ...]
+
+
+# Never edit a migration that has been released, append a new one instead
+MIGRATIONS: tuple[Migration, ...] = (
+    # Databases created before versioning already have these tables
+    Migration(
+        version=1,
+        description="Create the initial tables",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS access_privilege (
+                id               INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id          INTEGER NOT NULL,
+                access_privilege TEXT_NOT_NULL,
+                enabled_at       DATE NOT NULL,
+                disabled_at      DATE DEFAULT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS usage_limit (
+                id           INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id      INTEGER NOT NULL UNIQUE,
+                daily_limit  INTEGER NOT NULL DEFAULT 10,
+                last_updated TIMESTAMP NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS commands_usage (
+                id          INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id     INTEGER NOT NULL,
+                usage_date  DATE NOT NULL,
+                usage_count INTEGER NOT NULL DEFAULT 0,
+                UNIQUE(user_id, usage_date)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS command_sync (
+                scope       TEXT PRIMARY KEY,
+                schema_hash TEXT NOT NULL,
+                synced_at   TIMESTAMP NOT NULL
+            )
+            """,
+        ),
+    ),
+    # 'TEXT_NOT_NULL' was read by SQLite as a type name, without the NOT NULL constraint.
+    # Column constraints can't be altered, so the table is rebuilt.
+    Migration(
+        version=2,
+        description="Make access_privilege.access_privilege a non-null TEXT column",
+        statements=(
+            """
+            CREATE TABLE access_privilege_new (
+                id               INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id          INTEGER NOT NULL,
+                access_privilege TEXT NOT NULL,
+                enabled_at       DATE NOT NULL,
+                disabled_at      DATE DEFAULT NULL
+            )
+            """,
+            # A row without a privilege grants nothing
+            """
+            INSERT INTO access_privilege_new
+                (id, user_id, access_privilege, enabled_at, disabled_at)
+            SELECT id, user_id, access_privilege, enabled_at, disabled_at
+            FROM access_privilege
+            WHERE access_privilege IS NOT NULL
+            """,
+            "DROP TABLE access_privilege",
+            "ALTER TABLE access_privilege_new RENAME TO access_privilege",
+        ),
+    ),
+    # The point lookups of usage_limit and commands_usage are served by the indexes of their
+    # UNIQUE constraints, which SQLite prefers for a single-row match
+    Migration(
+        version=3,
+        description="Add indexes for the access privilege lookups and the usage cleanup",
+        statements=(
+            # Used by fetch_user_ids_by_access_privilege(), answered from the index alone
+            """
+            CREATE INDEX IF NOT EXISTS access_privilege_by_privilege
+            ON access_privilege (access_privilege, disabled_at, user_id)
+            """,
+            # Used by disable()
+            """
+            CREATE INDEX IF NOT EXISTS access_privilege_by_user
+            ON access_privilege (user_id, access_privilege)
+            """,
+            # Used by delete_usage_counts_before()
+            """
+            CREATE INDEX IF NOT EXISTS commands_usage_by_date
+            ON commands_usage (usage_date)
+            """,
+        ),
+    ),
+    # access_privilege kept every grant with its revocation date, so every lookup filtered the
+    # whole history. The privileges in effect now get their own table, keyed like the lookups,
+    # and the grants and revocations are appended to a separate log.
+    Migration(
+        version=4,
+        description="Split access_privilege into the current privileges and their history",
+        statements=(
+            """
+            CREATE TABLE access_privilege_current (
+                user_id    INTEGER NOT NULL,
+                privilege  TEXT NOT NULL,
+                enabled_at DATE NOT NULL,
+                PRIMARY KEY (user_id, privilege)
+            ) WITHOUT ROWID
+            """,
+            # Used by fetch_user_ids_by_access_privilege(), the primary key completes each entry
+            """
+            CREATE INDEX access_privilege_current_by_privilege
+            ON access_privilege_current (privilege)
+            """,
+            """
+            CREATE TABLE access_privilege_history (
+                id         INTEGER PRIMARY KEY,
+                user_id    INTEGER NOT NULL,
+                privilege  TEXT NOT NULL,
+                action     TEXT NOT NULL CHECK (action IN ('enable', 'disable')),
+                changed_at TIMESTAMP NOT NULL
+            )
+            """,
+            # Duplicate active grants, which enable() used to create, are merged
+            """
+            INSERT INTO access_privilege_current (user_id, privilege, enabled_at)
+            SELECT user_id, access_privilege, MIN(enabled_at)
+            FROM access_privilege
+            WHERE disabled_at IS NULL
+            GROUP BY user_id, access_privilege
+            """,
+            """
+            INSERT INTO access_privilege_history (user_id, privilege, action, changed_at)
+            SELECT user_id, privilege, action, changed_at FROM (
+                SELECT id, user_id, access_privilege AS privilege, 'enable' AS action,
+                    enabled_at AS changed_at
+                FROM access_privilege
+                UNION ALL
+                SELECT id, user_id, access_privilege, 'disable', disabled_at
+                FROM access_privilege
+                WHERE disabled_at IS NOT NULL
+            )
+            ORDER BY changed_at, id, action DESC
+            """,
+            "DROP TABLE access_privilege",
+        ),
+    ),
+    # commands_usage only holds the daily count of each user, and is emptied every night.
+    # The rollups are kept, and keyed like the exports read them.
+    Migration(
+        version=5,
+        description="Add the hourly and daily usage rollups",
+        statements=(
+            # bucket is the local hour, formatted as 'YYYY-MM-DD HH:00'
+            """
+            CREATE TABLE usage_rollup_hourly (
+                bucket         TEXT NOT NULL,
+                command        TEXT NOT NULL,
+                model          TEXT NOT NULL,
+                guild_id       INTEGER NOT NULL,
+                requests       INTEGER NOT NULL DEFAULT 0,
+                errors         INTEGER NOT NULL DEFAULT 0,
+                prompt_chars   INTEGER NOT NULL DEFAULT 0,
+                response_chars INTEGER NOT NULL DEFAULT 0,
+                duration_ms    INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket, command, model, guild_id)
+            ) WITHOUT ROWID
+            """,
+            # bucket is the local date, formatted as 'YYYY-MM-DD'
+            """
+            CREATE TABLE usage_rollup_daily (
+                bucket         TEXT NOT NULL,
+                command        TEXT NOT NULL,
+                model          TEXT NOT NULL,
+                guild_id       INTEGER NOT NULL,
+                requests       INTEGER NOT NULL DEFAULT 0,
+                errors         INTEGER NOT NULL DEFAULT 0,
+                prompt_chars   INTEGER NOT NULL DEFAULT 0,
+                response_chars INTEGER NOT NULL DEFAULT 0,
+                duration_ms    INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket, command, model, guild_id)
+            ) WITHOUT ROWID
+            """,
+        ),
+    ),
+    # The scheduler catches up on the runs missed while the bot was stopped
+    Migration(
+        version=6,
+        description="Add the last runs of the scheduled jobs",
+        statements=(
+            """
+            CREATE TABLE scheduled_job (
+                name              TEXT PRIMARY KEY,
+                last_scheduled_at TIMESTAMP NOT NULL,
+                last_started_at   TIMESTAMP NOT NULL,
+                last_status       TEXT NOT NULL,
+                last_duration_ms  REAL NOT NULL
+            ) WITHOUT ROWID
+            """,
+        ),
+    ),
+    # Daily limits can be set in tokens as well as in calls
+    Migration(
+        version=7,
+        description="Add the token usage of the users and the daily token limit",
+        statements=(
+            # usage_date is the local date. The quotas read the tokens of a user on a date,
+            # and the retention deletes the dates before another, both by the primary key.
+            """
+            CREATE TABLE token_usage (
+                usage_date         DATE NOT NULL,
+                user_id            INTEGER NOT NULL,
+                guild_id           INTEGER NOT NULL,
+                command            TEXT NOT NULL,
+                model              TEXT NOT NULL,
+                calls              INTEGER NOT NULL DEFAULT 0,
+                input_tokens       INTEGER NOT NULL DEFAULT 0,
+                output_tokens      INTEGER NOT NULL DEFAULT 0,
+                cache_read_tokens  INTEGER NOT NULL DEFAULT 0,
+                cache_write_tokens INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (usage_date, user_id, guild_id, command, model)
+            ) WITHOUT ROWID
+            """,
+            # NULL sets no token limit
+            "ALTER TABLE usage_limit ADD COLUMN daily_token_limit INTEGER DEFAULT NULL",
+        ),
+    ),
+)
+
+
+class SchemaMigrator(SQLiteDAOBase):
+    """Bring the database schema up to date.
+
+    The schema version is stored in SQLite's `user_version` pragma, and
+    each pending migration is applied in its own transaction together with
+    the version it reaches, so a failed migration leaves the database at
+    the previous version.
+
+    Parameters
+    ----------
+    migrations : tuple[Migration, ...]
+        The migrations, ordered by version. Defaults to `MIGRATIONS`.
+    """
+
+    def __init__(self, migrations: tuple[Migration, ...] = MIGRATIONS) -> None:
+        self.migrations = migrations
+
+    async def get_version(self) -> int:
+        """Get the schema version of the database.
+
+        Returns
+        -------
+        int
+            The version of the last applied migration, 0 for a new database.
+        """
+        conn = await aiosqlite.connect(super().DB_NAME)
+        try:
+            cursor = await conn.execute("PRAGMA user_version")
+            row = await cursor.fetchone()
+            return int(row[0]) if row else 0
+        finally:
+            await conn.close()
+
+    async def migrate(self) -> int:
+        """Apply the pending migrations.
+
+        Returns
+        -------
+        int
+            The schema version of the database after migrating.
+
+        Raises
+        ------
+        RuntimeError
+            If the database was migrated by a newer version of the application.
+        """
+        latest = self.migrations[-1].version if self.migrations else 0
+        # Transactions are managed explicitly, as DDL statements must be part of them
+        conn = await aiosqlite.connect(super().DB_NAME, isolation_level=None)
+        try:
+            cursor = await conn.execute("PRAGMA user_version")
+            row = await cursor.fetchone()
+            version = int(row[0]) if row else 0
+            if version > latest:
+                msg = f"The database schema version {version} is newer than {latest}."
+                raise RuntimeError(msg)
+
+            for migration in self.migrations:
+                if migration.version <= version:
+                    continue
+                # Locks the database for writing, so concurrent starts can't both apply it
+                await conn.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor = await conn.execute("PRAGMA user_version")
+                    row = await cursor.fetchone()
+                    if row and int(row[0]) >= migration.version:
+                        await conn.execute("ROLLBACK")
+                        continue
+                    for statement in migration.statements:
+                        await conn.execute(statement)
+                    # PRAGMA doesn't accept parameters, the version is an int from the code
+                    await conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+                    await conn.execute("COMMIT")
+                except BaseException:
+                    await conn.execute("ROLLBACK")
+                    raise
+                logger.info(
+                    "Migrated the database to version %d: %s",
+                    migration.version,
+                    migration.description,
+                )
+                version = migration.version
+            return version
+        finally:
+            await conn.close()
@@ -1,17 +1,70 @@
-from discord import Client, Intents, app_commands
+import hashlib
+import json
+import logging
+from typing import Any
 
-from src.comet._cli import parse_args_and_setup_logging
+from discord import AutoShardedClient, Intents, MemberCacheFlags, Object, app_commands
 
-logger = parse_args_and_setup_logging()
+from src.comet._cli import parse_args
+from src.comet.config.env import (
+    AUTHORIZED_SERVER_IDS,
+    COMMAND_SYNC_MODE,
+    MEMORY_PROFILE,
+    SHARD_COUNT,
+    SHARD_IDS,
+)
+from src.comet.db.dao.command_sync_dao import CommandSyncDAO
 
-intents = Intents.default()
-intents.message_content = True
-intents.members = True
+logger = logging.getLogger(__name__)
 
 
-class BotClient(Client):
+def _memory_profile_options(profile: str) -> dict[str, Any]:
+    """Build the client options controlling the gateway intents and caches.
+
+    Parameters
+    ----------
+    profile : str
+        "default" requests the members intent, chunks every guild at
+        startup and caches all members and the last 1000 messages.
+        "lean" skips the members intent and member caching entirely, and
+        caches only the last 100 messages. Members are then fetched on
+        demand.
+
+    Returns
+    -------
+    dict[str, Any]
+        Keyword arguments for the client constructor.
+
+    Raises
+    ------
+    ValueError
+        If the profile is unknown.
+    """
+    intents = Intents.default()
+    intents.message_content = True
+
+    if profile == "default":
+        intents.members = True
+        return {"intents": intents}
+    if profile == "lean":
+        return {
+            "intents": intents,
+            "chunk_guilds_at_startup": False,
+            "member_cache_flags": MemberCacheFlags.none(),
+            "max_messages": 100,
+        }
+    msg = f"Unknown memory profile: {profile!r}. Expected 'default' or 'lean'."
+    raise ValueError(msg)
+
+
+class BotClient(AutoShardedClient):
     """A singleton bot client for Discord applications.
 
+    The client runs `SHARD_COUNT` gateway shards, one by default. With
+    `SHARD_COUNT=auto` the number of shards recommended by Discord is
+    used, and `SHARD_IDS` restricts the shards run by this process.
+    `MEMORY_PROFILE` controls which members and messages are cached.
+
     Attributes
     ----------
     _instance : BotClient
@@ -24,7 +77,11 @@ class BotClient(Client):
     tree: app_commands.CommandTree
 
     def __init__(self) -> None:
-        super().__init__(intents=intents)
+        options = _memory_profile_options(MEMORY_PROFILE)
+        if SHARD_IDS is None:
+            super().__init__(shard_count=SHARD_COUNT, **options)
+        else:
+            super().__init__(shard_count=SHARD_COUNT, shard_ids=SHARD_IDS, **options)
         self.tree = app_commands.CommandTree(self)
 
     @classmethod
@@ -40,15 +97,90 @@ class BotClient(Client):
             cls._instance = cls()
         return cls._instance
 
+    def _command_schema_hash(self, guild: Object | None = None) -> str:
+        """Compute a stable hash of the commands registered for a scope.
+
+        Parameters
+        ----------
+        guild : Object | None
+            The guild whose commands are hashed, or None for global commands.
+
+        Returns
+        -------
+        str
+            The SHA-256 hex digest of the serialized commands.
+        """
+        payload = sorted(
+            (cmd.to_dict(self.tree) for cmd in self.tree.get_commands(guild=guild)),
+            key=lambda cmd: (cmd["type"], cmd["name"]),
+        )
+        serialized = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(serialized.encode()).hexdigest()
+
+    async def _sync_if_changed(self, scope: str, guild: Object | None, *, force: bool) -> None:
+        """Sync the commands of a scope if they differ from the last synced ones.
+
+        Parameters
+        ----------
+        scope : str
+            The key under which the hash of the scope is stored.
+        guild : Object | None
+            The guild to sync, or None for global commands.
+        force : bool
+            Sync even if the commands are unchanged.
+        """
+        dao = CommandSyncDAO()
+        schema_hash = self._command_schema_hash(guild)
+        last_hash = await dao.get_schema_hash(scope)
+        # Guilds that never received commands from the bot have nothing to clear
+        if last_hash is None and guild is not None and not self.tree.get_commands(guild=guild):
+            last_hash = schema_hash
+
+        if not force and schema_hash == last_hash:
+            logger.info("Commands for %s are unchanged, skipping sync", scope)
+            return
+
+        synced_cmds = await self.tree.sync(guild=guild)
+        await dao.set_schema_hash(scope, schema_hash)
+        logger.info("Synced %d commands for %s", len(synced_cmds), scope)
+
     async def setup_hook(self) -> None:
-        """Set up the bot before connecting to the Discord gateway."""
-        synced_cmds = await self.tree.sync()
+        """Set up the bot before connecting to the Discord gateway.
+
+        Commands are synced only when their schema changed since the last
+        sync, or when the `--force-sync` option is given. With
+        `COMMAND_SYNC_MODE=guild`, the commands are registered to each of
+        the authorized servers instead of globally.
+        """
+        force = parse_args().force_sync
+        guilds = [Object(id=guild_id) for guild_id in AUTHORIZED_SERVER_IDS]
+
+        if COMMAND_SYNC_MODE == "guild":
+            for guild in guilds:
+                self.tree.copy_global_to(guild=guild)
+            # Global commands would show up twice in the authorized servers
+            self.tree.clear_commands(guild=None)
+
+        await self._sync_if_changed("global", None, force=force)
+        for guild in guilds:
+            await self._sync_if_changed(f"guild:{guild.id}", guild, force=force)
         logger.info("Setup hook completed")
-        logger.info("Synced %d commands", len(synced_cmds))
+
+    async def on_shard_ready(self, shard_id: int) -> None:
+        """Handle the ready event of a single shard.
+
+        Parameters
+        ----------
+        shard_id : int
+            The ID of the shard that became ready.
+        """
+        shard = self.get_shard(shard_id)
+        latency_ms = shard.latency * 1000 if shard is not None else float("nan")
+        logger.info("Shard %d is ready (latency: %.0f ms)", shard_id, latency_ms)
 
     async def on_ready(self) -> None:
         """Handle the bot's ready event."""
-        logger.info("%s is ready!!", self.user)
+        logger.info("%s is ready with %d shard(s)!!", self.user, self.shard_count or 1)
         for cmd in self.tree.walk_commands():
             logger.info("Command Name: %s", cmd.name)
 
@@ -1,5 +1,7 @@
 from .access_commands import *
+from .analytics_commands import *
 from .chat_command import *
+from .debug_command import *
 from .fixpy_command import *
 from .limit_commands import *
 from .talk_command import *
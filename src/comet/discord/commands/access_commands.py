@@ -1,14 +1,62 @@
-from discord import Interaction, SelectOption, User
+import logging
+
+from discord import Guild, Interaction, Member, NotFound, SelectOption, User
 from discord.ui import Select, View
 
-from src.comet._cli import parse_args_and_setup_logging
 from src.comet.db.dao.access_privilege_dao import AccessPrivilegeDAO
 from src.comet.discord.client import BotClient
+from src.comet.utils.cache import TTLCache
 from src.comet.utils.decorators import *
+from src.comet.utils.stats import RuntimeStats
 
 access_dao = AccessPrivilegeDAO()
 client = BotClient.get_instance()
-logger = parse_args_and_setup_logging()
+logger = logging.getLogger(__name__)
+
+# (guild_id, user_id) -> Member fetched from the API
+member_cache: TTLCache[tuple[int, int], Member] = TTLCache(maxsize=256, ttl=300)
+RuntimeStats().register_cache("members", member_cache.cache_info)
+
+
+async def get_guild_member(guild: Guild, user: User | Member) -> Member | None:
+    """Get a user as a member of a guild without relying on the member cache.
+
+    The member resolved by Discord with the interaction is used when
+    available, then the gateway cache, then a short-lived cache of
+    members fetched from the API.
+
+    Parameters
+    ----------
+    guild : Guild
+        The guild the user should belong to.
+    user : User | Member
+        The user given as a command option.
+
+    Returns
+    -------
+    Member | None
+        The member, or None if the user isn't in the guild.
+
+    Raises
+    ------
+    HTTPException
+        If fetching the member failed for another reason, e.g. rate limits.
+    """
+    if isinstance(user, Member) and user.guild.id == guild.id:
+        return user
+    member = guild.get_member(user.id)
+    if member is not None:
+        return member
+
+    key = (guild.id, user.id)
+    member = member_cache.get(key)
+    if member is None:
+        try:
+            member = await guild.fetch_member(user.id)
+        except NotFound:
+            return None
+        member_cache.set(key, member)
+    return member
 
 
 class AccessGrantSelector(Select):
@@ -142,7 +190,7 @@ async def grant_access_command(interaction: Interaction, user: User) -> None:
         )
         return
 
-    target_user = interaction.guild.get_member(target_user_id)
+    target_user = await get_guild_member(interaction.guild, user)
     if target_user is None:
         await interaction.response.send_message(
             "The user does not exist in the guild",
@@ -191,7 +239,7 @@ async def check_access_command(interaction: Interaction, user: User) -> None:
         )
         return
 
-    target_user = interaction.guild.get_member(target_user_id)
+    target_user = await get_guild_member(interaction.guild, user)
     if target_user is None:
         await interaction.response.send_message(
             "The user does not exist in the guild",
@@ -199,22 +247,21 @@ async def check_access_command(interaction: Interaction, user: User) -> None:
         )
         return
 
-    advanced_user_ids = await access_dao.fetch_user_ids_by_access_privilege("advanced")
-    blocked_user_ids = await access_dao.fetch_user_ids_by_access_privilege("blocked")
+    privileges = await access_dao.fetch_access_privileges(target_user_id)
 
-    if target_user_id in advanced_user_ids and target_user_id in blocked_user_ids:
+    if "advanced" in privileges and "blocked" in privileges:
         await interaction.response.send_message(
             f"The user (ID: `{target_user_id}`) has the access privilege `advanced` and `blocked`",
             ephemeral=True,
         )
         return
-    if target_user_id in advanced_user_ids:
+    if "advanced" in privileges:
         await interaction.response.send_message(
             f"The user (ID: `{target_user_id}`) has the access privilege `advanced`",
             ephemeral=True,
         )
         return
-    if target_user_id in blocked_user_ids:
+    if "blocked" in privileges:
         await interaction.response.send_message(
             f"The user (ID: `{target_user_id}`) has the access privilege `blocked`",
             ephemeral=True,
@@ -251,7 +298,7 @@ async def disable_access_command(interaction: Interaction, user: User) -> None:
         )
         return
 
-    target_user = interaction.guild.get_member(target_user_id)
+    target_user = await get_guild_member(interaction.guild, user)
     if target_user is None:
         await interaction.response.send_message(
             "The user does not exist in the guild",
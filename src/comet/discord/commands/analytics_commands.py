@@ -0,0 +1,92 @@
+import datetime
+import io
+import logging
+import tempfile
+from typing import Literal
+
+from discord import File, Interaction, app_commands
+
+from src.comet.analytics.export import export_usage
+from src.comet.analytics.usage import usage_analytics
+from src.comet.config.timezone import TIMEZONE
+from src.comet.discord.client import BotClient
+from src.comet.utils.decorators import *
+
+client = BotClient.get_instance()
+logger = logging.getLogger(__name__)
+
+# The upload limit of a guild without boosts
+_DEFAULT_FILESIZE_LIMIT = 10 * 2**20
+
+
+@client.tree.command(name="export_usage", description="Export the usage rollups as a file")
+@app_commands.rename(export_format="format")
+@is_authorized_server()  # type: ignore # noqa: F405
+@is_admin_user()  # type: ignore # noqa: F405
+async def export_usage_command(
+    interaction: Interaction,
+    granularity: Literal["hourly", "daily"] = "daily",
+    export_format: Literal["csv", "jsonl"] = "csv",
+    days: app_commands.Range[int, 1, 366] = 30,
+) -> None:
+    """Export the usage rollups of the last days as a file.
+
+    The rollups are written to a temporary file a chunk at a time, so
+    only the file is sent. Larger periods can be exported with
+    `python -m src.comet.analytics`.
+
+    Parameters
+    ----------
+    interaction : Interaction
+        The interaction object from the command.
+    granularity : Literal["hourly", "daily"]
+        Whether to export the hourly or the daily rollups. Defaults to "daily".
+    export_format : Literal["csv", "jsonl"]
+        The format of the file. Defaults to "csv".
+    days : int
+        The number of days to export, including today. Defaults to 30.
+    """
+    try:
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        # Include the generations that are still counted in memory
+        await usage_analytics.flush()
+
+        until = datetime.datetime.now(TIMEZONE).date()
+        since = until - datetime.timedelta(days=days - 1)
+        limit = interaction.guild.filesize_limit if interaction.guild else _DEFAULT_FILESIZE_LIMIT
+        with tempfile.TemporaryFile() as raw:
+            text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+            written = await export_usage(
+                text,
+                granularity,
+                since,
+                until,
+                export_format=export_format,
+            )
+            text.flush()
+            # Leave the temporary file open for the upload
+            text.detach()
+
+            if raw.tell() > limit:
+                await interaction.followup.send(
+                    "**ERROR** - The export is too large to upload. "
+                    "Export fewer days, or use `python -m src.comet.analytics`.",
+                    ephemeral=True,
+                )
+                return
+
+            raw.seek(0)
+            filename = f"usage-{granularity}-{since}-{until}.{export_format}"
+            await interaction.followup.send(
+                f"Exported {written} {granularity} rollups from {since} to {until}.",
+                file=File(raw, filename=filename),
+                ephemeral=True,
+            )
+        logger.info("%s exported %d %s usage rollups", interaction.user, written, granularity)
+    except Exception:
+        await interaction.followup.send(
+            "**ERROR** - An error occurred while exporting the usage.",
+            ephemeral=True,
+        )
+        logger.exception("An error occurred in the export_usage command")
@@ -1,23 +1,28 @@
+import logging
+
 from discord import Interaction
 
-from src.comet._cli import parse_args_and_setup_logging
 from src.comet.adapters.chat import ChatMessage
+from src.comet.adapters.delivery import deliver_text
+from src.comet.adapters.response import ResponseStatus, moderation_flagged_embed
 from src.comet.ai.models.gpt_model import GPTModelParams
 from src.comet.ai.models.storage import ModelParamsStore
 from src.comet.ai.services.completion import generate_openai_response
+from src.comet.ai.services.moderation import moderate_generation
+from src.comet.analytics.scope import attribute
+from src.comet.config import yml
 from src.comet.config.env import (
     CHAT_MODEL,
     GPT_DEFAULT_MAX_TOKENS,
     GPT_DEFAULT_TEMPERATURE,
     GPT_DEFAULT_TOP_P,
 )
-from src.comet.config.yml import CHAT_SYSTEM
 from src.comet.db.dao.usage_limit_dao import UsageLimitDAO
 from src.comet.discord.client import BotClient
 from src.comet.utils.decorators import *
 
 client = BotClient.get_instance()
-logger = parse_args_and_setup_logging()
+logger = logging.getLogger(__name__)
 model_params = ModelParamsStore()
 
 
@@ -28,6 +33,7 @@ async def chat_command(interaction: Interaction, prompt: str) -> None:
     try:
         user = interaction.user
         logger.info("User ( %s ) is chatting with the Comet.", user)
+        attribute("chat", interaction.guild_id, user.id)
 
         await interaction.response.defer()
 
@@ -48,13 +54,19 @@ async def chat_command(interaction: Interaction, prompt: str) -> None:
 
         message = ChatMessage(role="user", content=prompt)
 
-        response = await generate_openai_response(
-            system_prompt=CHAT_SYSTEM,
-            prompt=[message],
-            model_params=model_params,
+        response = await moderate_generation(
+            generate_openai_response(
+                system_prompt=yml.CHAT_SYSTEM,
+                prompt=[message],
+                model_params=model_params,
+            ),
+            prompt,
         )
 
-        await interaction.followup.send(f"{response.result}")
+        if response.status == ResponseStatus.MODERATION_FLAGGED:
+            await interaction.followup.send(embed=moderation_flagged_embed())
+        else:
+            await deliver_text(interaction.followup.send, f"{response.result}")
 
         await UsageLimitDAO().increment_usage_count(user.id)
     except Exception as err:
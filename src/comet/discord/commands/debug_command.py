@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import re
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+from discord import Colour, Embed, Interaction
+
+from src.comet.config.timezone import TIMEZONE
+from src.comet.db._base import SQLiteDAOBase
+from src.comet.discord.client import BotClient
+from src.comet.scheduler.jobs import job_scheduler
+from src.comet.utils.decorators import *
+from src.comet.utils.stats import RuntimeStats, rss_mib
+
+client = BotClient.get_instance()
+logger = logging.getLogger(__name__)
+runtime_stats = RuntimeStats()
+
+# Discord rejects embed field values longer than 1024 characters
+_MAX_FIELD_CHARS = 1024
+_TOP_N = 8
+_DEFAULT_TASK_NAME = re.compile(r"^Task-\d+$")
+
+
+def _format_lines(lines: list[str]) -> str:
+    """Join lines into a code block that fits into a single embed field."""
+    body = "\n".join(lines) if lines else "-"
+    if len(body) > _MAX_FIELD_CHARS - 8:
+        body = body[: _MAX_FIELD_CHARS - 12] + "\n..."
+    return f"```\n{body}\n```"
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours:02d}:{minutes:02d}:{secs:02d}"
+
+
+def _task_counts() -> list[str]:
+    """Count running asyncio tasks grouped by task name.
+
+    Unnamed tasks ("Task-123") are grouped by their coroutine instead.
+    """
+    counts: Counter[str] = Counter()
+    for task in asyncio.all_tasks():
+        name = task.get_name()
+        if _DEFAULT_TASK_NAME.match(name):
+            name = getattr(task.get_coro(), "__qualname__", name)
+        counts[name] += 1
+    total = sum(counts.values())
+    return [f"total: {total}"] + [
+        f"{count:>4} {name}" for name, count in counts.most_common(_TOP_N)
+    ]
+
+
+def _memory_lines() -> list[str]:
+    lines = [f"rss: {rss_mib():.1f} MiB"]
+    if not tracemalloc.is_tracing():
+        lines.append("tracemalloc: off (set PYTHONTRACEMALLOC=1)")
+        return lines
+    current, peak = tracemalloc.get_traced_memory()
+    lines.append(f"traced: {current / 2**20:.1f} MiB (peak {peak / 2**20:.1f} MiB)")
+    stats = tracemalloc.take_snapshot().statistics("lineno")
+    for stat in stats[:_TOP_N]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 2**10:>8.1f} KiB {Path(frame.filename).name}:{frame.lineno}")
+    return lines
+
+
+def _job_lines() -> list[str]:
+    lines = []
+    for name, stats in job_scheduler.job_stats().items():
+        next_run = (
+            stats.next_run_at.astimezone(TIMEZONE).strftime("%m-%d %H:%M:%S")
+            if stats.next_run_at is not None
+            else "-"
+        )
+        last = "-" if stats.last_duration_ms is None else f"{stats.last_duration_ms:.0f}"
+        peak = "-" if stats.max_duration_ms is None else f"{stats.max_duration_ms:.0f}"
+        lines.append(
+            f"{name}: next={next_run} runs={stats.runs} failed={stats.failures}"
+            f" skipped={stats.skipped} running={stats.running} last={last}ms max={peak}ms",
+        )
+    return lines
+
+
+def _shard_event_rate(shard_id: int) -> float:
+    rate = runtime_stats.shard_events.get(shard_id)
+    return rate.per_second() if rate is not None else 0.0
+
+
+async def _database_line() -> str:
+    try:
+        elapsed_ms = await SQLiteDAOBase().ping()
+    except Exception as err:  # noqa: BLE001
+        return f"ERROR ({err.__class__.__name__})"
+    return f"OK ({elapsed_ms:.1f} ms)"
+
+
+@client.tree.command(name="debug", description="Show runtime statistics of the bot")
+@is_authorized_server()  # type: ignore # noqa: F405
+@is_admin_user()  # type: ignore # noqa: F405
+async def debug_command(interaction: Interaction) -> None:
+    """Show live runtime statistics of the bot.
+
+    Parameters
+    ----------
+    interaction : Interaction
+        The interaction object from the command.
+
+    Notes
+    -----
+    Every statistic is read from in-memory counters, except for the
+    database check which runs a single `SELECT 1`.
+    """
+    try:
+        embed = Embed(title="Runtime statistics", color=Colour.dark_grey())
+        embed.add_field(name="Uptime", value=_format_duration(runtime_stats.uptime), inline=True)
+        embed.add_field(
+            name="Gateway latency",
+            value=f"{client.latency * 1000:.0f} ms",
+            inline=True,
+        )
+        embed.add_field(name="Database", value=await _database_line(), inline=True)
+
+        shards = [
+            f"{shard_id}: {latency * 1000:.0f} ms, {_shard_event_rate(shard_id):.2f} events/s"
+            for shard_id, latency in client.latencies
+        ]
+        embed.add_field(name="Shards", value=_format_lines(shards), inline=False)
+
+        inflight = [f"{provider}: {count}" for provider, count in runtime_stats.inflight.items()]
+        embed.add_field(name="In-flight generations", value=_format_lines(inflight), inline=False)
+
+        queues = [f"{name}: {depth}" for name, depth in runtime_stats.queue_depths().items()]
+        embed.add_field(name="Queue depths", value=_format_lines(queues), inline=False)
+
+        caches = []
+        for name, info in runtime_stats.cache_infos().items():
+            hit_rate = "-" if info.hit_rate is None else f"{info.hit_rate:.1%}"
+            caches.append(f"{name}: size={info.size} hit_rate={hit_rate}")
+        embed.add_field(name="Caches", value=_format_lines(caches), inline=False)
+
+        embed.add_field(name="Scheduled jobs", value=_format_lines(_job_lines()), inline=False)
+        embed.add_field(name="Tasks", value=_format_lines(_task_counts()), inline=False)
+        embed.add_field(name="Memory", value=_format_lines(_memory_lines()), inline=False)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    except Exception:
+        await interaction.response.send_message(
+            "**ERROR** - An error occurred while collecting the runtime statistics.",
+            ephemeral=True,
+        )
+        logger.exception("An error occurred in the debug command")
@@ -1,29 +1,165 @@
+import io
+import logging
+
+import aiohttp
 from discord import (
+    Attachment,
+    File,
     Interaction,
     TextStyle,
 )
 from discord.ui import Modal, TextInput
 
-from src.comet._cli import parse_args_and_setup_logging
-from src.comet.adapters.chat import ChatMessage
+from src.comet.adapters.attachment import read_text_attachment
+from src.comet.adapters.delivery import deliver_text
+from src.comet.adapters.response import ResponseStatus, moderation_flagged_embed
 from src.comet.ai.models.claude_model import ClaudeModelParams
 from src.comet.ai.models.storage import ModelParamsStore
-from src.comet.ai.services.completion import generate_anthropic_response
+from src.comet.analytics.scope import attribute
+from src.comet.config import yml
 from src.comet.config.env import (
     CLAUDE_DEFAULT_MAX_TOKENS,
+    FIXPY_MAX_FILE_BYTES,
     FIXPY_MODEL,
+    FIXPY_OUTPUT_MODE,
     FIXPY_TEMPERATURE,
     FIXPY_TOP_P,
 )
-from src.comet.config.yml import FIXPY_SYSTEM
 from src.comet.db.dao.access_privilege_dao import AccessPrivilegeDAO
 from src.comet.discord.client import BotClient
+from src.comet.fixpy.fixing import Fix, request_fix, validate_fix
+from src.comet.fixpy.modules import ModuleFix, fix_module
+from src.comet.fixpy.patching import make_patch
+from src.comet.fixpy.precheck import Diagnostic, format_diagnostics, precheck_worker
+from src.comet.utils.cache import TTLCache
 from src.comet.utils.decorators import *
+from src.comet.utils.stats import RuntimeStats
 
 access_dao = AccessPrivilegeDAO()
 client = BotClient.get_instance()
-logger = parse_args_and_setup_logging()
+logger = logging.getLogger(__name__)
 model_params = ModelParamsStore()
+# The fixes of the code, by user and cache key of its precheck. A fix carries the
+# comments of the code it was asked for, so it's only sent back to the same user
+fix_cache: TTLCache[tuple[int, str], Fix] = TTLCache(maxsize=256, ttl=24 * 3600)
+RuntimeStats().register_cache("fixpy_results", fix_cache.cache_info)
+# The number of compiler errors of a fixed file listed in the reply
+_MAX_LISTED_ERRORS = 5
+# Longer patches are only attached
+_MAX_INLINE_PATCH_CHARS = 1500
+_FIXED_FILENAME = "fixed.py"
+
+
+def _fix_params() -> ClaudeModelParams:
+    return ClaudeModelParams(
+        model=FIXPY_MODEL,
+        max_tokens=CLAUDE_DEFAULT_MAX_TOKENS,
+        temperature=FIXPY_TEMPERATURE,
+        top_p=FIXPY_TOP_P,
+    )
+
+
+def _describe_module_fix(filename: str, module_fix: ModuleFix) -> str:
+    """Summarize the fix of an attached file for the reply."""
+    parts = "1 part" if module_fix.parts == 1 else f"{module_fix.parts} parts"
+    lines = [f"Fixed `{filename}` in {parts}."]
+    if module_fix.unfixed_parts:
+        numbers = ", ".join(str(number) for number in module_fix.unfixed_parts)
+        lines.append(f"Parts {numbers} couldn't be fixed and are unchanged.")
+    if module_fix.flagged:
+        lines.append("Some parts were flagged by moderation.")
+    errors = tuple(d for d in module_fix.diagnostics if d.severity == "error")
+    if errors:
+        lines.append(_describe_compile_errors(errors))
+    return "\n".join(lines)
+
+
+def _describe_compile_errors(errors: tuple[Diagnostic, ...]) -> str:
+    listed = format_diagnostics(errors[:_MAX_LISTED_ERRORS])
+    return f"**WARNING** - The fixed code doesn't compile:\n{listed}"
+
+
+def _patch_files(patch: str, fixed: str, filename: str) -> list[File]:
+    stem = filename.removesuffix(".py")
+    return [
+        File(io.BytesIO(patch.encode()), filename=f"{stem}.patch"),
+        File(io.BytesIO(fixed.encode()), filename=filename),
+    ]
+
+
+async def _send_fix(interaction: Interaction, code: str, fix: Fix) -> None:
+    """Send the fix of the code entered in the modal.
+
+    In the "diff" output mode, a fix made by a diff is sent as the patch of
+    the code to the fixed code, and the fixed code. The patch is made from
+    the code, so that a cached fix of differently formatted code applies.
+    Other fixes are sent as the reply of the model.
+
+    Parameters
+    ----------
+    interaction : Interaction
+        The interaction instance.
+    code : str
+        The code entered in the modal.
+    fix : Fix
+        The fix of the code, or of code differing from it only in formatting
+        and comments.
+    """
+    if FIXPY_OUTPUT_MODE != "diff" or not fix.patched or fix.code is None:
+        await deliver_text(interaction.followup.send, f"{fix.response}", ephemeral=True)
+        return
+
+    patch = make_patch(code, fix.code, _FIXED_FILENAME)
+    if not patch:
+        message = "No changes were needed."
+    elif len(patch) <= _MAX_INLINE_PATCH_CHARS:
+        message = f"```diff\n{patch}```"
+    else:
+        message = (
+            f"*The patch ({len(patch.splitlines()):,} lines) and the fixed code are attached.*"
+        )
+    await interaction.followup.send(
+        message,
+        files=_patch_files(patch, fix.code, _FIXED_FILENAME),
+        ephemeral=True,
+    )
+
+
+async def _fix_attachment(interaction: Interaction, file: Attachment) -> None:
+    """Fix an attached Python file by parts, and reply with the fixed file.
+
+    Parameters
+    ----------
+    interaction : Interaction
+        The interaction instance.
+    file : Attachment
+        The attached file.
+    """
+    await interaction.response.defer(thinking=True, ephemeral=True)
+    attribute("fixpy", interaction.guild_id, interaction.user.id)
+
+    if not file.filename.endswith(".py"):
+        await interaction.followup.send("**ERROR** - Please attach a .py file.", ephemeral=True)
+        return
+    try:
+        code = await read_text_attachment(file, FIXPY_MAX_FILE_BYTES)
+    except ValueError as err:
+        await interaction.followup.send(f"**ERROR** - {err}", ephemeral=True)
+        return
+    except aiohttp.ClientError:
+        logger.exception("Failed to download the attachment %s", file.filename)
+        await interaction.followup.send(
+            "**ERROR** - Failed to download the file.",
+            ephemeral=True,
+        )
+        return
+
+    module_fix = await fix_module(code, file.filename, yml.FIXPY_SYSTEM, _fix_params())
+    await interaction.followup.send(
+        _describe_module_fix(file.filename, module_fix),
+        files=_patch_files(module_fix.patch, module_fix.code, file.filename),
+        ephemeral=True,
+    )
 
 
 class CodeModal(Modal):
@@ -52,6 +188,7 @@ class CodeModal(Modal):
             The interaction object from Discord.
         """
         await interaction.response.defer(thinking=True)
+        attribute("fixpy", interaction.guild_id, interaction.user.id)
 
         try:
             code = self.code_input.value
@@ -63,25 +200,42 @@ class CodeModal(Modal):
                 )
                 return
 
-            params = ClaudeModelParams(
-                model=FIXPY_MODEL,
-                max_tokens=CLAUDE_DEFAULT_MAX_TOKENS,
-                temperature=FIXPY_TEMPERATURE,
-                top_p=FIXPY_TOP_P,
-            )
+            params = _fix_params()
 
-            message = [ChatMessage(role="user", content=code)]
+            # Code this user already had fixed, or differing from it in formatting and comments
+            precheck = await precheck_worker.check(code)
+            cache_key = (interaction.user.id, precheck.cache_key)
+            cached_fix = fix_cache.get(cache_key)
+            if cached_fix is not None:
+                await _send_fix(interaction, code, cached_fix)
+                return
 
-            response_result = await generate_anthropic_response(
-                system_prompt=FIXPY_SYSTEM,
-                prompt=message,
-                model_params=params,
-            )
+            content = code
+            if precheck.diagnostics:
+                content += (
+                    "\n\nDiagnostics reported by the Python compiler:\n"
+                    f"{format_diagnostics(precheck.diagnostics)}"
+                )
 
-            await interaction.followup.send(
-                f"{response_result.result}",
-                ephemeral=True,
+            fix = await request_fix(code, content, yml.FIXPY_SYSTEM, params, FIXPY_OUTPUT_MODE)
+            fix, errors = await validate_fix(
+                code,
+                content,
+                fix,
+                yml.FIXPY_SYSTEM,
+                params,
+                output_mode=FIXPY_OUTPUT_MODE,
             )
+            # A fix that doesn't compile is asked again on the next submission
+            if fix.status == ResponseStatus.SUCCESS and fix.response and not errors:
+                fix_cache.set(cache_key, fix)
+
+            if fix.status == ResponseStatus.MODERATION_FLAGGED:
+                await interaction.followup.send(embed=moderation_flagged_embed(), ephemeral=True)
+                return
+            await _send_fix(interaction, code, fix)
+            if errors:
+                await interaction.followup.send(_describe_compile_errors(errors), ephemeral=True)
 
         except Exception as err:
             msg = f"Error processing fixpy request: {err!s}"
@@ -97,13 +251,18 @@ class CodeModal(Modal):
 @is_not_blocked_user()  # type: ignore # noqa: F405
 async def fix_command(
     interaction: Interaction,
+    file: Attachment | None = None,
 ) -> None:
     """Detect and fix bugs in Python code.
 
+    The code is entered in a modal, or attached as a .py file.
+
     Parameters
     ----------
     interaction : Interaction
         The interaction instance.
+    file : Attachment | None
+        The Python file to fix, instead of entering the code.
     """
     try:
         user = interaction.user
@@ -116,14 +275,21 @@ async def fix_command(
             )
             return
 
+        if file is not None:
+            await _fix_attachment(interaction, file)
+            return
+
         # Show the modal to input code
         modal = CodeModal()
         await interaction.response.send_modal(modal)
 
     except Exception as err:
-        msg = f"Error showing fixpy modal: {err!s}"
+        msg = f"Error executing fixpy command: {err!s}"
         logger.exception(msg)
-        await interaction.response.send_message(
-            "**ERROR** - Error occurred while executing the command.",
-            ephemeral=True,
+        # The response was deferred when fixing an attached file
+        send = (
+            interaction.followup.send
+            if interaction.response.is_done()
+            else interaction.response.send_message
         )
+        await send("**ERROR** - Error occurred while executing the command.", ephemeral=True)
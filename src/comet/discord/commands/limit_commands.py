@@ -1,6 +1,8 @@
+import logging
+
 from discord import Colour, Embed, Interaction
 
-from src.comet._cli import parse_args_and_setup_logging
+from src.comet.analytics.tokens import token_accounting
 from src.comet.config.env import ADMIN_USER_IDS
 from src.comet.db.dao.access_privilege_dao import AccessPrivilegeDAO
 from src.comet.db.dao.usage_limit_dao import UsageLimitDAO
@@ -8,7 +10,7 @@ from src.comet.discord.client import BotClient
 from src.comet.utils.decorators import *
 
 client = BotClient.get_instance()
-logger = parse_args_and_setup_logging()
+logger = logging.getLogger(__name__)
 
 
 @client.tree.command(
@@ -58,6 +60,58 @@ async def limit_command(
         logger.exception("An error occurred in the limit command")
 
 
+@client.tree.command(
+    name="token_limit",
+    description="Set the daily token limit for all regular users, 0 removes it",
+)
+@is_authorized_server()  # type: ignore # noqa: F405
+@is_admin_user()  # type: ignore # noqa: F405
+async def token_limit_command(
+    interaction: Interaction,
+    tokens: int,
+) -> None:
+    """Set the default daily token limit for all regular users.
+
+    The token limit applies on top of the usage limit, a user who
+    reaches either can't call the commands until the next day.
+
+    Parameters
+    ----------
+    interaction : Interaction
+        The interaction object from the command.
+    tokens : int
+        The maximum number of tokens allowed per day, 0 to remove the limit.
+    """
+    try:
+        if tokens < 0:
+            await interaction.response.send_message(
+                "**ERROR** - Please specify a positive integer for the limit.",
+                ephemeral=True,
+            )
+            return
+
+        dao = UsageLimitDAO()
+        await dao.set_default_daily_token_limit(tokens or None)
+
+        await interaction.response.send_message(
+            f"Set the daily token limit to {tokens:,}/day"
+            if tokens
+            else "Removed the daily token limit",
+            ephemeral=True,
+        )
+        logger.info(
+            "%s set default daily token limit to %d",
+            interaction.user,
+            tokens,
+        )
+    except Exception:
+        await interaction.response.send_message(
+            "**ERROR** - An error occurred while setting the token limit.",
+            ephemeral=True,
+        )
+        logger.exception("An error occurred in the token_limit command")
+
+
 @client.tree.command(
     name="ck_limit",
     description="Check the user's current usage and limit",
@@ -76,18 +130,13 @@ async def check_limit_command(
     """
     try:
         user = interaction.user
-        dao = UsageLimitDAO()
         access_dao = AccessPrivilegeDAO()
 
         # Check if the user is an admin or an advanced user
         is_admin = user.id in ADMIN_USER_IDS
-        advanced_user_ids = await access_dao.fetch_user_ids_by_access_privilege(
-            access_privilege="advanced",
-        )
-        is_advanced = user.id in advanced_user_ids
+        is_advanced = await access_dao.has_access_privilege(user.id, access_privilege="advanced")
 
-        user_limit = await dao.get_user_daily_limit(user.id)
-        current_usage = await dao.get_user_daily_usage(user.id)
+        quota = await token_accounting.get_user_daily_quota(user.id)
 
         # ------ Define discord embed style ------
         embed = Embed(
@@ -97,15 +146,18 @@ async def check_limit_command(
 
         # Regular users have a usage limit, while advanced users and admins have unlimited usage
         if is_admin or is_advanced:
-            embed.add_field(name="Usage", value=f"{current_usage} / ∞", inline=True)
+            embed.add_field(name="Usage", value=f"{quota.usage} / ∞", inline=True)
             embed.add_field(name="Remaining", value="∞", inline=True)
+            embed.add_field(name="Tokens", value=f"{quota.tokens:,} / ∞", inline=False)
         else:
-            embed.add_field(name="Usage", value=f"{current_usage} / {user_limit}", inline=True)
+            embed.add_field(name="Usage", value=f"{quota.usage} / {quota.limit}", inline=True)
             embed.add_field(
                 name="Remaining",
-                value=max(0, user_limit - current_usage),
+                value=max(0, quota.limit - quota.usage),
                 inline=True,
             )
+            token_limit = "∞" if quota.token_limit is None else f"{quota.token_limit:,}"
+            embed.add_field(name="Tokens", value=f"{quota.tokens:,} / {token_limit}", inline=False)
 
         embed.add_field(name="Note", value="Usage is reset at 00:00 every day", inline=False)
         # ----------------------------------------
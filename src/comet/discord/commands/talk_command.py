@@ -1,30 +1,34 @@
+import logging
 from typing import Literal
 
 from discord import Embed, HTTPException, Interaction, app_commands
 
-from src.comet._cli import parse_args_and_setup_logging
 from src.comet.adapters.chat import ChatMessage
 from src.comet.adapters.response import send_response_result
 from src.comet.ai.models.claude_model import ClaudeModelParams
 from src.comet.ai.models.storage import ModelParamsStore
 from src.comet.ai.services.completion import generate_anthropic_response
+from src.comet.ai.services.moderation import moderate_generation
+from src.comet.analytics.scope import attribute
+from src.comet.config import yml
 from src.comet.config.env import (
     TALK_MAX_TOKENS,
     TALK_MODEL,
     TALK_TEMPERATURE,
     TALK_TOP_P,
 )
-from src.comet.config.yml import TALK_SYSTEM
 from src.comet.db.dao.usage_limit_dao import UsageLimitDAO
 from src.comet.discord.client import BotClient
 from src.comet.utils.decorators import *
+from src.comet.utils.stats import CacheInfo, RuntimeStats
 
 client = BotClient.get_instance()
-logger = parse_args_and_setup_logging()
+logger = logging.getLogger(__name__)
 model_params = ModelParamsStore()
 
 TALK_THREAD_PREFIX: Literal[">>>"] = ">>>"
 system_prompt_dict: dict[int, str] = {}
+RuntimeStats().register_cache("system_prompts", lambda: CacheInfo(size=len(system_prompt_dict)))
 
 
 @client.tree.command(name="talk", description="Create a thread and start a conversation.")
@@ -61,6 +65,7 @@ async def talk_command(
     try:
         user = interaction.user
         logger.info("User ( %s ) is executing the talk command.", user)
+        attribute("talk", interaction.guild_id, user.id)
 
         await interaction.response.defer()
 
@@ -82,7 +87,7 @@ async def talk_command(
             auto_archive_duration=60,
             slowmode_delay=1,
         )
-        system_prompt_dict[thread.id] = TALK_SYSTEM
+        system_prompt_dict[thread.id] = yml.TALK_SYSTEM
         model_params.set_model_params(
             thread.id,
             ClaudeModelParams(
@@ -95,10 +100,14 @@ async def talk_command(
 
         async with thread.typing():
             messages = [ChatMessage(role=user.name, content=prompt)]
-            response = await generate_anthropic_response(
-                system_prompt=TALK_SYSTEM,
-                prompt=messages,
-                model_params=model_params.get_model_params(thread.id),
+            response = await moderate_generation(
+                generate_anthropic_response(
+                    system_prompt=yml.TALK_SYSTEM,
+                    prompt=messages,
+                    # mypy(arg-type): the parameters were stored for this thread just above
+                    model_params=model_params.get_model_params(thread.id),  # type: ignore
+                ),
+                prompt,
             )
 
         # Increment the usage count for the user
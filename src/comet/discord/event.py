@@ -1,21 +1,28 @@
+import logging
+
 from discord import Colour, Embed, Interaction, Thread, app_commands
 from discord import Message as DiscordMessage
 
-from src.comet._cli import parse_args_and_setup_logging
 from src.comet.adapters.chat import ChatMessage
 from src.comet.adapters.response import send_response_result
 from src.comet.ai.models.storage import ModelParamsStore
 from src.comet.ai.services.completion import generate_anthropic_response
+from src.comet.ai.services.moderation import moderate_generation
+from src.comet.analytics.scope import attribute
+from src.comet.analytics.tokens import token_accounting
 from src.comet.config.env import ADMIN_USER_IDS, CLAUDE_DEFAULT_CONTEXT_WINDOW
 from src.comet.db.dao.access_privilege_dao import AccessPrivilegeDAO
 from src.comet.db.dao.usage_limit_dao import UsageLimitDAO
 from src.comet.discord.client import BotClient
 from src.comet.discord.commands import *
+from src.comet.utils.recorder import event_recorder
+from src.comet.utils.stats import RuntimeStats
 
 access_dao = AccessPrivilegeDAO()
 client = BotClient.get_instance()
-logger = parse_args_and_setup_logging()
+logger = logging.getLogger(__name__)
 model_params = ModelParamsStore()
+runtime_stats = RuntimeStats()
 
 
 async def _check_user_daily_limit(user_id: int) -> bool:
@@ -36,20 +43,13 @@ async def _check_user_daily_limit(user_id: int) -> bool:
         return True
 
     # Advanced users bypass usage limits
-    advanced_user_ids = await access_dao.fetch_user_ids_by_access_privilege(
-        access_privilege="advanced",
-    )
-    if user_id in advanced_user_ids:
+    if await access_dao.has_access_privilege(user_id, access_privilege="advanced"):
         return True
 
     # Check usage limits for regular users
-    usage_dao = UsageLimitDAO()
-    current_usage = await usage_dao.get_user_daily_usage(user_id)
-    user_limit = await usage_dao.get_user_daily_limit(user_id)
-
-    result: bool = current_usage < user_limit
+    quota = await token_accounting.get_user_daily_quota(user_id)
 
-    return result
+    return not quota.exhausted
 
 
 async def _close_thread(thread: Thread) -> None:
@@ -63,12 +63,13 @@ async def _close_thread(thread: Thread) -> None:
 
 
 async def _get_conversation_history(thread: Thread, limit: int) -> list:
-    # Fetch conversation history from Discord thread and convert it to a list of ChatMessage
+    # Fetch conversation history from Discord thread and convert it to a list of ChatMessage,
+    # skipping the messages that can't be converted
     convo_history = [
-        await ChatMessage.from_discord_message(msg) async for msg in thread.history(limit=limit)
+        chat_msg
+        async for msg in thread.history(limit=limit)
+        if (chat_msg := ChatMessage.from_discord_message(msg)) is not None
     ]
-    # Filter out any None messages
-    convo_history = [msg for msg in convo_history if msg is not None]
     # Reverse the conversation history to have oldest messages first
     convo_history.reverse()
 
@@ -95,18 +96,29 @@ async def _handle_claude_thread(discord_msg: DiscordMessage) -> None:
         )
         return
 
+    # The replies of a conversation started by /talk
+    attribute(
+        "talk_reply",
+        discord_msg.guild.id if discord_msg.guild else None,
+        discord_msg.author.id,
+    )
     try:
         convo_history = await _get_conversation_history(thread, CLAUDE_DEFAULT_CONTEXT_WINDOW)
 
         async with thread.typing():
-            response = await generate_anthropic_response(
-                system_prompt=system_prompt_dict.get(  # type: ignore # noqa: F405
-                    thread.id,
-                ),
-                prompt=convo_history,
-                model_params=model_params.get_model_params(
-                    thread.id,
+            response = await moderate_generation(
+                generate_anthropic_response(
+                    system_prompt=system_prompt_dict.get(  # type: ignore # noqa: F405
+                        thread.id,
+                    ),
+                    prompt=convo_history,
+                    # mypy(arg-type): the parameters are stored when the thread is created
+                    model_params=model_params.get_model_params(  # type: ignore
+                        thread.id,
+                    ),
                 ),
+                # The earlier messages were moderated when they were sent
+                discord_msg.content,
             )
 
         # Increment usage count
@@ -126,11 +138,6 @@ async def _handle_claude_thread(discord_msg: DiscordMessage) -> None:
 
 
 async def _is_valid_message(discord_msg: DiscordMessage) -> bool:
-    # Get the user id that has access type "blocked"
-    blocked_user_ids = await access_dao.fetch_user_ids_by_access_privilege(
-        access_privilege="blocked",
-    )
-
     return not (
         # Ignore messages from the bot
         # Blocked user can't use the bot
@@ -139,7 +146,7 @@ async def _is_valid_message(discord_msg: DiscordMessage) -> bool:
         # Ignore threads that are archived, locked or title is not what we expected
         # Ignore threads that have too many messages
         discord_msg.author == client.user
-        or discord_msg.author.id in blocked_user_ids
+        or await access_dao.has_access_privilege(discord_msg.author.id, access_privilege="blocked")
         or not isinstance(discord_msg.channel, Thread)
         or client.user is None
         or discord_msg.channel.owner_id != client.user.id
@@ -157,6 +164,15 @@ async def on_message(user_msg: DiscordMessage) -> None:
     user_msg : DiscordMessage
         A message received from discord.
     """
+    # Direct messages are always received by shard 0
+    runtime_stats.record_shard_event(user_msg.guild.shard_id if user_msg.guild else 0)
+    if event_recorder.enabled:
+        event_recorder.record_message(
+            user_msg,
+            bot_user=client.user,
+            # mypy(name-defined): Defined in a wildcard import
+            talk_prefix=TALK_THREAD_PREFIX,  # type: ignore # noqa: F405
+        )
     try:
         if not await _is_valid_message(user_msg):
             return
@@ -176,6 +192,73 @@ async def on_message(user_msg: DiscordMessage) -> None:
         )
 
 
+@client.event
+async def on_interaction(interaction: Interaction) -> None:
+    """Event handler for Discord interaction events.
+
+    The interaction itself is handled by the command tree, this handler
+    only counts it for the per-shard event rate and records it when event
+    recording is enabled.
+
+    Parameters
+    ----------
+    interaction : Interaction
+        An interaction received from discord.
+    """
+    runtime_stats.record_shard_event(interaction.guild.shard_id if interaction.guild else 0)
+    if event_recorder.enabled:
+        event_recorder.record_interaction(interaction)
+
+
+async def _record_thread(kind: str, thread: Thread) -> None:
+    if event_recorder.enabled:
+        event_recorder.record_thread(
+            kind,
+            thread,
+            bot_user=client.user,
+            # mypy(name-defined): Defined in a wildcard import
+            talk_prefix=TALK_THREAD_PREFIX,  # type: ignore # noqa: F405
+        )
+
+
+@client.event
+async def on_thread_create(thread: Thread) -> None:
+    """Event handler for thread creation, only used by event recording.
+
+    Parameters
+    ----------
+    thread : Thread
+        The created thread.
+    """
+    await _record_thread("thread_create", thread)
+
+
+@client.event
+async def on_thread_update(_before: Thread, after: Thread) -> None:
+    """Event handler for thread updates, e.g. archiving, only used by event recording.
+
+    Parameters
+    ----------
+    _before : Thread
+        The thread before the update.
+    after : Thread
+        The thread after the update.
+    """
+    await _record_thread("thread_update", after)
+
+
+@client.event
+async def on_thread_delete(thread: Thread) -> None:
+    """Event handler for thread deletion, only used by event recording.
+
+    Parameters
+    ----------
+    thread : Thread
+        The deleted thread.
+    """
+    await _record_thread("thread_delete", thread)
+
+
 @client.tree.error
 async def on_app_command_error(
     interaction: Interaction,
@@ -195,3 +278,12 @@ async def on_app_command_error(
             "**CheckFailure** - You do not have permission to use this command.",
             ephemeral=True,
         )
+        return
+
+    logger.error("Error executing the command", exc_info=error)
+    send = (
+        interaction.followup.send
+        if interaction.response.is_done()
+        else interaction.response.send_message
+    )
+    await send("**ERROR** - Error occurred while executing the command.", ephemeral=True)
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import ast
+import copy
+import re
+from typing import NamedTuple
+
+# The first fenced code block of a response, with its language if any
+_CODE_BLOCK = re.compile(
+    r"```[ \t]*(?:python3?|py)?[ \t]*\n(.*?)^[ \t]*```",
+    re.DOTALL | re.MULTILINE,
+)
+_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+_FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+class Chunk(NamedTuple):
+    """A part of a module, fixed on its own.
+
+    Attributes
+    ----------
+    start_line : int
+        The line number of the first line of the part in the module, from 1.
+    code : str
+        The lines of the part.
+    """
+
+    start_line: int
+    code: str
+
+    @property
+    def end_line(self) -> int:
+        """The line number of the line after the part."""
+        return self.start_line + self.code.count("\n")
+
+
+class Declaration(NamedTuple):
+    """A top-level import or definition of a module, without its body.
+
+    Attributes
+    ----------
+    line : int
+        The line number of the declaration in the module, from 1.
+    stub : str
+        The import, or the signature of the definition with `...` as body.
+    """
+
+    line: int
+    stub: str
+
+
+def _segment_starts(tree: ast.Module) -> list[int]:
+    """Return the first line of each top-level definition, and of the statements between them.
+
+    A definition starts at its first decorator, and the comments above it
+    are part of it.
+    """
+    starts = [1]
+    previous_was_definition = False
+    for node in tree.body:
+        is_definition = isinstance(node, _DEFINITIONS)
+        if is_definition or previous_was_definition:
+            first = min([node.lineno, *(d.lineno for d in getattr(node, "decorator_list", []))])
+            starts.append(first)
+        previous_was_definition = is_definition
+    return starts
+
+
+def _move_comments_down(lines: list[str], starts: list[int]) -> list[int]:
+    # The comments and blank lines above a definition go with it
+    moved = []
+    for start in starts:
+        line = start
+        while line > 1 and (
+            not lines[line - 2].strip() or lines[line - 2].lstrip().startswith("#")
+        ):
+            line -= 1
+        while line < start and not lines[line - 1].strip():
+            line += 1
+        moved.append(line)
+    return moved
+
+
+def split_module(code: str, max_chars: int) -> list[Chunk]:
+    """Split a module at its top-level functions and classes, into parts of about `max_chars`.
+
+    Consecutive definitions and statements are packed into a part while
+    it stays within `max_chars`. A definition longer than that is a part
+    of its own. The parts joined back together are the module.
+
+    Parameters
+    ----------
+    code : str
+        The source of the module.
+    max_chars : int
+        The length of the parts, when the definitions allow.
+
+    Returns
+    -------
+    list[Chunk]
+        The parts, in order, a single one if the module can't be parsed.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return [Chunk(start_line=1, code=code)]
+
+    lines = code.splitlines(keepends=True)
+    starts = sorted(set(_move_comments_down(lines, _segment_starts(tree))) | {1})
+    segments = [
+        Chunk(start_line=start, code="".join(lines[start - 1 : end - 1]))
+        for start, end in zip(starts, [*starts[1:], len(lines) + 1], strict=True)
+    ]
+
+    chunks: list[Chunk] = []
+    for segment in segments:
+        if chunks and len(chunks[-1].code) + len(segment.code) <= max_chars:
+            chunks[-1] = chunks[-1]._replace(code=chunks[-1].code + segment.code)
+        else:
+            chunks.append(segment)
+    return [chunk for chunk in chunks if chunk.code.strip()] or [Chunk(start_line=1, code=code)]
+
+
+def _stub(node: ast.stmt) -> ast.stmt | None:
+    """Return an import as it is, and a definition or an assignment without its body."""
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return node
+    if isinstance(node, _DEFINITIONS):
+        stub = copy.copy(node)
+        stub.decorator_list = []
+        # A class keeps the signatures of its methods
+        methods = (
+            [_stub(child) for child in node.body if isinstance(child, _FUNCTIONS)]
+            if isinstance(node, ast.ClassDef)
+            else []
+        )
+        stub.body = [method for method in methods if method is not None] or [
+            ast.Expr(ast.Constant(...)),
+        ]
+        return stub
+    if isinstance(node, ast.Assign):
+        return ast.Assign(targets=node.targets, value=ast.Constant(...), lineno=node.lineno)
+    if isinstance(node, ast.AnnAssign):
+        return ast.AnnAssign(target=node.target, annotation=node.annotation, simple=node.simple)
+    return None
+
+
+def outline_module(code: str) -> list[Declaration]:
+    """Return the top-level imports, definitions and assignments of a module, without bodies.
+
+    Parameters
+    ----------
+    code : str
+        The source of the module.
+
+    Returns
+    -------
+    list[Declaration]
+        The declarations, in order, none if the module can't be parsed.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return []
+    return [
+        Declaration(line=node.lineno, stub=ast.unparse(stub))
+        for node in tree.body
+        if (stub := _stub(node)) is not None
+    ]
+
+
+def extract_code(response: str) -> str:
+    """Return the code of a response, from its first code block if it has any.
+
+    Parameters
+    ----------
+    response : str
+        The response of the model.
+
+    Returns
+    -------
+    str
+        The code.
+    """
+    match = _CODE_BLOCK.search(response)
+    return match.group(1) if match else response
+
+
+def _blank_lines(lines: list[str]) -> int:
+    count = 0
+    while count < len(lines) and not lines[count].strip():
+        count += 1
+    return count
+
+
+def stitch(chunks: list[Chunk], fixed: list[str | None]) -> str:
+    """Join the fixed parts of a module, with the blank lines between parts of the module.
+
+    A part that wasn't fixed, or is unchanged, is kept as it was, so that
+    the patch of the module has no hunks that only change blank lines.
+
+    Parameters
+    ----------
+    chunks : list[Chunk]
+        The parts of the module, see `split_module()`.
+    fixed : list[str | None]
+        The code of each fixed part, None for a part that couldn't be fixed.
+
+    Returns
+    -------
+    str
+        The module.
+    """
+    parts = []
+    for chunk, code in zip(chunks, fixed, strict=True):
+        if code is None or code.strip() == chunk.code.strip():
+            parts.append(chunk.code)
+            continue
+        original = chunk.code.splitlines(keepends=True)
+        leading = _blank_lines(original)
+        trailing = _blank_lines(original[::-1]) if leading < len(original) else 0
+        lines = code.splitlines(keepends=True)
+        body = lines[_blank_lines(lines) : len(lines) - _blank_lines(lines[::-1])]
+        if body and not body[-1].endswith("\n") and chunk.code.endswith("\n"):
+            body[-1] += "\n"
+        parts.append(
+            "".join(original[:leading] + body + original[len(original) - trailing :]),
+        )
+    return "".join(parts)
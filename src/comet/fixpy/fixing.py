@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, NamedTuple
+
+from src.comet.adapters.chat import ChatMessage
+from src.comet.adapters.response import ResponseStatus
+from src.comet.ai.services.completion import generate_anthropic_response
+from src.comet.ai.services.moderation import moderate_generation
+from src.comet.config.env import FIXPY_VALIDATION
+from src.comet.fixpy.chunking import extract_code
+from src.comet.fixpy.patching import apply_unified_diff
+from src.comet.fixpy.precheck import format_diagnostics, precheck_worker
+
+if TYPE_CHECKING:
+    from src.comet.adapters.response import ResponseResult
+    from src.comet.ai.models.claude_model import ClaudeModelParams
+    from src.comet.fixpy.precheck import Diagnostic
+
+logger = logging.getLogger(__name__)
+
+# What the model is asked to reply with, by output mode
+_REPLY_FORMATS: dict[str, str] = {
+    "diff": (
+        "Reply with only a unified diff of the code above fixing it, with 3 lines of context, "
+        "in a single ```diff code block."
+    ),
+    "full": "Reply with the complete fixed code in a single ```python code block.",
+}
+
+
+class Fix(NamedTuple):
+    """The fix of some code.
+
+    Attributes
+    ----------
+    status : ResponseStatus
+        The status of the last generation.
+    response : str | None
+        The reply of the model, a diff or the fixed code.
+    code : str | None
+        The fixed code, None if the generation failed.
+    patched : bool
+        Whether the fixed code is the code patched with the diff of the reply.
+    """
+
+    status: ResponseStatus
+    response: str | None
+    code: str | None
+    patched: bool = False
+
+
+async def _generate(
+    content: str,
+    code: str,
+    system_prompt: str,
+    params: ClaudeModelParams,
+) -> ResponseResult:
+    return await moderate_generation(
+        generate_anthropic_response(
+            system_prompt=system_prompt,
+            prompt=[ChatMessage(role="user", content=content)],
+            model_params=params,
+        ),
+        code,
+    )
+
+
+async def request_fix(
+    code: str,
+    content: str,
+    system_prompt: str,
+    params: ClaudeModelParams,
+    output_mode: str,
+) -> Fix:
+    """Ask the model to fix code, as a diff or as the complete code.
+
+    In the "diff" output mode, the output tokens are about the size of the
+    fix rather than of the code. A diff that doesn't apply to the code is
+    asked again as the complete code.
+
+    Parameters
+    ----------
+    code : str
+        The code to fix.
+    content : str
+        The prompt, the code followed by any diagnostics and notes.
+    system_prompt : str
+        The system prompt.
+    params : ClaudeModelParams
+        The parameters of the model.
+    output_mode : str
+        "diff" or "full".
+
+    Returns
+    -------
+    Fix
+        The fix, or the status of the failed generation.
+    """
+    if output_mode == "diff":
+        result = await _generate(
+            f"{content}\n\n{_REPLY_FORMATS['diff']}",
+            code,
+            system_prompt,
+            params,
+        )
+        if result.status != ResponseStatus.SUCCESS or not result.result:
+            return Fix(status=result.status, response=result.result, code=None)
+        try:
+            patched = apply_unified_diff(code, result.result)
+        except ValueError as err:
+            logger.info("The diff of the fix doesn't apply, asking for the full code: %s", err)
+        else:
+            return Fix(status=result.status, response=result.result, code=patched, patched=True)
+
+    result = await _generate(f"{content}\n\n{_REPLY_FORMATS['full']}", code, system_prompt, params)
+    if result.status != ResponseStatus.SUCCESS or not result.result:
+        return Fix(status=result.status, response=result.result, code=None)
+    return Fix(status=result.status, response=result.result, code=extract_code(result.result))
+
+
+async def _compile_errors(code: str) -> tuple[Diagnostic, ...]:
+    precheck = await precheck_worker.check(code)
+    return tuple(d for d in precheck.diagnostics if d.severity == "error")
+
+
+async def validate_fix(  # noqa: PLR0913
+    code: str,
+    content: str,
+    fix: Fix,
+    system_prompt: str,
+    params: ClaudeModelParams,
+    *,
+    output_mode: str,
+) -> tuple[Fix, tuple[Diagnostic, ...]]:
+    """Compile a fix if `FIXPY_VALIDATION` is set, and ask once more if it fails.
+
+    The fix is compiled in the precheck worker, see `PrecheckWorker`. The
+    second fix is asked with the first one and its errors, and is returned
+    whether it compiles or not.
+
+    Parameters
+    ----------
+    code : str
+        The code to fix.
+    content : str
+        The prompt of the fix, see `request_fix()`.
+    fix : Fix
+        The fix, with its code.
+    system_prompt : str
+        The system prompt.
+    params : ClaudeModelParams
+        The parameters of the model.
+    output_mode : str
+        The output mode of the second fix, "diff" or "full".
+
+    Returns
+    -------
+    tuple[Fix, tuple[Diagnostic, ...]]
+        The last fix, and the errors of the compiler on its code, none if it
+        compiles or validation is off.
+    """
+    if FIXPY_VALIDATION == "off" or fix.code is None:
+        return fix, ()
+    errors = await _compile_errors(fix.code)
+    if not errors:
+        return fix, ()
+
+    logger.info("The fix doesn't compile, asking once more")
+    retry = await request_fix(
+        code,
+        (
+            f"{content}\n\nYour previous fix:\n\n{fix.response}\n\n"
+            f"doesn't compile:\n{format_diagnostics(errors)}"
+        ),
+        system_prompt,
+        params,
+        output_mode,
+    )
+    if retry.code is None:
+        return fix, errors
+    return retry, await _compile_errors(retry.code)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, NamedTuple
+
+from src.comet.adapters.response import ResponseStatus
+from src.comet.config.env import (
+    FIXPY_CHUNK_CHARS,
+    FIXPY_MAX_PARALLEL_CHUNKS,
+    FIXPY_OUTPUT_MODE,
+)
+from src.comet.fixpy.chunking import outline_module, split_module, stitch
+from src.comet.fixpy.fixing import request_fix, validate_fix
+from src.comet.fixpy.patching import make_patch
+from src.comet.fixpy.precheck import Diagnostic, format_diagnostics, precheck_worker
+
+if TYPE_CHECKING:
+    from src.comet.ai.models.claude_model import ClaudeModelParams
+    from src.comet.fixpy.chunking import Chunk, Declaration
+
+logger = logging.getLogger(__name__)
+
+
+class ModuleFix(NamedTuple):
+    """The fix of a module, fixed by parts.
+
+    Attributes
+    ----------
+    code : str
+        The fixed module, with the parts that couldn't be fixed unchanged.
+    patch : str
+        The unified diff of the fixed module.
+    parts : int
+        The number of parts the module was split into.
+    unfixed_parts : tuple[int, ...]
+        The numbers of the parts that couldn't be fixed, from 1.
+    flagged : bool
+        Whether moderation flagged any part, or its fix.
+    diagnostics : tuple[Diagnostic, ...]
+        The errors and warnings of the compiler on the fixed module.
+    """
+
+    code: str
+    patch: str
+    parts: int
+    unfixed_parts: tuple[int, ...]
+    flagged: bool
+    diagnostics: tuple[Diagnostic, ...]
+
+
+def _chunk_diagnostics(
+    chunk: Chunk,
+    diagnostics: tuple[Diagnostic, ...],
+) -> tuple[Diagnostic, ...]:
+    """Return the diagnostics of the lines of a part, numbered from the start of the part."""
+    return tuple(
+        diagnostic._replace(line=diagnostic.line - chunk.start_line + 1)
+        for diagnostic in diagnostics
+        if diagnostic.line is not None and chunk.start_line <= diagnostic.line < chunk.end_line
+    )
+
+
+def _chunk_prompt(
+    chunk: Chunk,
+    number: int,
+    total: int,
+    diagnostics: tuple[Diagnostic, ...],
+    declarations: list[Declaration],
+) -> str:
+    content = chunk.code
+    if diagnostics:
+        content += (
+            f"\n\nDiagnostics reported by the Python compiler:\n{format_diagnostics(diagnostics)}"
+        )
+    if total == 1:
+        return content
+
+    header = (
+        f"This is part {number} of {total} of a module, split at its top-level functions "
+        "and classes. The other parts are fixed separately."
+    )
+    # The names of the other parts, so that they aren't imported or defined again
+    outline = "\n".join(
+        declaration.stub
+        for declaration in declarations
+        if not chunk.start_line <= declaration.line < chunk.end_line
+    )
+    if outline:
+        header += (
+            " They declare the following, shown without bodies for reference only. "
+            "Don't add these imports or definitions to this part, and don't fix them:"
+            f"\n\n```python\n{outline}\n```"
+        )
+    return f"{header}\n\nThe part to fix:\n\n{content}"
+
+
+async def fix_module(
+    code: str,
+    filename: str,
+    system_prompt: str,
+    params: ClaudeModelParams,
+) -> ModuleFix:
+    """Fix a module by parts, split at its top-level functions and classes.
+
+    The parts are fixed concurrently, at most `FIXPY_MAX_PARALLEL_CHUNKS`
+    at a time, so that a large module takes about as long as its largest
+    part. Each part is sent with the imports and signatures of the others,
+    see `outline_module()`, fixed in the `FIXPY_OUTPUT_MODE` output mode,
+    and compiled on its own if `FIXPY_VALIDATION` is set, with one more fix
+    if it doesn't compile. The fixed parts are joined and compiled again.
+
+    Parameters
+    ----------
+    code : str
+        The source of the module.
+    filename : str
+        The name of the module's file, for the patch.
+    system_prompt : str
+        The system prompt of the fixes.
+    params : ClaudeModelParams
+        The parameters of the model.
+
+    Returns
+    -------
+    ModuleFix
+        The fixed module, and how the fix went.
+    """
+    chunks = split_module(code, FIXPY_CHUNK_CHARS)
+    declarations = outline_module(code)
+    precheck = await precheck_worker.check(code)
+    semaphore = asyncio.Semaphore(FIXPY_MAX_PARALLEL_CHUNKS)
+
+    async def fix_chunk(number: int, chunk: Chunk) -> tuple[str | None, bool]:
+        prompt = _chunk_prompt(
+            chunk,
+            number,
+            len(chunks),
+            _chunk_diagnostics(chunk, precheck.diagnostics),
+            declarations,
+        )
+        async with semaphore:
+            fix = await request_fix(chunk.code, prompt, system_prompt, params, FIXPY_OUTPUT_MODE)
+            fix, _ = await validate_fix(
+                chunk.code,
+                prompt,
+                fix,
+                system_prompt,
+                params,
+                output_mode=FIXPY_OUTPUT_MODE,
+            )
+        if fix.code is None:
+            logger.warning("Failed to fix part %d of %d: %s", number, len(chunks), fix.status)
+        return fix.code, fix.status == ResponseStatus.MODERATION_FLAGGED
+
+    results = await asyncio.gather(
+        *(fix_chunk(number, chunk) for number, chunk in enumerate(chunks, start=1)),
+    )
+
+    # A part that couldn't be fixed is kept as it was
+    fixed = stitch(chunks, [fixed_code for fixed_code, _ in results])
+    final_check = await precheck_worker.check(fixed)
+    return ModuleFix(
+        code=fixed,
+        patch=make_patch(code, fixed, filename),
+        parts=len(chunks),
+        unfixed_parts=tuple(
+            number for number, (fixed_code, _) in enumerate(results, start=1) if fixed_code is None
+        ),
+        flagged=any(flagged for _, flagged in results),
+        diagnostics=final_check.diagnostics,
+    )
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import difflib
+import re
+from typing import NamedTuple
+
+# The first diff code block of a response
+_DIFF_BLOCK = re.compile(
+    r"```[ \t]*(?:diff|patch|udiff)[ \t]*\n(.*?)^[ \t]*```",
+    re.DOTALL | re.MULTILINE,
+)
+_HUNK_HEADER = re.compile(r"@@ -(\d+)(?:,(\d+))? \+\d+(?:,\d+)? @@")
+
+
+class Hunk(NamedTuple):
+    """A change of a unified diff.
+
+    Attributes
+    ----------
+    old_start : int
+        The line number of the change in the code, from 1, as stated by the diff.
+    old_count : int
+        The number of lines of the code the change replaces, as stated by the diff.
+    before : list[str]
+        The context and removed lines, as in the code.
+    after : list[str]
+        The context and added lines, replacing them.
+    """
+
+    old_start: int
+    old_count: int
+    before: list[str]
+    after: list[str]
+
+
+def _parse_hunk(header: re.Match[str], lines: list[str]) -> Hunk:
+    # Blank lines trailing a hunk are the end of the diff rather than context
+    while lines and not lines[-1]:
+        lines.pop()
+    old_count = header.group(2)
+    hunk = Hunk(
+        old_start=int(header.group(1)),
+        old_count=1 if old_count is None else int(old_count),
+        before=[],
+        after=[],
+    )
+    for line in lines:
+        tag, text = line[:1], line[1:]
+        # Models often drop the space of blank context lines
+        if tag in {" ", ""}:
+            hunk.before.append(text)
+            hunk.after.append(text)
+        elif tag == "-":
+            hunk.before.append(text)
+        elif tag == "+":
+            hunk.after.append(text)
+        elif tag != "\\":
+            msg = f"Invalid line in the diff: {line!r}"
+            raise ValueError(msg)
+    return hunk
+
+
+def parse_unified_diff(diff: str) -> list[Hunk]:
+    """Parse the hunks of a unified diff of a single file.
+
+    The line counts of the hunk headers are ignored, as models often get
+    them wrong.
+
+    Parameters
+    ----------
+    diff : str
+        The diff, with or without file headers.
+
+    Returns
+    -------
+    list[Hunk]
+        The hunks, in order.
+
+    Raises
+    ------
+    ValueError
+        If a line of a hunk isn't a context, removed or added line.
+    """
+    hunks: list[Hunk] = []
+    header: re.Match[str] | None = None
+    lines: list[str] = []
+    for line in diff.splitlines():
+        next_header = _HUNK_HEADER.match(line)
+        if next_header is None and (header is None or line.startswith(("--- ", "+++ "))):
+            # File headers, or text before the first hunk
+            continue
+        if next_header is None:
+            lines.append(line)
+            continue
+        if header is not None:
+            hunks.append(_parse_hunk(header, lines))
+        header, lines = next_header, []
+    if header is not None:
+        hunks.append(_parse_hunk(header, lines))
+    return hunks
+
+
+def _find(lines: list[str], before: list[str], expected: int, low: int) -> int | None:
+    """Find the lines of a hunk in the code, from `low`, nearest to where the diff states."""
+    stop = len(lines) - len(before) + 1
+    for normalize in (str, str.rstrip):
+        wanted = [normalize(line) for line in before]
+        # The lines starting like the hunk, nearest first
+        candidates = sorted(
+            (i for i in range(low, stop) if normalize(lines[i]) == wanted[0]),
+            key=lambda i: abs(i - expected),
+        )
+        for start in candidates:
+            if [normalize(line) for line in lines[start : start + len(wanted)]] == wanted:
+                return start
+    return None
+
+
+def apply_unified_diff(code: str, response: str) -> str:
+    """Apply the unified diff of a response to the code.
+
+    Each hunk is applied where its lines are in the code, nearest to the
+    line stated by the diff, ignoring trailing whitespace if it doesn't
+    match otherwise. Hunks must be in order and must not overlap.
+
+    Parameters
+    ----------
+    code : str
+        The code the diff was made against.
+    response : str
+        The response of the model, with the diff in its first diff code
+        block, or the diff itself.
+
+    Returns
+    -------
+    str
+        The patched code.
+
+    Raises
+    ------
+    ValueError
+        If the response has no diff, or a hunk doesn't match the code.
+    """
+    match = _DIFF_BLOCK.search(response)
+    hunks = parse_unified_diff(match.group(1) if match else response)
+    if not hunks:
+        msg = "The response has no diff."
+        raise ValueError(msg)
+
+    lines = code.splitlines()
+    patched: list[str] = []
+    position = 0
+    for hunk in hunks:
+        if hunk.before:
+            start = _find(lines, hunk.before, hunk.old_start - 1, position)
+        elif position <= hunk.old_start <= len(lines) and hunk.old_count == 0:
+            # A hunk without context inserts after the stated line
+            start = hunk.old_start
+        else:
+            start = None
+        if start is None:
+            msg = f"The hunk at line {hunk.old_start} doesn't match the code."
+            raise ValueError(msg)
+        patched.extend(lines[position:start])
+        patched.extend(hunk.after)
+        position = start + len(hunk.before)
+    patched.extend(lines[position:])
+    return "\n".join(patched) + ("\n" if code.endswith("\n") or not code else "")
+
+
+def make_patch(original: str, fixed: str, filename: str) -> str:
+    """Make the unified diff of a fix, to deliver with the fixed code.
+
+    Parameters
+    ----------
+    original : str
+        The submitted code.
+    fixed : str
+        The fixed code.
+    filename : str
+        The name of the file in the headers of the diff.
+
+    Returns
+    -------
+    str
+        The diff, empty if the code is unchanged.
+    """
+    diff = difflib.unified_diff(
+        original.splitlines(),
+        fixed.splitlines(),
+        f"a/{filename}",
+        f"b/{filename}",
+        lineterm="",
+    )
+    return "".join(f"{line}\n" for line in diff)
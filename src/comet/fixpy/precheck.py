@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import ast
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import tokenize
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# The file name of the code in the diagnostics
+_FILENAME = "<fixpy>"
+# The worker answers in milliseconds, a slower answer is a stuck worker
+_TIMEOUT_SECONDS = 10.0
+# Tokens that don't change what the code does
+_IGNORED_TOKENS = frozenset({tokenize.COMMENT, tokenize.NL, tokenize.ENCODING})
+
+
+class Diagnostic(NamedTuple):
+    """An error or a warning reported by the compiler.
+
+    Attributes
+    ----------
+    severity : str
+        "error" or "warning".
+    line : int | None
+        The line number, from 1.
+    column : int | None
+        The column number, from 1.
+    message : str
+        The message, prefixed by the name of the exception or warning.
+    """
+
+    severity: str
+    line: int | None
+    column: int | None
+    message: str
+
+
+class Precheck(NamedTuple):
+    """The result of compiling the submitted code.
+
+    Attributes
+    ----------
+    cache_key : str
+        A hash of the code, the same for code that differs only in its
+        formatting and comments.
+    diagnostics : tuple[Diagnostic, ...]
+        The errors and warnings reported by the compiler.
+    """
+
+    cache_key: str
+    diagnostics: tuple[Diagnostic, ...]
+
+
+def _hash(kind: str, normalized: str) -> str:
+    return f"{kind}:{hashlib.sha256(normalized.encode()).hexdigest()}"
+
+
+def _token_key(code: str) -> str:
+    """Hash the tokens of code that can't be parsed, without comments and indentation widths."""
+    parts: list[str] = []
+    end_line = 0
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            end_line = token.end[0]
+            if token.type in {tokenize.INDENT, tokenize.DEDENT}:
+                parts.append(tokenize.tok_name[token.type])
+            elif token.type not in _IGNORED_TOKENS:
+                parts.append(token.string)
+    except (tokenize.TokenError, SyntaxError):
+        # The rest of the code, from the line the tokenizer stopped at, by words
+        parts.extend(" ".join(code.splitlines()[end_line:]).split())
+    return _hash("tokens", "\0".join(parts))
+
+
+def _from_syntax_error(err: SyntaxError) -> Diagnostic:
+    message = f"{err.__class__.__name__}: {err.msg}"
+    if err.text and err.text.strip():
+        message += f" in `{err.text.strip()}`"
+    return Diagnostic("error", err.lineno, err.offset, message)
+
+
+def check_code(code: str) -> Precheck:
+    """Compile code, and collect the diagnostics and the cache key.
+
+    The cache key is a hash of the AST, without line numbers, or of the
+    tokens when the code can't be parsed.
+
+    Parameters
+    ----------
+    code : str
+        The submitted code.
+
+    Returns
+    -------
+    Precheck
+        The cache key and the diagnostics.
+    """
+    diagnostics: list[Diagnostic] = []
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        try:
+            tree = ast.parse(code, filename=_FILENAME)
+        except SyntaxError as err:
+            diagnostics.append(_from_syntax_error(err))
+            cache_key = _token_key(code)
+        except (RecursionError, MemoryError, ValueError) as err:
+            diagnostics.append(Diagnostic("error", None, None, f"{err.__class__.__name__}: {err}"))
+            cache_key = _token_key(code)
+        else:
+            cache_key = _hash("ast", ast.dump(tree))
+            # The compiler reports what the parser accepts, e.g. 'return' outside a function
+            try:
+                compile(tree, _FILENAME, "exec", dont_inherit=True)
+            except SyntaxError as err:
+                diagnostics.append(_from_syntax_error(err))
+            except (RecursionError, MemoryError) as err:
+                diagnostics.append(
+                    Diagnostic("error", None, None, f"{err.__class__.__name__}: {err}"),
+                )
+    for warning in caught:
+        if issubclass(warning.category, (SyntaxWarning, DeprecationWarning)):
+            message = f"{warning.category.__name__}: {warning.message}"
+            diagnostics.append(Diagnostic("warning", warning.lineno, None, message))
+    return Precheck(cache_key=cache_key, diagnostics=tuple(diagnostics))
+
+
+def format_diagnostics(diagnostics: tuple[Diagnostic, ...]) -> str:
+    """Describe the diagnostics for the prompt, one per line.
+
+    Parameters
+    ----------
+    diagnostics : tuple[Diagnostic, ...]
+        The diagnostics of the code.
+
+    Returns
+    -------
+    str
+        The diagnostics, e.g. "- error at line 3, column 9: SyntaxError: ...".
+    """
+    lines = []
+    for diagnostic in diagnostics:
+        location = ""
+        if diagnostic.line is not None:
+            location = f" at line {diagnostic.line}"
+            if diagnostic.column is not None:
+                location += f", column {diagnostic.column}"
+        lines.append(f"- {diagnostic.severity}{location}: {diagnostic.message}")
+    return "\n".join(lines)
+
+
+class PrecheckWorker:
+    """Run `check_code()` in a worker process, started on first use.
+
+    The worker is spawned rather than forked, as the bot's process has
+    threads, and is replaced if it crashes or stops answering. When it
+    fails, the code is hashed as text, without diagnostics.
+    """
+
+    def __init__(self) -> None:
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _discard_executor(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def check(self, code: str) -> Precheck:
+        """Compile code in the worker, see `check_code()`.
+
+        Parameters
+        ----------
+        code : str
+            The submitted code.
+
+        Returns
+        -------
+        Precheck
+            The cache key and the diagnostics.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self._get_executor(), check_code, code),
+                _TIMEOUT_SECONDS,
+            )
+        except (BrokenProcessPool, TimeoutError):
+            logger.exception("The precheck worker failed, restarting it")
+            self._discard_executor()
+        except Exception:
+            logger.exception("Failed to precheck the code")
+        return Precheck(cache_key=_hash("text", " ".join(code.split())), diagnostics=())
+
+    def close(self) -> None:
+        """Stop the worker, if it was started."""
+        self._discard_executor()
+
+
+precheck_worker = PrecheckWorker()
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import enum
+import logging
+import random
+import time
+from typing import TYPE_CHECKING, NamedTuple
+
+from src.comet.db.dao.scheduled_job_dao import ScheduledJobDAO
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine
+    from typing import Any
+
+    from src.comet.scheduler.triggers import Trigger
+
+logger = logging.getLogger(__name__)
+
+# The clock is checked at least this often while waiting, so that a clock jump or a
+# suspended host delays a run by this much at most
+_MAX_SLEEP_SECONDS = 60.0
+# A run of a job that skips missed runs may start this late and still count as on time
+_MISFIRE_GRACE_SECONDS = 60.0
+# Beyond this many missed runs, a job that runs all of them runs this many
+_MAX_CATCH_UP_RUNS = 100
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.UTC)
+
+
+class CatchUp(enum.Enum):
+    """What a job does about the runs missed while the bot was stopped or busy.
+
+    Attributes
+    ----------
+    SKIP
+        Only the runs that are on time run, the missed ones are dropped.
+    ONCE
+        The missed runs are coalesced into a single run. A job that has
+        never run, runs at once.
+    ALL
+        Every missed run is run in turn, up to 100 of them.
+    """
+
+    SKIP = "skip"
+    ONCE = "once"
+    ALL = "all"
+
+
+class JobStats(NamedTuple):
+    """Snapshot of the runs of a job since the bot started.
+
+    Attributes
+    ----------
+    runs : int
+        The number of completed runs.
+    failures : int
+        The number of runs that raised an exception.
+    skipped : int
+        The number of runs dropped, missed or because too many were running.
+    running : int
+        The number of runs in progress.
+    last_duration_ms : float | None
+        The duration of the last completed run in milliseconds.
+    max_duration_ms : float | None
+        The duration of the longest run in milliseconds.
+    mean_duration_ms : float | None
+        The mean duration of the runs in milliseconds.
+    next_run_at : datetime.datetime | None
+        The time of the next run, None if the job isn't scheduled.
+    """
+
+    runs: int
+    failures: int
+    skipped: int
+    running: int
+    last_duration_ms: float | None
+    max_duration_ms: float | None
+    mean_duration_ms: float | None
+    next_run_at: datetime.datetime | None
+
+
+class Job:
+    """A coroutine function run by the scheduler, with its options and statistics.
+
+    Parameters
+    ----------
+    name : str
+        A unique name, under which the last run is persisted.
+    func : Callable[[], Coroutine[Any, Any, object]]
+        The coroutine function to run.
+    trigger : Trigger
+        When the job runs.
+    catch_up : CatchUp
+        What to do about missed runs.
+    jitter : float
+        The maximum random delay in seconds added to each run, so that
+        jobs scheduled at the same time don't run at once.
+    max_concurrency : int
+        The maximum number of runs in progress, further runs are skipped.
+    persist : bool
+        Whether the last run is persisted, which `catch_up` needs across
+        restarts.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        name: str,
+        func: Callable[[], Coroutine[Any, Any, object]],
+        trigger: Trigger,
+        *,
+        catch_up: CatchUp,
+        jitter: float,
+        max_concurrency: int,
+        persist: bool,
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.catch_up = catch_up
+        self.jitter = jitter
+        self.max_concurrency = max_concurrency
+        self.persist = persist
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.running = 0
+        self.last_duration_ms: float | None = None
+        self.max_duration_ms: float | None = None
+        self.total_duration_ms = 0.0
+        self.next_run_at: datetime.datetime | None = None
+
+    def stats(self) -> JobStats:
+        """Return a snapshot of the runs of the job."""
+        return JobStats(
+            runs=self.runs,
+            failures=self.failures,
+            skipped=self.skipped,
+            running=self.running,
+            last_duration_ms=self.last_duration_ms,
+            max_duration_ms=self.max_duration_ms,
+            mean_duration_ms=self.total_duration_ms / self.runs if self.runs else None,
+            next_run_at=self.next_run_at,
+        )
+
+
+class JobScheduler:
+    """Run maintenance jobs on cron or interval triggers.
+
+    Each job has a task that waits for its next run, checking the clock
+    every minute at most so that clock changes don't delay it, and starts
+    each run in a task of its own. The scheduled time of the last run is
+    persisted in the `scheduled_job` table, from which the runs missed
+    while the bot was stopped are caught up according to the job's
+    `CatchUp` policy.
+    """
+
+    def __init__(self) -> None:
+        self._jobs: dict[str, Job] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._started = False
+
+    def add_job(  # noqa: PLR0913
+        self,
+        name: str,
+        func: Callable[[], Coroutine[Any, Any, object]],
+        trigger: Trigger,
+        *,
+        catch_up: CatchUp = CatchUp.ONCE,
+        jitter: float = 0.0,
+        max_concurrency: int = 1,
+        persist: bool = True,
+    ) -> None:
+        """Register a job, see `Job` for the parameters.
+
+        Raises
+        ------
+        ValueError
+            If a job with the same name is already registered.
+        RuntimeError
+            If the scheduler has already started.
+        """
+        if name in self._jobs:
+            msg = f"A job named {name!r} is already registered."
+            raise ValueError(msg)
+        if self._started:
+            msg = "Jobs must be added before the scheduler starts."
+            raise RuntimeError(msg)
+        self._jobs[name] = Job(
+            name,
+            func,
+            trigger,
+            catch_up=catch_up,
+            jitter=jitter,
+            max_concurrency=max_concurrency,
+            persist=persist,
+        )
+
+    def job_stats(self) -> dict[str, JobStats]:
+        """Return a snapshot of the runs of each job."""
+        return {name: job.stats() for name, job in self._jobs.items()}
+
+    async def start(self) -> None:
+        """Read the last runs of the jobs and start scheduling them."""
+        self._started = True
+        dao = ScheduledJobDAO()
+        for job in self._jobs.values():
+            last = await dao.get_last_scheduled_at(job.name) if job.persist else None
+            self._spawn(self._schedule(job, last), name=f"job-scheduler:{job.name}")
+        logger.info("Started the scheduler with %d jobs", len(self._jobs))
+
+    async def stop(self) -> None:
+        """Stop scheduling the jobs and cancel the runs in progress."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for job in self._jobs.values():
+            job.next_run_at = None
+
+    def _spawn(self, coro: Coroutine[Any, Any, None], name: str) -> None:
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _schedule(self, job: Job, last: datetime.datetime | None) -> None:
+        if last is None:
+            if job.catch_up != CatchUp.SKIP:
+                await self._run(job, _now())
+            last = _now()
+
+        while True:
+            job.next_run_at = job.trigger.next_run(last)
+            await self._sleep_until(job.next_run_at)
+
+            now = _now()
+            due = [job.next_run_at]
+            while (
+                len(due) <= _MAX_CATCH_UP_RUNS
+                and (next_run := job.trigger.next_run(due[-1])) <= now
+            ):
+                due.append(next_run)
+            # Past the limit, the next runs are counted from now
+            last = now if len(due) > _MAX_CATCH_UP_RUNS else due[-1]
+
+            if job.catch_up == CatchUp.ALL and len(due) > 1:
+                # In turn, so that they don't skip each other
+                logger.info("Catching up on %d runs of the job %s", len(due), job.name)
+                for scheduled_at in due[:_MAX_CATCH_UP_RUNS]:
+                    await self._run(job, scheduled_at)
+            elif job.catch_up == CatchUp.ONCE or (
+                len(due) == 1 and (now - due[0]).total_seconds() <= _MISFIRE_GRACE_SECONDS
+            ):
+                job.skipped += len(due) - 1
+                self._start_run(job, last)
+            else:
+                logger.info("Skipped %d missed runs of the job %s", len(due), job.name)
+                job.skipped += len(due)
+
+    @staticmethod
+    async def _sleep_until(when: datetime.datetime) -> None:
+        # Sleeping in slices rereads the clock, which a single sleep wouldn't
+        while (remaining := (when - _now()).total_seconds()) > 0:  # noqa: ASYNC110
+            await asyncio.sleep(min(remaining, _MAX_SLEEP_SECONDS))
+
+    def _start_run(self, job: Job, scheduled_at: datetime.datetime) -> None:
+        if job.running >= job.max_concurrency:
+            logger.warning("Skipped a run of the job %s, %d are running", job.name, job.running)
+            job.skipped += 1
+            return
+        self._spawn(self._run(job, scheduled_at), name=f"job:{job.name}")
+
+    async def _run(self, job: Job, scheduled_at: datetime.datetime) -> None:
+        job.running += 1
+        try:
+            if job.jitter > 0:
+                await asyncio.sleep(random.uniform(0, job.jitter))  # noqa: S311
+            started_at = _now()
+            started = time.perf_counter()
+            status = "success"
+            try:
+                await job.func()
+            except Exception:
+                logger.exception("The job %s failed", job.name)
+                status = "failure"
+                job.failures += 1
+            duration_ms = (time.perf_counter() - started) * 1000
+        finally:
+            job.running -= 1
+
+        job.runs += 1
+        job.last_duration_ms = duration_ms
+        job.max_duration_ms = max(job.max_duration_ms or 0.0, duration_ms)
+        job.total_duration_ms += duration_ms
+        logger.debug("The job %s ran in %.1f ms", job.name, duration_ms)
+        if job.persist:
+            try:
+                await ScheduledJobDAO().record_run(
+                    job.name,
+                    scheduled_at,
+                    started_at,
+                    status,
+                    duration_ms,
+                )
+            except Exception:
+                logger.exception("Failed to record the run of the job %s", job.name)
+
+
+job_scheduler = JobScheduler()
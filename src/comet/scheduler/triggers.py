@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import datetime
+from typing import Protocol
+
+from pytz.exceptions import AmbiguousTimeError, NonExistentTimeError
+
+from src.comet.config.timezone import TIMEZONE
+
+# Shorthands of common schedules
+_CRON_ALIASES: dict[str, str] = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+# (name, first, last) of each field of a cron expression
+_CRON_FIELDS: tuple[tuple[str, int, int], ...] = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day of month", 1, 31),
+    ("month", 1, 12),
+    ("day of week", 0, 7),
+)
+# Finding a February 29th takes a few hundred steps, an expression needing more matches no date
+_MAX_SEARCH_STEPS = 20_000
+
+
+class Trigger(Protocol):
+    """When a job runs."""
+
+    def next_run(self, after: datetime.datetime) -> datetime.datetime:
+        """Return the first time the job runs strictly after a given time.
+
+        Parameters
+        ----------
+        after : datetime.datetime
+            A timezone-aware datetime.
+
+        Returns
+        -------
+        datetime.datetime
+            A timezone-aware datetime later than `after`.
+        """
+        ...
+
+
+class IntervalTrigger:
+    """Run a job at a fixed interval from its previous run.
+
+    Parameters
+    ----------
+    seconds : float
+        The interval, which must be positive.
+
+    Raises
+    ------
+    ValueError
+        If the interval isn't positive.
+    """
+
+    def __init__(self, seconds: float) -> None:
+        if seconds <= 0:
+            msg = f"The interval must be positive, got {seconds}."
+            raise ValueError(msg)
+        self.interval = datetime.timedelta(seconds=seconds)
+
+    def __repr__(self) -> str:
+        """Return a representation of the trigger for debugging."""
+        return f"IntervalTrigger(seconds={self.interval.total_seconds()})"
+
+    def next_run(self, after: datetime.datetime) -> datetime.datetime:
+        """Return the time one interval after `after`."""
+        return after + self.interval
+
+
+class CronTrigger:
+    """Run a job at the times matching a cron expression, in the bot's timezone.
+
+    The expression has five fields, the minute, hour, day of month, month
+    and day of week (0 or 7 for Sunday), each made of comma-separated
+    values, ranges (`a-b`), `*`, and steps (`*/n` or `a-b/n`). Like cron,
+    a day matches when either of the day fields matches, if both are
+    restricted. `@hourly`, `@daily`, `@weekly` and `@monthly` are accepted
+    too.
+
+    Times are matched on the wall clock. A time repeated by a DST change
+    runs on its first occurrence only, and a time skipped by one runs an
+    hour later.
+
+    Parameters
+    ----------
+    expression : str
+        The cron expression.
+
+    Raises
+    ------
+    ValueError
+        If the expression is invalid.
+
+    Examples
+    --------
+    >>> CronTrigger("30 4 * * *")  # every day at 04:30
+    >>> CronTrigger("*/15 9-17 * * 1-5")  # every 15 minutes during office hours
+    """
+
+    def __init__(self, expression: str) -> None:
+        self.expression = expression
+        fields = _CRON_ALIASES.get(expression, expression).split()
+        if len(fields) != len(_CRON_FIELDS):
+            msg = f"A cron expression has {len(_CRON_FIELDS)} fields, got {expression!r}."
+            raise ValueError(msg)
+        minutes, hours, days, months, weekdays = (
+            _parse_cron_field(field, *spec)
+            for field, spec in zip(fields, _CRON_FIELDS, strict=True)
+        )
+        self.minutes = minutes
+        self.hours = hours
+        self.days = days
+        self.months = months
+        # Sunday is 0 or 7 in cron, and 7 in ISO weekdays
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        # Like cron, a field starting with '*' doesn't restrict the day
+        self._any_day = fields[2].startswith("*")
+        self._any_weekday = fields[4].startswith("*")
+
+    def __repr__(self) -> str:
+        """Return a representation of the trigger for debugging."""
+        return f"CronTrigger({self.expression!r})"
+
+    def _day_matches(self, date: datetime.date) -> bool:
+        day = date.day in self.days
+        weekday = date.isoweekday() % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    @staticmethod
+    def _localize(wall_time: datetime.datetime, after: datetime.datetime) -> datetime.datetime:
+        # pytz zones must localize, a replaced tzinfo would be the zone's oldest offset
+        try:
+            return TIMEZONE.localize(wall_time, is_dst=None)
+        except AmbiguousTimeError:
+            first = TIMEZONE.localize(wall_time, is_dst=True)
+            return first if first > after else TIMEZONE.localize(wall_time, is_dst=False)
+        except NonExistentTimeError:
+            return TIMEZONE.localize(wall_time, is_dst=False)
+
+    def next_run(self, after: datetime.datetime) -> datetime.datetime:
+        """Return the first matching minute after `after`.
+
+        Raises
+        ------
+        ValueError
+            If the expression matches no date, e.g. the 30th of February.
+        """
+        # The search runs on the local wall clock, without the timezone
+        local = after.astimezone(TIMEZONE).replace(tzinfo=None, second=0, microsecond=0)
+        candidate = local + datetime.timedelta(minutes=1)
+        for _ in range(_MAX_SEARCH_STEPS):
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1)
+                candidate = candidate.replace(hour=0, minute=0)
+            elif not self._day_matches(candidate.date()):
+                candidate = (candidate + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + datetime.timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += datetime.timedelta(minutes=1)
+            else:
+                aware = self._localize(candidate, after)
+                if aware > after:
+                    return aware
+                candidate += datetime.timedelta(minutes=1)
+        msg = f"The cron expression {self.expression!r} matches no date."
+        raise ValueError(msg)
+
+
+def _parse_cron_field(field: str, name: str, first: int, last: int) -> set[int]:
+    """Return the values matched by a field of a cron expression."""
+    values: set[int] = set()
+    for part in field.split(","):
+        value_range, _, step_str = part.partition("/")
+        try:
+            step = int(step_str) if step_str else 1
+            if value_range == "*":
+                start, end = first, last
+            elif "-" in value_range:
+                start_str, end_str = value_range.split("-", 1)
+                start, end = int(start_str), int(end_str)
+            else:
+                start = int(value_range)
+                # 'a/n' runs from a to the last value, like in Vixie cron
+                end = last if step_str else start
+        except ValueError:
+            msg = f"Invalid {name} field {field!r} in a cron expression."
+            raise ValueError(msg) from None
+        if not first <= start <= end <= last or step < 1:
+            msg = f"The {name} field {field!r} must be within {first}-{last}."
+            raise ValueError(msg)
+        values.update(range(start, end + 1, step))
+    return values
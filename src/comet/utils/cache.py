@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+
+from src.comet.utils.stats import CacheInfo
+
+
+class TTLCache[K, V]:
+    """A small LRU cache whose entries expire after a fixed time.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of entries. The least recently used entry is
+        evicted when the cache is full.
+    ttl : float
+        The number of seconds an entry stays valid.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # key -> (expiry in monotonic seconds, value)
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of entries, including expired ones not yet evicted."""
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        """Return whether a key holds a valid entry, without counting a lookup."""
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: K) -> V | None:
+        """Return the value of a key, or None if it is missing or expired.
+
+        Parameters
+        ----------
+        key : K
+            The key to look up.
+
+        Returns
+        -------
+        V | None
+            The cached value, or None.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: K, value: V) -> None:
+        """Store a value, evicting the least recently used entry if full.
+
+        Parameters
+        ----------
+        key : K
+            The key to store the value under.
+        value : V
+            The value to store.
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> V | None:
+        """Remove a key and return its value, or None if it wasn't cached."""
+        entry = self._entries.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._entries.clear()
+
+    def cache_info(self) -> CacheInfo:
+        """Return the size and hit counters of the cache.
+
+        Returns
+        -------
+        CacheInfo
+            The number of entries, hits and misses, and the maximum number of entries.
+        """
+        return CacheInfo(
+            size=len(self._entries),
+            hits=self.hits,
+            misses=self.misses,
+            maxsize=self.maxsize,
+        )
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+if TYPE_CHECKING:
+    import inspect
+
+
+class GenerationCall(NamedTuple):
+    """The arguments of a call of a generation function, reduced to their sizes.
+
+    Attributes
+    ----------
+    model_name : str
+        The name of the model.
+    max_tokens : int
+        The maximum number of output tokens.
+    messages : int
+        The number of messages of the prompt.
+    prompt_chars : int
+        The length of the messages of the prompt.
+    system_chars : int
+        The length of the system prompt.
+    """
+
+    model_name: str
+    max_tokens: int
+    messages: int
+    prompt_chars: int
+    system_chars: int
+
+
+def describe_call(
+    signature: inspect.Signature,
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+) -> GenerationCall:
+    """Describe a call of a generation function, from its `prompt` and `model_params`.
+
+    Parameters
+    ----------
+    signature : inspect.Signature
+        The signature of the generation function.
+    args : tuple[Any, ...]
+        The positional arguments of the call.
+    kwargs : dict[str, Any]
+        The keyword arguments of the call.
+
+    Returns
+    -------
+    GenerationCall
+        The model and the sizes of the prompt.
+    """
+    arguments = signature.bind(*args, **kwargs).arguments
+    model_params = arguments["model_params"]
+    model = model_params.model
+    return GenerationCall(
+        model_name=model if isinstance(model, str) else str(model.value),
+        max_tokens=model_params.max_tokens,
+        messages=len(arguments["prompt"]),
+        prompt_chars=sum(len(message.content or "") for message in arguments["prompt"]),
+        system_chars=len(arguments["system_prompt"] or ""),
+    )
@@ -3,9 +3,9 @@ from typing import TypeVar
 
 from discord import Interaction, app_commands
 
+from src.comet.analytics.tokens import token_accounting
 from src.comet.config.env import ADMIN_USER_IDS, AUTHORIZED_SERVER_IDS
 from src.comet.db.dao.access_privilege_dao import AccessPrivilegeDAO
-from src.comet.db.dao.usage_limit_dao import UsageLimitDAO
 
 _T = TypeVar("_T")
 access_dao = AccessPrivilegeDAO()
@@ -50,14 +50,14 @@ def is_advanced_user() -> Callable[[_T], _T]:
     -------
     Callable[[_T], _T]
         A decorator that checks whether the user executing command is listed
-        in the table `access_privilege` with `advanced` access privilege.
+        in the table `access_privilege_current` with `advanced` access privilege.
     """
 
     async def predicate(interaction: Interaction) -> bool:
-        advanced_user_ids = await access_dao.fetch_user_ids_by_access_privilege(
+        return await access_dao.has_access_privilege(
+            interaction.user.id,
             access_privilege="advanced",
         )
-        return interaction.user.id in advanced_user_ids
 
     return app_commands.check(predicate)
 
@@ -69,14 +69,14 @@ def is_not_blocked_user() -> Callable[[_T], _T]:
     -------
     Callable[[_T], _T]
         A decorator that checks whether the user executing command is not listed
-        in the table `blocked_user` with `blocked` access privilege.
+        in the table `access_privilege_current` with `blocked` access privilege.
     """
 
     async def predicate(interaction: Interaction) -> bool:
-        blocked_user_ids = await access_dao.fetch_user_ids_by_access_privilege(
+        return not await access_dao.has_access_privilege(
+            interaction.user.id,
             access_privilege="blocked",
         )
-        return interaction.user.id not in blocked_user_ids
 
     return app_commands.check(predicate)
 
@@ -97,19 +97,11 @@ def has_daily_usage_left() -> Callable[[_T], _T]:
             return True
 
         # Advanced users bypass the daily usage limit check
-        advanced_user_ids = await access_dao.fetch_user_ids_by_access_privilege(
-            access_privilege="advanced",
-        )
-        if interaction.user.id in advanced_user_ids:
+        if await access_dao.has_access_privilege(interaction.user.id, access_privilege="advanced"):
             return True
 
-        usage_dao = UsageLimitDAO()
-
-        current_usage = await usage_dao.get_user_daily_usage(interaction.user.id)
-        user_limit = await usage_dao.get_user_daily_limit(interaction.user.id)
-
-        result: bool = current_usage < user_limit
+        quota = await token_accounting.get_user_daily_quota(interaction.user.id)
 
-        return result
+        return not quota.exhausted
 
     return app_commands.check(predicate)
@@ -0,0 +1,53 @@
+import functools
+import inspect
+import time
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from src.comet.adapters.response import ResponseResult, ResponseStatus
+from src.comet.analytics.tokens import token_accounting
+from src.comet.analytics.usage import usage_analytics
+from src.comet.utils.decorators._generation import describe_call
+
+
+def account_generation[**P](
+    func: Callable[P, Coroutine[Any, Any, ResponseResult]],
+) -> Callable[P, Coroutine[Any, Any, ResponseResult]]:
+    """Count the calls of a generation function, and account for their tokens.
+
+    The calls are counted for the command the current task is attributed
+    to, see `UsageAnalytics`, and their tokens accounted for the user, see
+    `TokenAccounting`, which enforces the daily token limits.
+
+    Parameters
+    ----------
+    func : Callable[P, Coroutine[Any, Any, ResponseResult]]
+        The generation function, taking `system_prompt`, `prompt` and
+        `model_params`.
+
+    Returns
+    -------
+    Callable[P, Coroutine[Any, Any, ResponseResult]]
+        The wrapped function.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> ResponseResult:
+        started = time.monotonic()
+        result = await func(*args, **kwargs)
+        duration_ms = (time.monotonic() - started) * 1000
+
+        call = describe_call(signature, args, kwargs)
+        usage_analytics.record(
+            call.model_name,
+            succeeded=result.status == ResponseStatus.SUCCESS,
+            prompt_chars=call.prompt_chars + call.system_chars,
+            response_chars=len(result.result or ""),
+            duration_ms=duration_ms,
+        )
+        if result.usage is not None:
+            token_accounting.record(call.model_name, result.usage)
+        return result
+
+    return wrapper
@@ -1,14 +1,16 @@
 import functools
-from collections.abc import Callable
+import logging
+from collections.abc import Callable, Coroutine
 from typing import Any
 
-from src.comet._cli import parse_args_and_setup_logging
 from src.comet.adapters.response import ResponseResult, ResponseStatus
 
-logger = parse_args_and_setup_logging()
+logger = logging.getLogger(__name__)
 
 
-def handle_ai_service_errors(func: Callable[..., ResponseResult]) -> Callable[..., ResponseResult]:
+def handle_ai_service_errors[**P](
+    func: Callable[P, Coroutine[Any, Any, ResponseResult]],
+) -> Callable[P, Coroutine[Any, Any, ResponseResult]]:
     """Handle errors from AI service functions.
 
     Catch all exceptions and return the appropriate ResponseResult.
@@ -25,7 +27,7 @@ def handle_ai_service_errors(func: Callable[..., ResponseResult]) -> Callable[..
     """
 
     @functools.wraps(func)
-    async def wrapper(*args: Any, **kwargs: Any) -> ResponseResult:  # noqa: ANN401
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> ResponseResult:
         try:
             return await func(*args, **kwargs)
         except Exception as err:
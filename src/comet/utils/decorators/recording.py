@@ -0,0 +1,63 @@
+import functools
+import inspect
+import time
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from src.comet.adapters.response import ResponseResult
+from src.comet.utils.decorators._generation import describe_call
+from src.comet.utils.recorder import event_recorder
+
+
+def record_generation[**P](
+    provider: str,
+) -> Callable[
+    [Callable[P, Coroutine[Any, Any, ResponseResult]]],
+    Callable[P, Coroutine[Any, Any, ResponseResult]],
+]:
+    """Record the calls of a generation function when event recording is enabled.
+
+    The recorded request is reduced to its size and the response to its
+    status, length and latency, see `EventRecorder`.
+
+    Parameters
+    ----------
+    provider : str
+        The name of the AI provider called by the function.
+
+    Returns
+    -------
+    Callable
+        The decorator
+    """
+
+    def decorator(
+        func: Callable[P, Coroutine[Any, Any, ResponseResult]],
+    ) -> Callable[P, Coroutine[Any, Any, ResponseResult]]:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> ResponseResult:
+            started = time.monotonic()
+            result = await func(*args, **kwargs)
+            if event_recorder.enabled:
+                duration_ms = (time.monotonic() - started) * 1000
+                call = describe_call(signature, args, kwargs)
+                event_recorder.record(
+                    "provider",
+                    at=started,
+                    provider=provider,
+                    model=call.model_name,
+                    max_tokens=call.max_tokens,
+                    messages=call.messages,
+                    prompt_chars=call.prompt_chars,
+                    system_chars=call.system_chars,
+                    duration_ms=round(duration_ms, 1),
+                    status=result.status.name,
+                    response_chars=len(result.result or ""),
+                )
+            return result
+
+        return wrapper
+
+    return decorator
@@ -1,8 +1,27 @@
+import atexit
+import copy
+import itertools
+import json
 import logging
+import queue
 import re
+import threading
+import time
 from logging import Logger, LogRecord
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from pathlib import Path
 
+from src.comet.utils.stats import RuntimeStats
+
+# Format: [2025-01-27 00:13:26 - <filename>:102 - DEBUG] <message>
+LOG_FORMAT = "[%(asctime)s - %(filename)s:%(lineno)d - %(levelname)s] %(message)s"
+
+# Values of variables ending with '_SYSTEM', either assigned or already expanded
+_SYSTEM_ASSIGNMENT_PATTERN = re.compile(r"([A-Za-z0-9_]+_SYSTEM\s*=\s*)[^\s,;]+")
+_SYSTEM_EXPANDED_PATTERN = re.compile(r"([A-Za-z0-9_]+_SYSTEM:\s*)[^\s,;]+")
+
+_listener: QueueListener | None = None
+
 
 class SensitiveDataFilter(logging.Filter):
     """Filter sensitive data from log messages for security reasons.
@@ -23,18 +42,208 @@ class SensitiveDataFilter(logging.Filter):
         bool
             Always returns True to process the record.
         """
-        if isinstance(record.msg, str):
-            # Replace values of variables ending with _SYSTEM with "*****"
-            record.msg = re.sub(r"[A-Za-z0-9_]+_SYSTEM\s*=\s*[^\s,;]+", r"\g<0>=*****", record.msg)
-            # Handle pattern where variable is already expanded
-            record.msg = re.sub(r"[A-Za-z0-9_]+_SYSTEM:\s*[^\s,;]+", r"\g<0>:*****", record.msg)
+        if isinstance(record.msg, str) and "_SYSTEM" in record.msg:
+            record.msg = _SYSTEM_ASSIGNMENT_PATTERN.sub(r"\g<1>*****", record.msg)
+            record.msg = _SYSTEM_EXPANDED_PATTERN.sub(r"\g<1>*****", record.msg)
 
         return True
 
 
-def setup_logger(log_level: str) -> Logger:
+class DebugSamplingFilter(logging.Filter):
+    """Rate-limit DEBUG records per call site with a token bucket.
+
+    Records above DEBUG are never dropped. When a call site emits records
+    faster than the configured rate, the excess is dropped and the number
+    of dropped records is appended to the next record that passes.
+
+    Parameters
+    ----------
+    rate : float
+        The number of DEBUG records per second allowed for each call site.
+    burst : int
+        The number of DEBUG records a call site may emit at once.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        # (pathname, lineno) -> [tokens, last refill time, suppressed count]
+        self._buckets: dict[tuple[str, int], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: LogRecord) -> bool:
+        """Decide whether a DEBUG record is within its call site's rate.
+
+        Parameters
+        ----------
+        record : LogRecord
+            The log record to be filtered.
+
+        Returns
+        -------
+        bool
+            False if the record should be dropped.
+        """
+        if record.levelno > logging.DEBUG:
+            return True
+
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            bucket = self._buckets.setdefault(key, [float(self.burst), now, 0])
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                return False
+            bucket[0] = tokens - 1
+            suppressed = int(bucket[2])
+            bucket[2] = 0
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as single-line JSON objects."""
+
+    def format(self, record: LogRecord) -> str:
+        """Format the record as a JSON object.
+
+        Parameters
+        ----------
+        record : LogRecord
+            The log record to be formatted.
+
+        Returns
+        -------
+        str
+            The JSON representation of the record.
+        """
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DeferredFormatQueueHandler(QueueHandler):
+    """Put log records on a queue, leaving their formatting to the listener.
+
+    Unlike QueueHandler, the traceback isn't formatted into the message on
+    the calling thread, so the listener's formatters still see `exc_info`.
+    """
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        """Merge the message with its args, which may change after the call.
+
+        Parameters
+        ----------
+        record : LogRecord
+            The log record to be queued.
+
+        Returns
+        -------
+        LogRecord
+            A copy of the record, with its args merged into its message.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class SizedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """Rotate the log file at timed intervals or once it reaches a size.
+
+    Parameters
+    ----------
+    filename : str
+        The path of the log file.
+    max_bytes : int
+        The size in bytes at which the file is rotated. 0 disables
+        size-based rotation.
+    when : str
+        The interval type passed to TimedRotatingFileHandler.
+    backup_count : int
+        The number of rotated files to keep.
+    """
+
+    def __init__(self, filename: str, max_bytes: int, when: str, backup_count: int) -> None:
+        super().__init__(filename, when=when, backupCount=backup_count, encoding="utf-8")
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record: LogRecord) -> bool:  # noqa: N802
+        """Check whether the rotation time has come or the file is full.
+
+        Parameters
+        ----------
+        record : LogRecord
+            The log record about to be emitted.
+
+        Returns
+        -------
+        bool
+            True if the file should be rotated before emitting the record.
+        """
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        self.stream.seek(0, 2)
+        return self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes
+
+    def rotation_filename(self, default_name: str) -> str:
+        """Avoid overwriting files rotated earlier in the same interval.
+
+        Parameters
+        ----------
+        default_name : str
+            The timestamped name of the rotated file.
+
+        Returns
+        -------
+        str
+            A name for the rotated file that doesn't exist yet.
+        """
+        name = super().rotation_filename(default_name)
+        if not Path(name).exists():
+            return name
+        for index in itertools.count(1):
+            candidate = f"{name}.{index:03d}"
+            if not Path(candidate).exists():
+                return candidate
+        return name
+
+
+def setup_logger(  # noqa: PLR0913
+    log_level: str,
+    *,
+    log_format: str = "text",
+    max_bytes: int = 10 * 2**20,
+    when: str = "midnight",
+    backup_count: int = 14,
+    debug_rate: float = 5.0,
+    debug_burst: int = 20,
+) -> Logger:
     """Set up a logger for the calling file.
 
+    Records are put on an in-memory queue by the calling thread and
+    written to the console and the log file by a background listener
+    thread, so logging never blocks the event loop on disk I/O.
+
     Parameters
     ----------
     log_level : str
@@ -45,6 +254,19 @@ def setup_logger(log_level: str) -> Logger:
         - WARNING
         - ERROR
         - CRITICAL
+    log_format : str
+        Either "text" for the human readable format or "json" for one JSON
+        object per line. Defaults to "text".
+    max_bytes : int
+        The size at which the log file is rotated. Defaults to 10 MiB.
+    when : str
+        The interval at which the log file is rotated. Defaults to midnight.
+    backup_count : int
+        The number of rotated log files to keep. Defaults to 14.
+    debug_rate : float
+        The number of DEBUG records per second allowed for each call site.
+    debug_burst : int
+        The number of DEBUG records a call site may emit at once.
 
     Returns
     -------
@@ -58,33 +280,59 @@ def setup_logger(log_level: str) -> Logger:
         If the provided log level is not a valid string value.
 
     """
+    global _listener  # noqa: PLW0603
+
     numeric_level = getattr(logging, log_level.upper(), None)
     if not isinstance(numeric_level, int):
         msg = f"Invalid log level: {log_level}"
         raise TypeError(msg)
 
+    logger = logging.getLogger(__name__)
+    if _listener is not None:
+        return logger
+
     log_file = "./logs/comet.log"
 
     # create log folder if not exists
     Path("./logs").mkdir(exist_ok=True)
 
-    file_handler = logging.FileHandler(log_file)
-    stream_handler = logging.StreamHandler()
+    formatter = JsonFormatter() if log_format == "json" else logging.Formatter(LOG_FORMAT)
+    sensitive_filter = SensitiveDataFilter()
 
-    logging.basicConfig(
-        level=numeric_level,
-        # Format: [2025-01-27 00:13:26 - <filename>:102 - DEBUG] <message>
-        format="[%(asctime)s - %(filename)s:%(lineno)d - %(levelname)s] %(message)s",
-        handlers=[
-            file_handler,  # output logs to a .log
-            stream_handler,  # output logs to console
-        ],
+    file_handler = SizedTimedRotatingFileHandler(
+        log_file,
+        max_bytes=max_bytes,
+        when=when,
+        backup_count=backup_count,
     )
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+        # Masking runs on the listener thread, after the message has been merged with its args
+        handler.addFilter(sensitive_filter)
 
-    logger = logging.getLogger(__name__)
+    log_queue: queue.SimpleQueue[LogRecord] = queue.SimpleQueue()
+    # The message is merged with its args here, the final layout is applied by the listener
+    queue_handler = DeferredFormatQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSamplingFilter(rate=debug_rate, burst=debug_burst))
 
-    # Filter sensitive data
-    sensitive_filter = SensitiveDataFilter()
-    logger.addFilter(sensitive_filter)
+    logging.basicConfig(level=numeric_level, handlers=[queue_handler])
+
+    _listener = QueueListener(log_queue, file_handler, stream_handler)
+    _listener.start()
+    atexit.register(stop_logger)
+    RuntimeStats().register_queue("logging", log_queue.qsize)
 
     return logger
+
+
+def stop_logger() -> None:
+    """Flush the pending log records and stop the listener thread."""
+    global _listener  # noqa: PLW0603
+
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
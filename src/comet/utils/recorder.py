@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import atexit
+import datetime
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import queue
+import secrets
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from discord import Thread
+
+from src.comet.config.env import EVENT_RECORD_FILE
+
+if TYPE_CHECKING:
+    from discord import ClientUser, Interaction, Message
+
+logger = logging.getLogger(__name__)
+
+RECORDING_VERSION = 1
+
+
+class EventRecorder:
+    """Record the shape of the traffic handled by the bot to a local file.
+
+    Gateway events and provider calls are written as JSON lines, gzipped
+    when the path ends with `.gz`, so that they can be replayed later by
+    `benchmarks.replay`. Nothing that could identify a user or reveal a
+    conversation is recorded: Discord IDs are replaced by pseudonyms keyed
+    with a random salt that is never written, and message contents are
+    reduced to their length.
+
+    Records are written by a background thread, the first of them starting
+    it, so recording costs a dict and a queue put on the hot path.
+
+    Parameters
+    ----------
+    path : str
+        The file to write. An empty string disables recording.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path) if path else None
+        self._salt = secrets.token_bytes(16)
+        self._started_at = time.monotonic()
+        self._queue: queue.SimpleQueue[dict[str, Any] | None] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Return whether events are being recorded."""
+        return self.path is not None
+
+    def pseudonym(self, snowflake: int | None) -> int | None:
+        """Map a Discord ID to a stable pseudonym for the duration of the recording."""
+        if snowflake is None:
+            return None
+        digest = hmac.new(self._salt, str(snowflake).encode(), hashlib.sha256).digest()
+        # 48 bits are exact in any JSON reader
+        return int.from_bytes(digest[:6])
+
+    def record(self, kind: str, *, at: float | None = None, **fields: Any) -> None:  # noqa: ANN401
+        """Queue a record to be written.
+
+        Parameters
+        ----------
+        kind : str
+            The type of the record, e.g. "message" or "provider".
+        at : float | None
+            The `time.monotonic()` value at which the event happened.
+            Defaults to now.
+        **fields : Any
+            The content of the record, which must be JSON serializable.
+        """
+        if self.path is None:
+            return
+        if self._thread is None:
+            self._start(self.path)
+        offset = (time.monotonic() if at is None else at) - self._started_at
+        self._queue.put({"kind": kind, "t": round(offset, 3), **fields})
+
+    def record_message(
+        self,
+        message: Message,
+        *,
+        bot_user: ClientUser | None,
+        talk_prefix: str,
+    ) -> None:
+        """Record a message received from the gateway.
+
+        Parameters
+        ----------
+        message : Message
+            The received message.
+        bot_user : ClientUser | None
+            The bot's own user, to tell its messages and threads apart.
+        talk_prefix : str
+            The name prefix of the threads created by `/talk`.
+        """
+        channel = message.channel
+        bot_user_id = bot_user.id if bot_user is not None else None
+        fields: dict[str, Any] = {
+            "guild": self.pseudonym(message.guild.id if message.guild else None),
+            "channel": self.pseudonym(channel.id),
+            "author": self.pseudonym(message.author.id),
+            "own": message.author.id == bot_user_id,
+            "content_len": len(message.content or ""),
+            "attachments": len(message.attachments),
+            "embeds": len(message.embeds),
+        }
+        if isinstance(channel, Thread):
+            fields["thread"] = self._thread_state(channel, bot_user_id, talk_prefix)
+        self.record("message", **fields)
+
+    def record_interaction(self, interaction: Interaction) -> None:
+        """Record an interaction received from the gateway.
+
+        String options are reduced to their length, other option values,
+        e.g. numbers and booleans, are kept as they are.
+        """
+        data: dict[str, Any] = dict(interaction.data or {})
+        options = {
+            option["name"]: (
+                len(option["value"])
+                if isinstance(option.get("value"), str)
+                else option.get("value")
+            )
+            for option in data.get("options", [])
+        }
+        self.record(
+            "interaction",
+            type=interaction.type.name,
+            command=data.get("name"),
+            guild=self.pseudonym(interaction.guild_id),
+            channel=self.pseudonym(interaction.channel_id),
+            user=self.pseudonym(interaction.user.id),
+            options=options,
+        )
+
+    def record_thread(
+        self,
+        kind: str,
+        thread: Thread,
+        *,
+        bot_user: ClientUser | None,
+        talk_prefix: str,
+    ) -> None:
+        """Record a thread being created, updated or deleted.
+
+        Parameters
+        ----------
+        kind : str
+            One of "thread_create", "thread_update" and "thread_delete".
+        thread : Thread
+            The thread, in its new state for an update.
+        bot_user : ClientUser | None
+            The bot's own user, to tell its threads apart.
+        talk_prefix : str
+            The name prefix of the threads created by `/talk`.
+        """
+        bot_user_id = bot_user.id if bot_user is not None else None
+        self.record(
+            kind,
+            guild=self.pseudonym(thread.guild.id),
+            channel=self.pseudonym(thread.id),
+            thread=self._thread_state(thread, bot_user_id, talk_prefix),
+        )
+
+    def _thread_state(
+        self,
+        thread: Thread,
+        bot_user_id: int | None,
+        talk_prefix: str,
+    ) -> dict[str, Any]:
+        return {
+            "parent": self.pseudonym(thread.parent_id),
+            "owned": thread.owner_id == bot_user_id,
+            "talk": thread.name.startswith(talk_prefix),
+            "archived": thread.archived,
+            "locked": thread.locked,
+            "message_count": thread.message_count,
+        }
+
+    def _start(self, path: Path) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._thread = threading.Thread(
+                target=self._write,
+                args=(path,),
+                name="event-recorder",
+                daemon=True,
+            )
+            self._thread.start()
+            atexit.register(self.close)
+            logger.info("Recording events to %s", path)
+
+    def _write(self, path: Path) -> None:
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "at", encoding="utf-8") as file:
+            header = {
+                "kind": "header",
+                "version": RECORDING_VERSION,
+                "started_at": datetime.datetime.now(datetime.UTC).isoformat(timespec="seconds"),
+            }
+            file.write(json.dumps(header, separators=(",", ":")) + "\n")
+            while (record := self._queue.get()) is not None:
+                file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def close(self) -> None:
+        """Write the pending records and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join()
+
+
+event_recorder = EventRecorder(EVENT_RECORD_FILE)
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import resource
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple, Self
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
+
+
+def rss_mib() -> float:
+    """Return the resident set size of the process in MiB.
+
+    Reads `/proc/self/statm` where available and falls back to the peak
+    RSS reported by `getrusage` elsewhere.
+    """
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        resident_pages = int(statm.read_text().split()[1])
+        return resident_pages * resource.getpagesize() / 2**20
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+class CacheInfo(NamedTuple):
+    """Snapshot of a cache's size and effectiveness.
+
+    Attributes
+    ----------
+    size : int
+        The number of entries currently held by the cache.
+    hits : int
+        The number of lookups that found an entry.
+    misses : int
+        The number of lookups that did not find an entry.
+    maxsize : int | None
+        The maximum number of entries, None if the cache is unbounded.
+    """
+
+    size: int
+    hits: int = 0
+    misses: int = 0
+    maxsize: int | None = None
+
+    @property
+    def hit_rate(self) -> float | None:
+        """Return the ratio of hits to lookups, or None if nothing was looked up."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+
+class EventRate:
+    """Count events over a sliding window of one-second buckets.
+
+    Parameters
+    ----------
+    window : int
+        The length of the window in seconds. Defaults to 60.
+    """
+
+    def __init__(self, window: int = 60) -> None:
+        self.window = window
+        self.total = 0
+        self._buckets = [0] * window
+        self._last_second = int(time.monotonic())
+
+    def _advance(self, now: int) -> None:
+        """Clear the buckets of the seconds that passed since the last event."""
+        if now - self._last_second >= self.window:
+            self._buckets = [0] * self.window
+        else:
+            for second in range(self._last_second + 1, now + 1):
+                self._buckets[second % self.window] = 0
+        self._last_second = now
+
+    def record(self) -> None:
+        """Count one event at the current time."""
+        now = int(time.monotonic())
+        self._advance(now)
+        self._buckets[now % self.window] += 1
+        self.total += 1
+
+    def per_second(self) -> float:
+        """Return the average number of events per second over the window."""
+        self._advance(int(time.monotonic()))
+        return sum(self._buckets) / self.window
+
+
+class RuntimeStats:
+    """A singleton registry of live runtime statistics.
+
+    Components register cheap callables for their queue depths and cache
+    sizes, so that the statistics can be collected on demand without
+    keeping any bookkeeping on the hot path besides plain counters.
+    """
+
+    _instance = None
+    started_at: float
+    inflight: Counter[str]
+    shard_events: dict[int, EventRate]
+    queues: dict[str, Callable[[], int]]
+    caches: dict[str, Callable[[], CacheInfo]]
+
+    def __new__(cls) -> Self:
+        """Create a new instance of RuntimeStats or return the existing one.
+
+        Returns
+        -------
+        Self
+            The singleton instance of RuntimeStats.
+        """
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.started_at = time.monotonic()
+            cls._instance.inflight = Counter()
+            cls._instance.shard_events = {}
+            cls._instance.queues = {}
+            cls._instance.caches = {}
+        return cls._instance
+
+    @property
+    def uptime(self) -> float:
+        """Return the number of seconds since the process started collecting stats."""
+        return time.monotonic() - self.started_at
+
+    @contextmanager
+    def track_generation(self, provider: str) -> Generator[None, None, None]:
+        """Count a generation as in-flight for the duration of the block.
+
+        Parameters
+        ----------
+        provider : str
+            The name of the AI provider handling the generation.
+        """
+        self.inflight[provider] += 1
+        try:
+            yield
+        finally:
+            self.inflight[provider] -= 1
+
+    def record_shard_event(self, shard_id: int) -> None:
+        """Count an event received through a gateway shard.
+
+        Parameters
+        ----------
+        shard_id : int
+            The ID of the shard that received the event.
+        """
+        rate = self.shard_events.get(shard_id)
+        if rate is None:
+            rate = self.shard_events[shard_id] = EventRate()
+        rate.record()
+
+    def register_queue(self, name: str, depth: Callable[[], int]) -> None:
+        """Register a callable returning the current depth of a queue.
+
+        Parameters
+        ----------
+        name : str
+            The name displayed for the queue.
+        depth : Callable[[], int]
+            A cheap callable returning the number of pending items.
+        """
+        self.queues[name] = depth
+
+    def register_cache(self, name: str, info: Callable[[], CacheInfo]) -> None:
+        """Register a callable returning the current state of a cache.
+
+        Parameters
+        ----------
+        name : str
+            The name displayed for the cache.
+        info : Callable[[], CacheInfo]
+            A cheap callable returning the cache's size and hit counters.
+        """
+        self.caches[name] = info
+
+    def queue_depths(self) -> dict[str, int]:
+        """Return the current depth of every registered queue."""
+        return {name: depth() for name, depth in self.queues.items()}
+
+    def cache_infos(self) -> dict[str, CacheInfo]:
+        """Return the current state of every registered cache."""
+        return {name: info() for name, info in self.caches.items()}
@@ -0,0 +1,25 @@
+import argparse
+import asyncio
+import logging
+
+from src.comet.utils.logger import LOG_FORMAT
+from src.comet.workers.worker import serve
+
+
+def main() -> None:
+    """Entry point for a generation worker process.
+
+    Workers are spawned by the gateway process, see `WorkerPool`. They log
+    to stderr, which is shared with the gateway process.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--log", default="INFO")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log.upper(), format=f"(worker) {LOG_FORMAT}")
+    asyncio.run(serve(args.socket))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import itertools
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, ClassVar
+
+from src.comet.adapters.response import ResponseResult, ResponseStatus
+from src.comet.analytics.tokens import token_accounting
+from src.comet.utils.stats import RuntimeStats
+from src.comet.workers.protocol import WorkerReply, WorkerRequest, read_frame, write_frame
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from src.comet.workers.protocol import GenerationJob
+
+logger = logging.getLogger(__name__)
+
+_CONNECT_ATTEMPTS = 50
+_CONNECT_INTERVAL_SECONDS = 0.2
+_PING_TIMEOUT_SECONDS = 5.0
+
+
+class WorkerProcess:
+    """A generation worker process and the connection to it.
+
+    Parameters
+    ----------
+    index : int
+        The slot of the worker in the pool, used in its socket name and logs.
+    socket_path : Path
+        The path of the Unix socket the worker listens on.
+    log_level : str
+        The log level passed to the worker.
+    on_lost : Callable[[WorkerProcess], None]
+        Called with the worker when the connection to it is lost.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        socket_path: Path,
+        log_level: str,
+        on_lost: Callable[[WorkerProcess], None],
+    ) -> None:
+        self.index = index
+        self.socket_path = socket_path
+        self.log_level = log_level
+        self.on_lost = on_lost
+        self.process: asyncio.subprocess.Process | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task[None] | None = None
+        self._pending: dict[int, asyncio.Future[WorkerReply]] = {}
+        self._ids = itertools.count()
+        self._connected = False
+
+    @property
+    def alive(self) -> bool:
+        """Return whether the process is running and connected."""
+        return self._connected and self.process is not None and self.process.returncode is None
+
+    async def start(self) -> None:
+        """Spawn the worker process and connect to its socket.
+
+        Raises
+        ------
+        ConnectionError
+            If the worker doesn't accept connections in time.
+        """
+        self.socket_path.unlink(missing_ok=True)
+        # The worker exits when its stdin is closed, i.e. when this process exits
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-m",
+            "src.comet.workers",
+            "--socket",
+            str(self.socket_path),
+            "--log",
+            self.log_level,
+            stdin=asyncio.subprocess.PIPE,
+            # Generations are recorded by the gateway process, which routes them
+            env={**os.environ, "EVENT_RECORD_FILE": ""},
+        )
+
+        for _ in range(_CONNECT_ATTEMPTS):
+            if self.process.returncode is not None:
+                break
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(str(self.socket_path))
+            except OSError:
+                await asyncio.sleep(_CONNECT_INTERVAL_SECONDS)
+                continue
+            self._connected = True
+            self._reader_task = asyncio.create_task(
+                self._read_replies(reader),
+                name=f"worker-{self.index}-replies",
+            )
+            logger.info("Worker %d started (pid: %d)", self.index, self.process.pid)
+            return
+
+        await self.stop()
+        msg = f"Worker {self.index} did not accept connections."
+        raise ConnectionError(msg)
+
+    async def _read_replies(self, reader: asyncio.StreamReader) -> None:
+        """Resolve the pending requests as their replies arrive."""
+        try:
+            while True:
+                reply = WorkerReply.model_validate_json(await read_frame(reader))
+                future = self._pending.pop(reply.id, None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as err:
+            logger.warning("Lost the connection to worker %d: %r", self.index, err)
+        finally:
+            self._connected = False
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"Worker {self.index} is gone."))
+            self._pending.clear()
+            self.on_lost(self)
+
+    async def request(self, request: WorkerRequest, wait_seconds: float) -> WorkerReply:
+        """Send a request to the worker and wait for its reply.
+
+        Parameters
+        ----------
+        request : WorkerRequest
+            The request to send. Its id is assigned by this method.
+        wait_seconds : float
+            The number of seconds to wait for the reply.
+
+        Returns
+        -------
+        WorkerReply
+            The reply of the worker.
+
+        Raises
+        ------
+        ConnectionError
+            If the worker isn't connected or the connection is lost.
+        TimeoutError
+            If the reply doesn't arrive in time.
+        """
+        if not self.alive or self._writer is None:
+            msg = f"Worker {self.index} is not running."
+            raise ConnectionError(msg)
+
+        request.id = next(self._ids)
+        future: asyncio.Future[WorkerReply] = asyncio.get_running_loop().create_future()
+        self._pending[request.id] = future
+        try:
+            write_frame(self._writer, request.model_dump_json().encode())
+            await self._writer.drain()
+            return await asyncio.wait_for(future, wait_seconds)
+        finally:
+            self._pending.pop(request.id, None)
+
+    async def stop(self) -> None:
+        """Close the connection and terminate the worker process."""
+        self._connected = False
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), _PING_TIMEOUT_SECONDS)
+            except TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        self.socket_path.unlink(missing_ok=True)
+
+
+class WorkerPool:
+    """A pool of worker processes running generation jobs.
+
+    The gateway process puts jobs on a bounded queue, which makes callers
+    wait when every worker is busy. Each worker runs up to `concurrency`
+    jobs at a time. A health check restarts workers that crashed or stopped
+    answering pings, or that ran a job past `job_timeout`, since the job
+    would keep running on them; the jobs they were running fail with an
+    error result while the bot and the other workers keep running.
+
+    Parameters
+    ----------
+    size : int
+        The number of worker processes.
+    concurrency : int
+        The number of jobs run concurrently by each worker.
+    queue_size : int
+        The number of jobs that can wait for a free worker.
+    job_timeout : float
+        The number of seconds to wait for the result of a job.
+    health_interval : float
+        The number of seconds between health checks.
+    log_level : str
+        The log level passed to the workers.
+    """
+
+    _running: ClassVar[WorkerPool | None] = None
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        size: int,
+        concurrency: int,
+        queue_size: int,
+        job_timeout: float,
+        health_interval: float,
+        log_level: str,
+    ) -> None:
+        self.size = size
+        self.concurrency = concurrency
+        self.job_timeout = job_timeout
+        self.health_interval = health_interval
+        self.log_level = log_level
+        # Each job with the future of its result and the context of its caller
+        self._queue: asyncio.Queue[
+            tuple[GenerationJob, asyncio.Future[ResponseResult], contextvars.Context]
+        ] = asyncio.Queue(maxsize=queue_size)
+        self._workers: list[WorkerProcess] = []
+        self._tasks: list[asyncio.Task[None]] = []
+        self._socket_dir: Path | None = None
+        self._lost = asyncio.Event()
+        # Set while the worker in the slot is connected
+        self._ready = [asyncio.Event() for _ in range(size)]
+
+    def _on_lost(self, worker: WorkerProcess) -> None:
+        # Ignore workers that have already been replaced
+        if self._workers[worker.index] is worker:
+            self._ready[worker.index].clear()
+            self._lost.set()
+
+    def _spawn(self, index: int) -> WorkerProcess:
+        if self._socket_dir is None:
+            msg = "The pool has not been started."
+            raise RuntimeError(msg)
+        return WorkerProcess(
+            index,
+            self._socket_dir / f"worker-{index}.sock",
+            self.log_level,
+            self._on_lost,
+        )
+
+    @classmethod
+    def get_running(cls) -> WorkerPool | None:
+        """Return the running pool of this process, if any.
+
+        Returns
+        -------
+        WorkerPool | None
+            The running pool, or None if generation runs in-process.
+        """
+        return cls._running
+
+    async def start(self) -> None:
+        """Spawn the workers and start dispatching jobs."""
+        self._socket_dir = Path(tempfile.mkdtemp(prefix="comet-workers-"))
+        self._workers = [self._spawn(index) for index in range(self.size)]
+        await asyncio.gather(*(worker.start() for worker in self._workers))
+        for ready in self._ready:
+            ready.set()
+
+        for index in range(self.size):
+            for slot in range(self.concurrency):
+                self._tasks.append(
+                    asyncio.create_task(
+                        self._dispatch(index),
+                        name=f"worker-{index}-dispatch-{slot}",
+                    ),
+                )
+        self._tasks.append(asyncio.create_task(self._check_health(), name="worker-health"))
+
+        RuntimeStats().register_queue("generation_jobs", self._queue.qsize)
+        WorkerPool._running = self
+        logger.info("Started %d generation workers", self.size)
+
+    async def stop(self) -> None:
+        """Stop dispatching jobs and terminate the workers."""
+        WorkerPool._running = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.gather(*(worker.stop() for worker in self._workers))
+        if self._socket_dir is not None:
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+        logger.info("Stopped the generation workers")
+
+    async def generate(self, job: GenerationJob) -> ResponseResult:
+        """Run a generation job on a worker.
+
+        Waits for room in the queue when the workers are saturated. A job
+        cancelled while queued is dropped. A job cancelled while running
+        completes on its worker, since the provider bills it anyway, and its
+        tokens are accounted for the caller.
+
+        Parameters
+        ----------
+        job : GenerationJob
+            The job to run.
+
+        Returns
+        -------
+        ResponseResult
+            The generated response.
+
+        Raises
+        ------
+        RuntimeError
+            If the worker failed to run the job.
+        """
+        future: asyncio.Future[ResponseResult] = asyncio.get_running_loop().create_future()
+        await self._queue.put((job, future, contextvars.copy_context()))
+        return await future
+
+    async def _dispatch(self, index: int) -> None:
+        """Feed jobs from the queue to the worker in the given slot."""
+        while True:
+            # Leave the jobs to the other workers while this one restarts
+            await self._ready[index].wait()
+
+            job, future, context = await self._queue.get()
+            worker = self._workers[index]
+            try:
+                if future.done():
+                    continue
+                reply = await worker.request(
+                    WorkerRequest(id=0, op="generate", job=job),
+                    wait_seconds=self.job_timeout,
+                )
+                if future.done():
+                    # The caller was cancelled, e.g. by moderation, but the tokens are billed
+                    if reply.outcome is not None and reply.outcome.usage is not None:
+                        context.run(token_accounting.record, job.model, reply.outcome.usage)
+                elif reply.outcome is None:
+                    future.set_exception(RuntimeError(reply.error or "Worker returned no result."))
+                else:
+                    future.set_result(
+                        ResponseResult(
+                            status=ResponseStatus(reply.outcome.status),
+                            result=reply.outcome.result,
+                            usage=reply.outcome.usage,
+                        ),
+                    )
+            except TimeoutError as err:
+                if not future.done():
+                    future.set_exception(err)
+                # Stopped for the health check to restart it, see `_on_lost()`
+                logger.warning("A job timed out on worker %d, restarting it", index)
+                await worker.stop()
+            except Exception as err:  # noqa: BLE001
+                if not future.done():
+                    future.set_exception(err)
+            finally:
+                self._queue.task_done()
+
+    async def _is_healthy(self, worker: WorkerProcess) -> bool:
+        if not worker.alive:
+            return False
+        try:
+            await worker.request(WorkerRequest(id=0, op="ping"), _PING_TIMEOUT_SECONDS)
+        except (ConnectionError, TimeoutError):
+            return False
+        return True
+
+    async def _check_health(self) -> None:
+        """Restart the workers that crashed or stopped answering."""
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._lost.wait(), self.health_interval)
+            self._lost.clear()
+
+            for index, worker in enumerate(self._workers):
+                if await self._is_healthy(worker):
+                    continue
+                logger.warning("Worker %d is unhealthy, restarting it", index)
+                self._ready[index].clear()
+                await worker.stop()
+                replacement = self._spawn(index)
+                self._workers[index] = replacement
+                try:
+                    await replacement.start()
+                except ConnectionError:
+                    logger.exception("Failed to restart worker %d", index)
+                    continue
+                self._ready[index].set()
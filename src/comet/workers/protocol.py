@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import struct
+from typing import TYPE_CHECKING, Literal
+
+from pydantic import BaseModel
+
+# pydantic resolves the annotations of the models at runtime
+from src.comet.adapters.response import TokenUsage  # noqa: TC001
+
+if TYPE_CHECKING:
+    import asyncio
+
+# Frames are prefixed with their length as a 4-byte big-endian unsigned integer
+_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 16 * 2**20
+
+
+class GenerationJob(BaseModel):
+    """A generation request sent from the gateway process to a worker.
+
+    Attributes
+    ----------
+    provider : Literal["anthropic", "openai"]
+        The AI provider to generate the response with.
+    system_prompt : str
+        The system instruction.
+    messages : list[tuple[str, str | None]]
+        The conversation history as (role, content) pairs.
+    model : str
+        The model to use.
+    max_tokens : int
+        The maximum number of tokens to generate.
+    temperature : float
+        The sampling temperature.
+    top_p : float
+        The nucleus sampling parameter.
+    """
+
+    provider: Literal["anthropic", "openai"]
+    system_prompt: str
+    messages: list[tuple[str, str | None]]
+    model: str
+    max_tokens: int
+    temperature: float
+    top_p: float
+
+
+class GenerationOutcome(BaseModel):
+    """The result of a generation job.
+
+    Attributes
+    ----------
+    status : int
+        The value of the ResponseStatus of the result.
+    result : str | None
+        The generated text, or None if generation failed.
+    usage : TokenUsage | None
+        The tokens billed for the generation, accounted for by the gateway process.
+    """
+
+    status: int
+    result: str | None
+    usage: TokenUsage | None = None
+
+
+class WorkerRequest(BaseModel):
+    """A request frame sent to a worker.
+
+    Attributes
+    ----------
+    id : int
+        The identifier echoed back in the reply.
+    op : Literal["ping", "generate"]
+        The operation to perform.
+    job : GenerationJob | None
+        The job to run, for the "generate" operation.
+    """
+
+    id: int
+    op: Literal["ping", "generate"]
+    job: GenerationJob | None = None
+
+
+class WorkerReply(BaseModel):
+    """A reply frame sent back by a worker.
+
+    Attributes
+    ----------
+    id : int
+        The identifier of the request being replied to.
+    outcome : GenerationOutcome | None
+        The result of a "generate" request.
+    error : str | None
+        A description of the error if the request failed.
+    """
+
+    id: int
+    outcome: GenerationOutcome | None = None
+    error: str | None = None
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    """Read a single length-prefixed frame.
+
+    Parameters
+    ----------
+    reader : asyncio.StreamReader
+        The stream to read from.
+
+    Returns
+    -------
+    bytes
+        The payload of the frame.
+
+    Raises
+    ------
+    asyncio.IncompleteReadError
+        If the stream is closed before a whole frame is read.
+    ValueError
+        If the frame exceeds MAX_FRAME_BYTES.
+    """
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if length > MAX_FRAME_BYTES:
+        msg = f"Frame of {length} bytes exceeds the limit of {MAX_FRAME_BYTES} bytes."
+        raise ValueError(msg)
+    return await reader.readexactly(length)
+
+
+def write_frame(writer: asyncio.StreamWriter, payload: bytes) -> None:
+    """Write a single length-prefixed frame.
+
+    Call `writer.drain()` afterwards to apply flow control.
+
+    Parameters
+    ----------
+    writer : asyncio.StreamWriter
+        The stream to write to.
+    payload : bytes
+        The payload of the frame.
+    """
+    writer.write(_HEADER.pack(len(payload)) + payload)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+
+from src.comet.adapters.chat import ChatMessage
+from src.comet.ai.models.claude_model import ClaudeModelParams
+from src.comet.ai.models.gpt_model import GPTModelParams
+from src.comet.ai.services.completion import (
+    close_clients,
+    generate_anthropic_response,
+    generate_openai_response,
+)
+from src.comet.ai.services.warmup import keep_providers_warm, warm_up_providers
+from src.comet.workers.protocol import (
+    GenerationJob,
+    GenerationOutcome,
+    WorkerReply,
+    WorkerRequest,
+    read_frame,
+    write_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def run_job(job: GenerationJob) -> GenerationOutcome:
+    """Build the conversation of a job and generate the response.
+
+    Parameters
+    ----------
+    job : GenerationJob
+        The job received from the gateway process.
+
+    Returns
+    -------
+    GenerationOutcome
+        The status, text and token usage of the generated response.
+    """
+    messages = [ChatMessage(role=role, content=content) for role, content in job.messages]
+    if job.provider == "anthropic":
+        result = await generate_anthropic_response(
+            system_prompt=job.system_prompt,
+            prompt=messages,
+            model_params=ClaudeModelParams(
+                model=job.model,
+                max_tokens=job.max_tokens,
+                temperature=job.temperature,
+                top_p=job.top_p,
+            ),
+        )
+    else:
+        result = await generate_openai_response(
+            system_prompt=job.system_prompt,
+            prompt=messages,
+            model_params=GPTModelParams(
+                model=job.model,
+                max_tokens=job.max_tokens,
+                temperature=job.temperature,
+                top_p=job.top_p,
+            ),
+        )
+    return GenerationOutcome(status=result.status.value, result=result.result, usage=result.usage)
+
+
+class _Connection:
+    """Serve the requests sent by the gateway process over one connection.
+
+    Requests are handled concurrently, replies are written as they finish.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self._write_lock = asyncio.Lock()
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def serve(self) -> None:
+        try:
+            while True:
+                payload = await read_frame(self.reader)
+                request = WorkerRequest.model_validate_json(payload)
+                task = asyncio.create_task(self._handle(request), name=f"worker-{request.op}")
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        except asyncio.IncompleteReadError:
+            logger.info("Gateway process closed the connection")
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            self.writer.close()
+
+    async def _handle(self, request: WorkerRequest) -> None:
+        if request.op == "ping":
+            reply = WorkerReply(id=request.id)
+        elif request.job is None:
+            reply = WorkerReply(id=request.id, error="Missing job in generate request.")
+        else:
+            try:
+                reply = WorkerReply(id=request.id, outcome=await run_job(request.job))
+            except Exception as err:
+                logger.exception("Failed to run a generation job")
+                reply = WorkerReply(id=request.id, error=f"{err.__class__.__name__}: {err!s}")
+
+        async with self._write_lock:
+            write_frame(self.writer, reply.model_dump_json().encode())
+            await self.writer.drain()
+
+
+async def _wait_for_parent_exit() -> None:
+    """Return once stdin is closed, i.e. once the gateway process has exited."""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    while await reader.read(1024):
+        pass
+
+
+async def serve(socket_path: str) -> None:
+    """Run a generation worker listening on a Unix socket.
+
+    The worker exits when the gateway process that spawned it exits.
+
+    Parameters
+    ----------
+    socket_path : str
+        The path of the Unix socket to listen on.
+    """
+
+    async def on_connect(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await _Connection(reader, writer).serve()
+
+    server = await asyncio.start_unix_server(on_connect, path=socket_path)
+    logger.info("Worker is listening on %s", socket_path)
+
+    warm_up_task = asyncio.create_task(warm_up_providers(), name="provider-warm-up")
+    keep_alive_task = asyncio.create_task(keep_providers_warm(), name="provider-keep-alive")
+    try:
+        async with server:
+            await _wait_for_parent_exit()
+    finally:
+        warm_up_task.cancel()
+        keep_alive_task.cancel()
+        await close_clients()
+        logger.info("Worker stopped")
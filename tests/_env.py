@@ -0,0 +1,35 @@
+import os
+
+# The settings `src.comet.config.env` requires, read when `src.comet` is imported
+_SETTINGS = {
+    "BASE_TOP_P": "1.0",
+    "CLAUDE_DEFAULT_CONTEXT_WINDOW": "50",
+    "CLAUDE_DEFAULT_MAX_TOKENS": "1024",
+    "CLAUDE_DEFAULT_TEMPERATURE": "1.0",
+    "CLAUDE_DEFAULT_TOP_P": "1.0",
+    "SQLITE_DB_NAME": ":memory:",
+    "ADMIN_USER_IDS": "",
+    "AUTHORIZED_SERVER_IDS": "",
+    "BOT_NAME": "Comet",
+    "MAX_CHARS_PER_MESSAGE": "2000",
+    "GPT_DEFAULT_CONTEXT_WINDOW": "50",
+    "GPT_DEFAULT_MAX_TOKENS": "1024",
+    "GPT_DEFAULT_TEMPERATURE": "1.0",
+    "GPT_DEFAULT_TOP_P": "1.0",
+    "CHAT_MODEL": "gpt-test",
+    "FIXPY_MODEL": "gpt-test",
+    "FIXPY_TEMPERATURE": "0.2",
+    "FIXPY_TOP_P": "0.99",
+    "TALK_MAX_TOKENS": "1024",
+    "TALK_MODEL": "Test:claude-test",
+    "TALK_TEMPERATURE": "1.0",
+    "TALK_TOP_P": "1.0",
+}
+
+
+def configure_environment() -> None:
+    """Set the settings the bot requires, before anything from `src.comet` is imported.
+
+    The settings are overwritten, so that a local `.env` doesn't change the tests.
+    """
+    os.environ.update(_SETTINGS)
@@ -0,0 +1,50 @@
+import random
+import unittest
+
+from tests._env import configure_environment
+
+configure_environment()
+
+from src.comet.adapters.delivery import split_markdown  # noqa: E402
+
+_WORDS = ["word", "x" * 50, "```", "```py", "~~~", "", "para\n\n", "```json " + "y" * 300]
+
+
+class SplitMarkdownTest(unittest.TestCase):
+    """Tests of `split_markdown`."""
+
+    def assert_within(self, chunks: list[str], limit: int) -> None:
+        """Assert that there are chunks, none empty nor longer than the limit."""
+        self.assertTrue(chunks)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk), limit)
+            self.assertTrue(chunk.strip())
+
+    def test_long_fence_info_string(self) -> None:
+        """A code block opened with a long line is reopened with its language only."""
+        chunks = split_markdown("```json " + "x" * 3000, 2000)
+        self.assert_within(chunks, 2000)
+        self.assertTrue(chunks[1].startswith("```json\n"))
+
+    def test_small_limits(self) -> None:
+        """Code blocks are split within limits too small to reopen them."""
+        text = "```python\n" + "print('hello world')\n" * 30 + "```"
+        for limit in (5, 10, 20, 50):
+            with self.subTest(limit=limit):
+                self.assert_within(split_markdown(text, limit), limit)
+
+    def test_random_texts(self) -> None:
+        """Random texts of code blocks, paragraphs and long lines are split within the limit."""
+        rng = random.Random(0)  # noqa: S311
+        for limit in (10, 30, 200, 2000):
+            for _ in range(100):
+                text = "\n".join(
+                    " ".join(rng.choice(_WORDS) for _ in range(rng.randint(0, 8)))
+                    for _ in range(rng.randint(1, 100))
+                )
+                with self.subTest(limit=limit, text=text[:80]):
+                    self.assert_within(split_markdown(text, limit), limit)
+
+
+if __name__ == "__main__":
+    unittest.main()